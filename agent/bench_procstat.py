@@ -0,0 +1,34 @@
+# bench_procstat.py
+"""
+Benchmark the /proc process table reader (functions/procstat.py) against the
+psutil path of functions/taskmanager.py. Linux only; run from the agent directory:
+
+  python bench_procstat.py [--rounds N]
+"""
+import argparse
+import time
+
+from functions.procstat import ProcTable
+from functions.taskmanager import ProcessSnapshot
+
+
+def benchmark(rounds: int) -> None:
+    def timed(collect):
+        collect()  # first sample only primes the CPU counters
+        start = time.perf_counter()
+        for _ in range(rounds):
+            rows = collect()
+        return (time.perf_counter() - start) * 1000 / rounds, len(rows)
+
+    table = ProcTable()
+    procfs_ms, count = timed(table.rows)
+    psutil_ms, _ = timed(ProcessSnapshot(backend="psutil")._psutil_rows)
+    print(f"{count} processes, {rounds} rounds")
+    print(f"  /proc columns: {procfs_ms:8.2f} ms per collection")
+    print(f"  psutil:        {psutil_ms:8.2f} ms per collection ({psutil_ms / procfs_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the /proc reader against psutil.")
+    parser.add_argument("--rounds", type=int, default=20)
+    benchmark(parser.parse_args().rounds)
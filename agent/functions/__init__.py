@@ -0,0 +1,12 @@
+import os
+
+# Modules shared with the backend scanners have a single source in backend/src/scanner.
+# In a source checkout they are imported from there as functions.<name>; the PyInstaller
+# specs copy them into this package for the build (see SHARED in main.spec).
+SHARED_MODULES = ("portspec", "ratelimit", "discovery", "netwatch")
+SCANNER_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            "..", "..", "backend", "src", "scanner"))
+
+if os.path.isdir(SCANNER_DIR):
+    # Ahead of this directory, so a copy left behind by a build never shadows the source
+    __path__.insert(0, SCANNER_DIR)
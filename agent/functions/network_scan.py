@@ -1,12 +1,16 @@
 import ipaddress
-import subprocess
-import platform
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import threading
 import netifaces
-from functions.ports import scan_ports
+from functions.ports import ScanBudget, scan_hosts_iter
+from functions.discovery import iter_alive, sweep
+from functions.netwatch import get_watcher
 
 def get_local_network():
     """Detect the local subnet (e.g. 192.168.1.0/24) automatically."""
+    view = get_watcher().current()
+    if view and view["iface"]:
+        return view["cidr"]
     for interface in netifaces.interfaces():
         addrs = netifaces.ifaddresses(interface)
         if netifaces.AF_INET in addrs:
@@ -23,23 +27,21 @@ def get_local_network():
             return str(network)
     return None
 
-def ping_host(ip):
+def ping_host(ip, timeout=1.0):
     """Ping a single IP to check if it is alive."""
     try:
-        param = "-n" if platform.system().lower() == "windows" else "-c"
-        result = subprocess.run(
-            ["ping", param, "1", str(ip)],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        return result.returncode == 0
+        return bool(sweep([ip], timeout=timeout))
     except Exception:
         return False
 
-def scan_network(network_cidr=None, port_range="1-1024"):
+def scan_network(network_cidr=None, port_range="1-1024", max_inflight=1024, pps=None):
     """
     Scans the entire network for active devices and their open ports.
     If network_cidr is not provided, it will be auto-detected.
+    Discovery and port scanning run as a pipeline: each host is port-scanned as
+    soon as it answers, and all hosts share one budget of connects in flight
+    (max_inflight) and one probe rate controller: pps is its ceiling (unlimited
+    when None), and it backs off when the timeout ratio spikes (see functions.ratelimit).
     """
     if not network_cidr:
         network_cidr = get_local_network()
@@ -49,29 +51,48 @@ def scan_network(network_cidr=None, port_range="1-1024"):
         print(f"[*] Detected local network: {network_cidr}")
 
     network = ipaddress.ip_network(network_cidr, strict=False)
-    active_hosts = []
+    budget = ScanBudget(max_inflight, pps)
 
     print(f"[*] Scanning network {network_cidr} ...")
 
-    with ThreadPoolExecutor(max_workers=50) as executor:
-        futures = {executor.submit(ping_host, ip): ip for ip in network.hosts()}
-        for future in as_completed(futures):
-            ip = futures[future]
-            if future.result():
+    if not port_range:
+        network_results = []
+        for ip in iter_alive(network.hosts(), pacer=budget.delay):
+            print(f"[+] Host {ip} is alive")
+            print(f"[*] Skipping port scan for {ip} (ping-only)")
+            network_results.append({"ip": ip, "ports": []})
+        return network_results
+
+    found = queue.Queue()
+
+    def discover():
+        try:
+            for ip in iter_alive(network.hosts(), pacer=budget.delay):
                 print(f"[+] Host {ip} is alive")
-                active_hosts.append(str(ip))
+                found.put(ip)
+        except Exception as e:
+            print(f"[!] Discovery failed: {e}")
+        finally:
+            found.put(None)
+
+    threading.Thread(target=discover, daemon=True).start()
 
     network_results = []
-    for ip in active_hosts:
-        if port_range:
-            print(f"[*] Scanning ports on {ip}")
-            ports = scan_ports(ip, port_range)
-        else:
-            print(f"[*] Skipping port scan for {ip} (ping-only)")
-            ports = []
-        network_results.append({
-            "ip": ip,
-            "ports": ports
-        })
+    for event in scan_hosts_iter(found, port_range, budget):
+        if event["event"] == "host_done":
+            ip = event["target"]
+            print(f"[*] Finished port scan on {ip}")
+            network_results.append({
+                "ip": ip,
+                "ports": {
+                    "target": ip,
+                    "open_ports": event["open_ports"],
+                    "scanned_range": event["scanned_range"],
+                    "rtt": event["rtt"],
+                },
+            })
 
+    stats = budget.rate.stats()
+    print(f"[*] Probe rate: {stats['achieved_pps']} pps achieved, limit {stats['pps_limit'] or 'none'}, "
+          f"drop rate {stats['drop_rate']}, {stats['backoffs']} backoffs")
     return network_results
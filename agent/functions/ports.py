@@ -1,64 +1,602 @@
 # functions/ports.py
+import errno
+import heapq
+import ipaddress
+import os
+import selectors
 import socket
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Any, List, Tuple
+import queue
+import struct
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
 
-def _check_port(target: str, port: int, timeout: float) -> Tuple[int, bool]:
-    """Return (port, is_open)."""
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.settimeout(timeout)
+from functions.portspec import PortSpec, compile_ports
+from functions.ratelimit import RateController
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+# errno values that mean "connect is in progress" for a non-blocking socket
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", 10035)}
+# errno values that mean "out of local resources, wait for in-flight sockets to drain"
+_RESOURCE_ERRORS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EADDRNOTAVAIL, errno.EAGAIN}
+_WSAECONNREFUSED = getattr(errno, "WSAECONNREFUSED", 10061)
+# SO_LINGER {on, 0s}: close() sends RST instead of FIN, so no TIME_WAIT is left behind
+_LINGER_RST = struct.pack("ii", 1, 0)
+# select() on Windows is limited to 512 sockets per call
+_SELECT_LIMIT = 500
+
+
+def raise_fd_limit() -> Optional[int]:
+    """
+    Raise the soft RLIMIT_NOFILE as far as the hard limit allows, for the whole
+    process, so scans can keep more connects in flight. Called once at agent
+    startup; returns the new soft limit (None where there are no rlimits).
+    """
+    if resource is None:
+        return None
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < hard:
+            want = hard if hard != resource.RLIM_INFINITY else max(soft, 65536)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+            soft = want
+        return soft
+    except (ValueError, OSError):
+        return None
+
+
+def _max_inflight(requested: int) -> int:
+    """Cap the number of in-flight connects by the process file-descriptor limit."""
+    limit = requested
+    if resource is not None:
+        try:
+            soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+            if soft != resource.RLIM_INFINITY:
+                # Leave headroom for the rest of the agent (sockets, files, pipes)
+                limit = min(limit, max(16, soft - 64))
+        except Exception:
+            pass
+    elif selectors.DefaultSelector is selectors.SelectSelector:
+        limit = min(limit, _SELECT_LIMIT)
+    return max(1, limit)
+
+
+class RttEstimator:
+    """
+    Smoothed RTT and variance for one host, kept the same way TCP derives its RTO
+    (RFC 6298). Every connect that gets an answer (SYN-ACK or RST) is a sample.
+    """
+
+    def __init__(self, initial: float = 0.35, floor: float = 0.05, ceiling: float = 2.0):
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def add(self, sample: float) -> None:
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.samples += 1
+
+    def timeout(self) -> float:
+        """Connect timeout: the initial value until the first sample, then SRTT + 4*RTTVAR."""
+        if self.srtt is None:
+            rto = self.initial
+        else:
+            rto = self.srtt + max(0.01, 4 * self.rttvar)
+        return min(self.ceiling, max(self.floor, rto))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "srtt_ms": round(self.srtt * 1000, 3) if self.srtt is not None else None,
+            "rttvar_ms": round(self.rttvar * 1000, 3) if self.rttvar is not None else None,
+            "timeout_ms": round(self.timeout() * 1000, 3),
+            "samples": self.samples,
+        }
+
+
+def _close(sock: socket.socket) -> None:
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RST)
+    except Exception:
+        pass
     try:
-        res = s.connect_ex((target, port))
-        return (port, res == 0)
+        sock.close()
     except Exception:
-        return (port, False)
+        pass
+
+
+def _resolve(target: str) -> Tuple[int, str]:
+    """Return (address family, numeric address) for target."""
+    family, _, _, _, addr = socket.getaddrinfo(target, None, 0, socket.SOCK_STREAM)[0]
+    return family, addr[0]
+
+
+class ScanBudget:
+    """
+    Limits shared by every connect in a scan, however many hosts it covers:
+    connects in flight (capped by RLIMIT_NOFILE) and a probe rate controller
+    (pps ceiling, backing off when timeouts spike; see functions.ratelimit).
+    Thread-safe, so discovery and port scanning can draw on the same budget.
+    """
+
+    def __init__(self, max_inflight: int = 4096, pps: Optional[float] = None,
+                 rate: Optional[RateController] = None):
+        self.max_inflight = _max_inflight(max_inflight)
+        self.rate = rate or RateController(pps)
+
+    def delay(self) -> float:
+        """Take a send token and return 0, or return the seconds until one is available."""
+        return self.rate.delay()
+
+    def record(self, answered: int = 0, timeouts: int = 0) -> None:
+        self.rate.record(answered, timeouts)
+
+
+# Returned by a probe source that has nothing ready yet but is not exhausted
+_WAIT = object()
+
+
+def _connect_loop(next_probe: Callable[[bool], Any], budget: ScanBudget) -> Iterator[Tuple[Any, int, bool]]:
+    """
+    Single-threaded non-blocking connect engine.
+    next_probe(block) returns (key, family, address, port, rtt), _WAIT when the source
+    has nothing ready yet, or None once it is exhausted; block is True when nothing is
+    in flight. Yields (key, port, is_open) as each connect completes, fails or times out.
+    Answered connects feed the probe's RttEstimator, whose timeout applies to new connects.
+    """
+    sel = selectors.DefaultSelector()
+    inflight: Dict[int, Tuple[socket.socket, tuple, int, float]] = {}  # fd -> (sock, probe, seq, started)
+    deadlines: List[Tuple[float, int, int]] = []                      # heap of (deadline, seq, fd)
+    retry: List[tuple] = []
+    max_inflight = budget.max_inflight
+    seq = 0
+    exhausted = False
+
+    try:
+        while True:
+            # --- launch new connects up to the in-flight cap ---
+            throttle = 0.0
+            while (retry or not exhausted) and len(inflight) < max_inflight:
+                if retry:
+                    probe = retry.pop()
+                else:
+                    probe = next_probe(not inflight)
+                    if probe is None:
+                        exhausted = True
+                        break
+                    if probe is _WAIT:
+                        break
+                throttle = budget.delay()
+                if throttle:
+                    retry.append(probe)
+                    break
+                key, family, address, port, rtt = probe
+                try:
+                    s = socket.socket(family, socket.SOCK_STREAM)
+                except OSError as e:
+                    if e.errno in _RESOURCE_ERRORS and inflight:
+                        retry.append(probe)
+                        max_inflight = max(1, len(inflight))
+                        break
+                    raise
+                s.setblocking(False)
+                try:
+                    res = s.connect_ex((address, port))
+                except OSError as e:
+                    res = e.errno
+                if res in _IN_PROGRESS:
+                    seq += 1
+                    fd = s.fileno()
+                    now = time.monotonic()
+                    inflight[fd] = (s, probe, seq, now)
+                    sel.register(fd, selectors.EVENT_WRITE)
+                    heapq.heappush(deadlines, (now + rtt.timeout(), seq, fd))
+                    continue
+                _close(s)
+                if res in _RESOURCE_ERRORS and inflight:
+                    retry.append(probe)
+                    max_inflight = max(1, len(inflight))
+                    break
+                budget.record(answered=1)
+                yield key, port, res == 0
+
+            if not inflight:
+                if exhausted and not retry:
+                    return
+                if throttle:
+                    time.sleep(throttle)
+                continue
+
+            # --- wait for completions until the earliest deadline ---
+            wait = max(0.0, deadlines[0][0] - time.monotonic())
+            if throttle:
+                wait = min(wait, throttle)
+            elif not exhausted and len(inflight) < max_inflight:
+                wait = min(wait, 0.05)  # poll the source for new work
+            for sel_key, _ in sel.select(wait):
+                fd = sel_key.fd
+                s, probe, _, started = inflight.pop(fd)
+                sel.unregister(fd)
+                try:
+                    err = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                except OSError as e:
+                    err = e.errno
+                _close(s)
+                if err == 0 or err == errno.ECONNREFUSED or err == _WSAECONNREFUSED:
+                    probe[4].add(time.monotonic() - started)
+                budget.record(answered=1)
+                yield probe[0], probe[3], err == 0
+
+            # --- expire connects that ran past their deadline ---
+            now = time.monotonic()
+            while deadlines and deadlines[0][0] <= now:
+                _, dseq, fd = heapq.heappop(deadlines)
+                entry = inflight.get(fd)
+                if entry is None or entry[2] != dseq:
+                    continue  # already completed; fd may have been reused
+                del inflight[fd]
+                sel.unregister(fd)
+                _close(entry[0])
+                budget.record(timeouts=1)
+                yield entry[1][0], entry[1][3], False
     finally:
+        for s, *_ in inflight.values():
+            _close(s)
+        sel.close()
+
+
+def _sweep(target: str, ports: Iterable[int], rtt: RttEstimator, budget: ScanBudget) -> Iterator[Tuple[int, bool]]:
+    """Connect sweep of one target. Yields (port, is_open) as results arrive."""
+    family, address = _resolve(target)
+    port_iter = iter(ports)
+
+    def next_probe(_block):
+        port = next(port_iter, None)
+        return None if port is None else (target, family, address, port, rtt)
+
+    for _, port, is_open in _connect_loop(next_probe, budget):
+        yield port, is_open
+
+
+# ---------------- Local socket table ----------------
+# (protocol, path, state that means "accepting") for the kernel's socket tables
+_PROC_NET_TABLES = (
+    ("tcp", "/proc/net/tcp", "0A"),   # TCP_LISTEN
+    ("tcp", "/proc/net/tcp6", "0A"),
+    ("udp", "/proc/net/udp", "07"),   # TCP_CLOSE, i.e. bound but unconnected
+    ("udp", "/proc/net/udp6", "07"),
+)
+
+
+def _decode_proc_addr(hex_addr: str) -> Tuple[str, int]:
+    """Decode '0100007F:0277' style /proc/net addresses (words are in host byte order)."""
+    host, port = hex_addr.split(":")
+    if len(host) == 8:
+        ip = socket.inet_ntop(socket.AF_INET, struct.pack("=I", int(host, 16)))
+    else:
+        words = [int(host[i:i + 8], 16) for i in range(0, 32, 8)]
+        ip = socket.inet_ntop(socket.AF_INET6, struct.pack("=4I", *words))
+    return ip, int(port, 16)
+
+
+def _owners_by_inode(inodes: set) -> Dict[int, Tuple[int, str]]:
+    """Map socket inodes to (pid, process name) by walking /proc/[pid]/fd."""
+    owners: Dict[int, Tuple[int, str]] = {}
+    wanted = {f"socket:[{inode}]": inode for inode in inodes}
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return owners
+    for pid in pids:
+        if len(owners) == len(wanted):
+            break
+        fd_dir = f"/proc/{pid}/fd"
         try:
-            s.close()
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue  # exited, or owned by another user
+        for fd in fds:
+            try:
+                inode = wanted.get(os.readlink(f"{fd_dir}/{fd}"))
+            except OSError:
+                continue
+            if inode is not None and inode not in owners:
+                try:
+                    with open(f"/proc/{pid}/comm") as f:
+                        name = f.read().strip()
+                except OSError:
+                    name = None
+                owners[inode] = (int(pid), name)
+    return owners
+
+
+def _listeners_from_proc() -> Optional[List[Dict[str, Any]]]:
+    listeners = []
+    found_table = False
+    for proto, path, state in _PROC_NET_TABLES:
+        try:
+            with open(path) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        found_table = True
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 10 or fields[3] != state:
+                continue
+            ip, port = _decode_proc_addr(fields[1])
+            listeners.append({"proto": proto, "address": ip, "port": port, "inode": int(fields[9])})
+    if not found_table:
+        return None
+
+    owners = _owners_by_inode({l["inode"] for l in listeners if l["inode"]})
+    for l in listeners:
+        pid, name = owners.get(l.pop("inode"), (None, None))
+        l["pid"] = pid
+        l["process"] = name
+    return listeners
+
+
+def _listeners_from_psutil() -> Optional[List[Dict[str, Any]]]:
+    if not psutil:
+        return None
+    try:
+        conns = psutil.net_connections(kind="inet")
+    except Exception:
+        return None
+    names: Dict[int, Optional[str]] = {}
+    listeners = []
+    for c in conns:
+        if c.type == socket.SOCK_STREAM and c.status == psutil.CONN_LISTEN:
+            proto = "tcp"
+        elif c.type == socket.SOCK_DGRAM and not c.raddr:
+            proto = "udp"
+        else:
+            continue
+        if c.pid is not None and c.pid not in names:
+            try:
+                names[c.pid] = psutil.Process(c.pid).name()
+            except Exception:
+                names[c.pid] = None
+        listeners.append({"proto": proto, "address": c.laddr.ip, "port": c.laddr.port,
+                          "pid": c.pid, "process": names.get(c.pid)})
+    return listeners
+
+
+def list_local_listeners() -> Optional[List[Dict[str, Any]]]:
+    """
+    Return every listening TCP socket and bound UDP socket on this host as
+    {"proto", "address", "port", "pid", "process"}, read in bulk from the kernel's
+    socket tables (/proc/net on Linux, psutil elsewhere). None if unavailable.
+    """
+    listeners = _listeners_from_proc()
+    if listeners is None:
+        listeners = _listeners_from_psutil()
+    return listeners
+
+
+def _local_addresses() -> set:
+    addrs = set()
+    if psutil:
+        try:
+            for info in psutil.net_if_addrs().values():
+                for a in info:
+                    if a.family in (socket.AF_INET, socket.AF_INET6):
+                        addrs.add(a.address.split("%")[0])
         except Exception:
             pass
+    try:
+        addrs.update(socket.gethostbyname_ex(socket.gethostname())[2])
+    except Exception:
+        pass
+    return addrs
 
-def _parse_port_range(port_range: str) -> Tuple[int, int]:
-    """Parse 'start-end' range or single port '80'."""
-    if "-" in port_range:
-        start_str, end_str = port_range.split("-", 1)
-        start, end = int(start_str), int(end_str)
-    else:
-        start = end = int(port_range)
-    if start < 1: start = 1
-    if end > 65535: end = 65535
-    if end < start:
-        start, end = end, start
-    return start, end
 
-def scan_ports(target: str = "127.0.0.1",
-               port_range: str = "1-1024",
-               timeout: float = 0.35,
-               workers: int = 300) -> Dict[str, Any]:
+def _is_local_target(target: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(_resolve(target)[1])
+    except Exception:
+        return False
+    return ip.is_loopback or ip.is_unspecified or str(ip) in _local_addresses()
+
+
+def _reachable_from(listener_addr: str, target_addr: str) -> bool:
+    """Would a connection to target_addr reach a socket bound to listener_addr?"""
+    listener = ipaddress.ip_address(listener_addr.split("%")[0])
+    if listener.is_unspecified:
+        # 0.0.0.0 only serves IPv4; :: serves both on dual-stack hosts
+        return listener.version == 6 or ipaddress.ip_address(target_addr).version == 4
+    return str(listener) == target_addr
+
+
+def _socket_table_events(target: str, spec: PortSpec,
+                         listeners: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """scan_ports_iter events for a local target, answered from the socket table."""
+    address = _resolve(target)[1]
+    reachable = [l for l in listeners if l["port"] in spec and _reachable_from(l["address"], address)]
+    tcp_ports = sorted({l["port"] for l in reachable if l["proto"] == "tcp"})
+    udp_ports = sorted({l["port"] for l in reachable if l["proto"] == "udp"})
+    for port in tcp_ports:
+        yield {"event": "open", "port": port}
+    yield {"event": "done", "target": target, "scanned_range": spec.ranges(),
+           "open_count": len(tcp_ports), "rtt": None, "rate": None, "source": "socket_table",
+           "udp_ports": udp_ports, "listeners": reachable}
+
+
+def scan_ports_iter(target: str = "127.0.0.1",
+                    port_range: Any = "1-1024",
+                    timeout: float = 0.35,
+                    workers: int = 4096,
+                    min_timeout: float = 0.05,
+                    max_timeout: float = 2.0,
+                    progress_every: int = 1024,
+                    pps: Optional[float] = None,
+                    connect_range: Any = None) -> Iterator[Dict[str, Any]]:
     """
-    Scan ports on target and return {"target": target, "open_ports": [...]}.
-    - timeout: seconds per connection attempt
-    - workers: number of threads to use
+    Streaming variant of scan_ports. port_range is a port spec (see functions.portspec:
+    "1-1024", "22,80,443", "top:100", "web,!8080", ...); ports are probed most
+    frequently open first. Yields events as the scan runs:
+    - {"event": "open", "port": p} as soon as a port is found open
+    - {"event": "progress", "scanned": n, "total": t} every `progress_every` ports
+    - {"event": "done", "target", "scanned_range", "open_count", "rtt", "rate"} at the end
+    - {"event": "error", "error": msg} if the scan could not run
+    Local targets are answered from the kernel socket table instead of connecting;
+    their done event also carries "source", "udp_ports" and "listeners".
+    connect_range, if given, replaces port_range when the ports have to be connected
+    to (a wide range is cheap from the socket table, not as a connect sweep).
     """
     try:
-        start, end = _parse_port_range(port_range)
-        total = end - start + 1
-        ports = range(start, end + 1)
-
-        open_ports: List[int] = []
-
-        # Limit workers sensibly
-        max_workers = max(10, min(workers, 1000))
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(_check_port, target, p, timeout): p for p in ports}
-            checked = 0
-            for fut in as_completed(futures):
-                port, is_open = fut.result()
-                checked += 1
-                if is_open:
-                    open_ports.append(port)
-        open_ports.sort()
-        return {"target": target, "open_ports": open_ports, "scanned_range": f"{start}-{end}"}
+        spec = compile_ports(port_range)
+        if _is_local_target(target):
+            listeners = list_local_listeners()
+            if listeners is not None:
+                yield from _socket_table_events(target, spec, listeners)
+                return
+        if connect_range is not None:
+            spec = compile_ports(connect_range)
+        total = len(spec)
+        rtt = RttEstimator(timeout, min_timeout, max_timeout)
+        budget = ScanBudget(workers, pps)
+        scanned = open_count = 0
+        for port, is_open in _sweep(target, spec, rtt, budget):
+            scanned += 1
+            if is_open:
+                open_count += 1
+                yield {"event": "open", "port": port}
+            if progress_every and scanned % progress_every == 0 and scanned < total:
+                yield {"event": "progress", "scanned": scanned, "total": total}
+        yield {"event": "done", "target": target, "scanned_range": spec.ranges(),
+               "open_count": open_count, "rtt": rtt.as_dict(), "rate": budget.rate.stats(),
+               "source": "connect"}
     except Exception as e:
-        return {"error": str(e)}
+        yield {"event": "error", "error": str(e)}
+
+def scan_ports(target: str = "127.0.0.1",
+               port_range: Any = "1-1024",
+               timeout: float = 0.35,
+               workers: int = 4096,
+               min_timeout: float = 0.05,
+               max_timeout: float = 2.0,
+               pps: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Scan ports on target and return {"target": target, "open_ports": [...], "rtt": {...}, "rate": {...}}.
+    port_range takes any port spec understood by scan_ports_iter.
+    Local targets are answered from the socket table (see scan_ports_iter).
+    - timeout: seconds per connection attempt until the host's RTT has been measured
+    - workers: maximum number of connects in flight (capped by RLIMIT_NOFILE)
+    - min_timeout/max_timeout: floor and ceiling for the RTT-derived timeout
+    - pps: probes per second ceiling (unlimited when None; backs off on loss either way)
+    """
+    open_ports: List[int] = []
+    for event in scan_ports_iter(target, port_range, timeout, workers, min_timeout, max_timeout,
+                                 progress_every=0, pps=pps):
+        if event["event"] == "open":
+            open_ports.append(event["port"])
+        elif event["event"] == "error":
+            return {"error": event["error"]}
+        elif event["event"] == "done":
+            open_ports.sort()
+            result = {k: v for k, v in event.items() if k not in ("event", "open_count")}
+            result["open_ports"] = open_ports
+            return result
+    return {"error": "scan ended without a result"}
+
+def scan_hosts_iter(hosts: Any,
+                    port_range: Any = "1-1024",
+                    budget: Optional[ScanBudget] = None,
+                    timeout: float = 0.35,
+                    min_timeout: float = 0.05,
+                    max_timeout: float = 2.0) -> Iterator[Dict[str, Any]]:
+    """
+    Port-scan many hosts through one connect engine and one shared budget.
+    `hosts` is an iterable of addresses, or a queue.Queue fed by another thread and
+    terminated with None, so each host starts scanning the moment it is discovered.
+    Ports of all active hosts are interleaved round-robin. Yields:
+    - {"event": "open", "target", "port"}
+    - {"event": "host_done", "target", "open_ports", "scanned_range", "rtt"}
+    """
+    spec = compile_ports(port_range)
+    budget = budget or ScanBudget()
+    if isinstance(hosts, queue.Queue):
+        def pull(block):
+            try:
+                item = hosts.get(timeout=0.1) if block else hosts.get_nowait()
+            except queue.Empty:
+                return _WAIT
+            return None if item is None else item
+    else:
+        host_iter = iter(hosts)
+
+        def pull(_block):
+            return next(host_iter, None)
+
+    active = deque()           # [target, family, address, port iterator, rtt]
+    state: Dict[str, Dict[str, Any]] = {}
+    finished: List[str] = []
+    source_done = False
+
+    def next_probe(block):
+        nonlocal source_done
+        while not source_done:
+            item = pull(block and not active)
+            if item is _WAIT:
+                break
+            if item is None:
+                source_done = True
+                break
+            target = str(item)
+            try:
+                family, address = _resolve(target)
+            except OSError:
+                continue
+            rtt = RttEstimator(timeout, min_timeout, max_timeout)
+            state[target] = {"pending": 0, "queued": True, "open": [], "rtt": rtt}
+            active.append([target, family, address, iter(spec), rtt])
+            block = False
+        while active:
+            entry = active.popleft()
+            port = next(entry[3], None)
+            if port is None:
+                st = state[entry[0]]
+                st["queued"] = False
+                if st["pending"] == 0:
+                    finished.append(entry[0])
+                continue
+            active.append(entry)
+            state[entry[0]]["pending"] += 1
+            return entry[0], entry[1], entry[2], port, entry[4]
+        return None if source_done else _WAIT
+
+    def drain():
+        while finished:
+            target = finished.pop()
+            st = state.pop(target)
+            yield {"event": "host_done", "target": target, "open_ports": sorted(st["open"]),
+                   "scanned_range": spec.ranges(), "rtt": st["rtt"].as_dict()}
+
+    for target, port, is_open in _connect_loop(next_probe, budget):
+        st = state[target]
+        st["pending"] -= 1
+        if is_open:
+            st["open"].append(port)
+            yield {"event": "open", "target": target, "port": port}
+        if st["pending"] == 0 and not st["queued"]:
+            finished.append(target)
+        yield from drain()
+    yield from drain()
@@ -0,0 +1,103 @@
+# functions/procevents.py
+"""
+Process lifecycle notifications from the Linux proc connector (netlink
+NETLINK_CONNECTOR, CN_IDX_PROC), used by functions/taskmanager.py.
+
+The kernel reports every fork, exec and exit as it happens, so processes that
+live for milliseconds are still seen and the process table can be kept current
+without walking /proc. Subscribing needs CAP_NET_ADMIN (root); ProcConnector()
+raises OSError when it is not available and callers fall back to polling.
+"""
+import errno
+import os
+import socket
+import struct
+from typing import Iterator, Optional, Tuple
+
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC, CN_VAL_PROC = 1, 1
+PROC_CN_MCAST_LISTEN, PROC_CN_MCAST_IGNORE = 1, 2
+PROC_EVENT_FORK, PROC_EVENT_EXEC, PROC_EVENT_EXIT = 0x1, 0x2, 0x80000000
+NLMSG_DONE = 3
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_CN_MSG = struct.Struct("=IIIIHH")       # cb_id (idx, val), seq, ack, len, flags
+_PROC_EVENT = struct.Struct("=IIQ")      # what, cpu, timestamp_ns
+_FORK = struct.Struct("=IIII")           # parent pid, parent tgid, child pid, child tgid
+_EXEC = struct.Struct("=II")             # pid, tgid
+_EXIT = struct.Struct("=IIII")           # pid, tgid, exit code, exit signal
+
+
+class ProcConnector:
+    """
+    Subscription to proc connector events. events() blocks and yields
+      ("fork", pid, parent pid), ("exec", pid, None), ("exit", pid, exit code)
+    for processes (thread group leaders); thread creation and exit are skipped.
+    ("overflow", 0, None) means the kernel dropped events (receive buffer full).
+    events() returns when the socket fails or is closed.
+    """
+
+    def __init__(self):
+        if not hasattr(socket, "AF_NETLINK"):
+            raise OSError("process events need Linux netlink")
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            self.sock.bind((os.getpid(), CN_IDX_PROC))
+            self._control(PROC_CN_MCAST_LISTEN)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _control(self, op: int) -> None:
+        body = struct.pack("=I", op)
+        cn_msg = _CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(body), 0) + body
+        self.sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(cn_msg), NLMSG_DONE, 0, 0, os.getpid()) + cn_msg)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def _parse(self, data: bytes) -> Optional[Tuple[str, int, Optional[int]]]:
+        offset = _NLMSGHDR.size + _CN_MSG.size
+        if len(data) < offset + _PROC_EVENT.size:
+            return None
+        what, _, _ = _PROC_EVENT.unpack_from(data, offset)
+        offset += _PROC_EVENT.size
+        if what == PROC_EVENT_FORK and len(data) >= offset + _FORK.size:
+            _, parent_tgid, child_pid, child_tgid = _FORK.unpack_from(data, offset)
+            if child_pid == child_tgid:
+                return "fork", child_pid, parent_tgid
+        elif what == PROC_EVENT_EXEC and len(data) >= offset + _EXEC.size:
+            pid, tgid = _EXEC.unpack_from(data, offset)
+            if pid == tgid:
+                return "exec", pid, None
+        elif what == PROC_EVENT_EXIT and len(data) >= offset + _EXIT.size:
+            pid, tgid, exit_code, _ = _EXIT.unpack_from(data, offset)
+            if pid == tgid:
+                return "exit", pid, exit_code
+        return None
+
+    def events(self) -> Iterator[Tuple[str, int, Optional[int]]]:
+        while True:
+            try:
+                data = self.sock.recv(1 << 16)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    yield "overflow", 0, None
+                    continue
+                return
+            if not data:
+                return
+            event = self._parse(data)
+            if event is not None:
+                yield event
+
+    def close(self) -> None:
+        try:
+            self._control(PROC_CN_MCAST_IGNORE)
+        except OSError:
+            pass
+        self.sock.close()
@@ -0,0 +1,164 @@
+# functions/procstat.py
+"""
+Linux process table reader for functions/taskmanager.py.
+
+Reads /proc/[pid]/stat for every process through one pre-allocated buffer and
+keeps the results as array-backed columns (pid, ppid, utime, stime, start time,
+rss, name id) instead of a psutil.Process object per process. stat already
+carries the command name and the resident set size, so statm and comm are not
+opened: one open/read/close per process. CPU percents are the tick deltas
+against the previous table, matched by (pid, start time) so a reused pid is
+treated as a new process. bench_procstat.py in the agent directory compares
+it with the psutil path.
+"""
+import os
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+PROC = "/proc"
+READ_SIZE = 4096  # a stat line is ~300 bytes
+COMM_LEN = 15     # the kernel truncates command names to this many bytes
+
+
+def available(proc: str = PROC) -> bool:
+    return os.path.exists(os.path.join(proc, "self", "stat"))
+
+
+def _split_cmdline(data: bytes) -> List[bytes]:
+    args = data.rstrip(b"\0")
+    # Processes that rewrite their title may separate arguments with spaces
+    return args.split(b"\0") if b"\0" in args else args.split(b" ")
+
+
+def _extend_name(comm: bytes, cmdline: Optional[bytes]) -> bytes:
+    if cmdline:
+        exe = os.path.basename(_split_cmdline(cmdline)[0])
+        if exe.startswith(comm):
+            return exe
+    return comm
+
+
+def read_process(pid: int, proc: str = PROC) -> Optional[Dict[str, Any]]:
+    """{pid, ppid, name, cmdline} of one process, or None once it has exited."""
+    try:
+        with open(f"{proc}/{pid}/stat", "rb") as f:
+            data = f.read()
+        with open(f"{proc}/{pid}/cmdline", "rb") as f:
+            cmdline = f.read()
+    except OSError:
+        return None
+    open_paren, close_paren = data.find(b"("), data.rfind(b")")
+    fields = data[close_paren + 2:].split()
+    if len(fields) < 2:
+        return None
+    comm = data[open_paren + 1:close_paren]
+    if len(comm) >= COMM_LEN:
+        comm = _extend_name(comm, cmdline)
+    return {"pid": pid, "ppid": int(fields[1]), "name": comm.decode("utf-8", "replace"),
+            "cmdline": [a.decode("utf-8", "replace") for a in _split_cmdline(cmdline) if a]}
+
+
+class ProcTable:
+    """Column store of the process table, refreshed by sample()."""
+
+    def __init__(self, proc: str = PROC):
+        self.proc = proc
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self._buf = bytearray(READ_SIZE)
+        self._view = memoryview(self._buf)
+        self.names: List[str] = []          # name id -> name
+        self._name_ids: Dict[bytes, int] = {}
+        self.pid = array("i")
+        self.ppid = array("i")
+        self.utime = array("Q")
+        self.stime = array("Q")
+        self.start = array("Q")
+        self.rss = array("Q")                 # pages
+        self.name_id = array("I")
+        self.cpu_percent = array("d")
+        self._stamp: Optional[float] = None
+        self._index: Dict[tuple, int] = {}  # (pid, start) -> row of the previous sample
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None  # exited, or not readable
+        try:
+            n = os.readv(fd, [self._buf])
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+        return self._view[:n].tobytes()
+
+    def _full_name(self, entry: str, comm: bytes) -> bytes:
+        """comm is cut to 15 bytes; extend it from the executable path like psutil does."""
+        if len(comm) < COMM_LEN:
+            return comm
+        return _extend_name(comm, self._read(f"{self.proc}/{entry}/cmdline"))
+
+    def _name(self, raw: bytes) -> int:
+        name_id = self._name_ids.get(raw)
+        if name_id is None:
+            name_id = self._name_ids[raw] = len(self.names)
+            self.names.append(raw.decode("utf-8", "replace"))
+        return name_id
+
+    def memory_total(self) -> int:
+        with open(os.path.join(self.proc, "meminfo"), "rb") as f:
+            for line in f:
+                if line.startswith(b"MemTotal:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def sample(self) -> None:
+        """Read every process and compute CPU percents against the previous sample."""
+        pid, ppid = array("i"), array("i")
+        utime, stime, start, rss = array("Q"), array("Q"), array("Q"), array("Q")
+        name_id = array("I")
+        for entry in os.listdir(self.proc):
+            if not entry.isdigit():
+                continue
+            data = self._read(f"{self.proc}/{entry}/stat")
+            if not data:
+                continue
+            # "pid (comm) state ppid ..."; comm may itself contain spaces and parens
+            open_paren, close_paren = data.find(b"("), data.rfind(b")")
+            fields = data[close_paren + 2:].split()
+            if len(fields) < 22:
+                continue
+            pid.append(int(entry))
+            ppid.append(int(fields[1]))
+            utime.append(int(fields[11]))
+            stime.append(int(fields[12]))
+            start.append(int(fields[19]))
+            rss.append(int(fields[21]))
+            name_id.append(self._name(self._full_name(entry, data[open_paren + 1:close_paren])))
+
+        now = time.monotonic()
+        ticks = [u + s for u, s in zip(utime, stime)]
+        cpu = array("d", bytes(8 * len(pid)))
+        if self._stamp is not None and now > self._stamp:
+            scale = 100.0 / (self.clock_ticks * (now - self._stamp))
+            prev_ticks = [u + s for u, s in zip(self.utime, self.stime)]
+            rows = [self._index.get(key) for key in zip(pid, start)]
+            cpu = array("d", (round((t - prev_ticks[r]) * scale, 1) if r is not None else 0.0
+                              for t, r in zip(ticks, rows)))
+
+        self.pid, self.ppid, self.utime, self.stime = pid, ppid, utime, stime
+        self.start, self.rss, self.name_id, self.cpu_percent = start, rss, name_id, cpu
+        self._index = {key: i for i, key in enumerate(zip(pid, start))}
+        self._stamp = now
+
+    def rows(self) -> Dict[int, Dict[str, Any]]:
+        """Sample, then {pid: {pid, name, cpu_percent, memory_percent}} as taskmanager reports it."""
+        self.sample()
+        scale = self.page_size * 100.0 / (self.memory_total() or 1)
+        names = self.names
+        return {p: {"pid": p, "name": names[n], "cpu_percent": c, "memory_percent": round(r * scale, 2)}
+                for p, n, c, r in zip(self.pid, self.name_id, self.cpu_percent, self.rss)
+                if names[n]}
+
@@ -55,22 +55,43 @@ def send_data(data_type, payload):
             else:
                 payload = {"connected_devices": devices}
 
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "agentId": AGENT_ID,
-            "type": data_type,
-            "data": payload,
-        }
-
-        send_queue.put(entry)  # Always queue the data
-        if sio.connected:
-            flush_queue()  # Try sending immediately
-        else:
-            logging.info(f"[ℹ️] Socket not connected. Queued data: {data_type}")
+        _enqueue(_make_entry(data_type, payload))
 
     except Exception as e:
         logging.error(f"[❌] Failed to enqueue {data_type}: {e}")
 
+def send_chunk(data_type, payload, stream_id, seq, final=False, started=None):
+    """
+    Send one part of a streamed result. The backend merges chunks that share
+    stream_id; the chunk with final=True marks the result as complete. `started`
+    (epoch seconds) lets it ignore late chunks of an older stream.
+    """
+    try:
+        entry = _make_entry(data_type, payload)
+        entry["chunk"] = {"id": stream_id, "seq": seq, "final": final, "started": started}
+        _enqueue(entry)
+    except Exception as e:
+        logging.error(f"[❌] Failed to enqueue {data_type} chunk {seq}: {e}")
+
+def on_server_event(event, handler):
+    """Register a handler for a message the backend sends back on this connection."""
+    sio.on(event, handler)
+
+def _make_entry(data_type, payload):
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "agentId": AGENT_ID,
+        "type": data_type,
+        "data": payload,
+    }
+
+def _enqueue(entry):
+    send_queue.put(entry)  # Always queue the data
+    if sio.connected:
+        flush_queue()  # Try sending immediately
+    else:
+        logging.info(f"[ℹ️] Socket not connected. Queued data: {entry['type']}")
+
 def start_queue_worker():
     """Background thread to retry sending data every few seconds."""
     def worker():
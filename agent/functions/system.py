@@ -1,10 +1,16 @@
 # functions/system.py
+import copy
+import hashlib
+import json
 import platform
 import socket
+import threading
+import time
 import uuid
 import getpass
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from functions.netwatch import current as current_network_view, get_watcher as get_network_watcher
 
 try:
     import psutil
@@ -17,14 +23,12 @@ except Exception:
     load_dotenv = None
 
 def _get_ip_address() -> str:
+    # Cached view of the default-route interface; see functions/netwatch.py
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
+        view = current_network_view()
     except Exception:
-        return "unknown"
+        view = None
+    return view["ip"] if view else "unknown"
 
 def _get_wlan_interfaces() -> List[Dict[str, Any]]:
     wlan_list = []
@@ -48,79 +52,220 @@ def _get_wlan_interfaces() -> List[Dict[str, Any]]:
         pass
     return wlan_list
 
-def _get_cpu_info() -> Dict[str, Any]:
+# ---- Field groups ----
+# Each group is rebuilt on its own schedule; "static" groups make up the inventory
+# that is only resent when its hash changes (see SystemInfoReport).
+IDENTITY_TTL = 3600.0    # platform strings, machine id, user
+HARDWARE_TTL = 600.0     # core counts, total RAM, disk partitions
+NETWORK_TTL = 300.0      # WLAN interfaces and IP; also refreshed on topology change
+DISK_USAGE_TTL = 60.0    # per-partition usage
+METRICS_TTL = 0.0        # memory use and CPU clock, every cycle
+
+def _get_identity() -> Dict[str, Any]:
+    return {
+        "agent_id": platform.node(),
+        "hostname": socket.gethostname(),
+        "os_type": platform.system(),
+        "os_version": platform.version(),
+        "os_release": platform.release(),
+        "users": [getpass.getuser()],
+        "machine_id": str(uuid.getnode()),
+    }
+
+def _get_hardware_info() -> Dict[str, Any]:
     if not psutil:
-        return {}
+        return {"cpu": {}, "memory": {}, "disk": {}}
+    info = {"cpu": {}, "memory": {}, "disk": {}}
     try:
-        freq = psutil.cpu_freq()
-        return {
+        info["cpu"] = {
             "physical_cores": psutil.cpu_count(logical=False),
             "logical_cores": psutil.cpu_count(logical=True),
-            "cpu_freq_mhz": round(freq.current if freq else 0, 2),
         }
+        info["memory"] = {"total_ram": psutil.virtual_memory().total}
     except Exception:
-        return {}
+        pass
+    try:
+        for part in psutil.disk_partitions(all=False):
+            try:
+                info["disk"][part.device] = {
+                    "mountpoint": part.mountpoint,
+                    "fstype": part.fstype,
+                    "total": psutil.disk_usage(part.mountpoint).total,
+                }
+            except Exception:
+                continue
+    except Exception:
+        pass
+    return info
 
-def _get_memory_info() -> Dict[str, Any]:
+def _get_network_info() -> Dict[str, Any]:
+    return {"wlan_info": _get_wlan_interfaces(), "ip": _get_ip_address()}
+
+def _get_metrics() -> Dict[str, Any]:
     if not psutil:
         return {}
     try:
+        freq = psutil.cpu_freq()
         mem = psutil.virtual_memory()
         return {
-            "total_ram": getattr(mem, "total", None),
-            "available_ram": getattr(mem, "available", None),
-            "used_ram": getattr(mem, "used", None),
-            "ram_percent": getattr(mem, "percent", None),
+            "cpu": {"cpu_freq_mhz": round(freq.current if freq else 0, 2)},
+            "memory": {
+                "available_ram": getattr(mem, "available", None),
+                "used_ram": getattr(mem, "used", None),
+                "ram_percent": getattr(mem, "percent", None),
+            },
         }
     except Exception:
         return {}
 
-def _get_disk_info() -> Dict[str, Any]:
-    disks = {}
+def _hardware_fingerprint() -> tuple:
+    """Cheap per-cycle view of what the hardware group describes, to spot hotplug."""
     if not psutil:
-        return disks
+        return ()
     try:
-        for part in psutil.disk_partitions(all=False):
+        parts = tuple(sorted((p.device, p.mountpoint) for p in psutil.disk_partitions(all=False)))
+        return parts, psutil.cpu_count(logical=True), psutil.virtual_memory().total
+    except Exception:
+        return ()
+
+def _network_fingerprint() -> tuple:
+    """Interfaces and their addresses; changes with a new NIC, DHCP renewal or roaming."""
+    if not psutil:
+        return ()
+    try:
+        return tuple(sorted((name, tuple(sorted(a.address for a in addrs)))
+                            for name, addrs in psutil.net_if_addrs().items()))
+    except Exception:
+        return ()
+
+def _merge(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in src.items():
+        if isinstance(value, dict) and isinstance(dst.get(key), dict):
+            _merge(dst[key], value)
+        else:
+            dst[key] = copy.deepcopy(value)
+    return dst
+
+class SystemInfoCache:
+    """
+    Field groups with their own refresh intervals; a group can also be invalidated.
+    Static groups are additionally invalidated when their fingerprint changes, which
+    is checked every refresh() (the rtnetlink watcher only exists on Linux).
+    """
+
+    def __init__(self):
+        self.groups = {
+            # name: (builder, ttl, static)
+            "identity": (_get_identity, IDENTITY_TTL, True),
+            "hardware": (_get_hardware_info, HARDWARE_TTL, True),
+            "network": (_get_network_info, NETWORK_TTL, True),
+            "disk_usage": (self._get_disk_usage, DISK_USAGE_TTL, False),
+            "metrics": (_get_metrics, METRICS_TTL, False),
+        }
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._stamps: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.fingerprints = {"hardware": _hardware_fingerprint, "network": _network_fingerprint}
+        self._prints: Dict[str, tuple] = {}
+        try:
+            get_network_watcher().subscribe(lambda old, new: self.invalidate("network"))
+        except Exception as e:
+            print(f"[⚠️] Network change notifications unavailable ({e}); using interface fingerprints.")
+
+    def _get_disk_usage(self) -> Dict[str, Any]:
+        disks = {}
+        if not psutil:
+            return {"disk": disks}
+        for device, part in self._values.get("hardware", {}).get("disk", {}).items():
             try:
-                usage = psutil.disk_usage(part.mountpoint)
-                disks[part.device] = {
-                    "mountpoint": part.mountpoint,
-                    "fstype": part.fstype,
-                    "total": usage.total,
-                    "used": usage.used,
-                    "free": usage.free,
-                    "percent": usage.percent,
-                }
+                usage = psutil.disk_usage(part["mountpoint"])
             except Exception:
+                self.invalidate("hardware")  # unmounted or removed
                 continue
-    except Exception:
-        pass
-    return disks
+            disks[device] = {"used": usage.used, "free": usage.free, "percent": usage.percent}
+        return {"disk": disks}
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._stamps.pop(name, None)
+
+    def refresh(self) -> List[str]:
+        """Rebuild the groups that are due, in order; returns their names."""
+        for name, fingerprint in self.fingerprints.items():
+            value = fingerprint()
+            if self._prints.get(name, value) != value:
+                self.invalidate(name)
+            self._prints[name] = value
+        refreshed = []
+        for name, (build, ttl, _) in self.groups.items():
+            with self._lock:
+                stamp = self._stamps.get(name)
+            if stamp is not None and time.monotonic() - stamp < ttl:
+                continue
+            value = build()
+            with self._lock:
+                self._values[name], self._stamps[name] = value, time.monotonic()
+                if name == "hardware":
+                    self._stamps.pop("disk_usage", None)  # cover added or removed disks now
+            refreshed.append(name)
+        return refreshed
+
+    def snapshot(self, names: Optional[List[str]] = None, static: Optional[bool] = None) -> Dict[str, Any]:
+        """Merged fields of the named groups (default all), optionally only static/dynamic ones."""
+        data: Dict[str, Any] = {}
+        for name, (_, _, is_static) in self.groups.items():
+            if (names is None or name in names) and (static is None or static == is_static):
+                _merge(data, self._values.get(name, {}))
+        return data
+
+_cache = None
+
+def _get_cache() -> SystemInfoCache:
+    global _cache
+    if _cache is None:
+        _cache = SystemInfoCache()
+    return _cache
 
 def get_system_info() -> Dict[str, Any]:
     """
     Return a dictionary with host/system information.
     Safe to call on non-Windows systems; psutil may be required for richer data.
+    Field groups are cached with their own refresh intervals (see SystemInfoCache).
     """
     try:
-        data = {
-            "agent_id": platform.node(),
-            "hostname": socket.gethostname(),
-            "os_type": platform.system(),
-            "os_version": platform.version(),
-            "os_release": platform.release(),
-            "cpu": _get_cpu_info(),
-            "memory": _get_memory_info(),
-            "disk": _get_disk_info(),
-            "users": [getpass.getuser()],
-            "machine_id": str(uuid.getnode()),
-            "wlan_info": _get_wlan_interfaces(),
-            "ip": _get_ip_address(),
-        }
-        return data
+        cache = _get_cache()
+        cache.refresh()
+        return cache.snapshot()
     except Exception as e:
         return {"error": str(e)}
 
+class SystemInfoReport:
+    """
+    Builds the system_info messages for the backend. The static inventory is sent
+    with a hash, and again only when that hash changes or the backend asks
+    (request_static); other messages carry {"partial": True, "static_hash", ...}
+    and just the dynamic groups refreshed this cycle.
+    """
+
+    def __init__(self, cache: Optional[SystemInfoCache] = None):
+        self.cache = cache or _get_cache()
+        self._sent_hash = None
+
+    def request_static(self, *_):
+        self._sent_hash = None
+
+    def message(self) -> Dict[str, Any]:
+        try:
+            refreshed = self.cache.refresh()
+            static = self.cache.snapshot(static=True)
+            digest = hashlib.sha1(json.dumps(static, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            if digest != self._sent_hash:
+                self._sent_hash = digest
+                return {**self.cache.snapshot(), "static_hash": digest}
+            return {**self.cache.snapshot(refreshed, static=False), "partial": True, "static_hash": digest}
+        except Exception as e:
+            return {"error": str(e)}
+
 def load_agent_from_env(env_path: str = None) -> Dict[str, str]:
     """
     Helper to load AGENT_ID/AGENT_NAME from environment or a .env file.
@@ -1,7 +1,13 @@
 # functions/taskmanager.py
+import threading
 import time
 import traceback
-from typing import Dict, Any, List
+import uuid
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from functions.procevents import ProcConnector
+from functions.procstat import PROC, ProcTable, available as procfs_available, read_process
 
 try:
     import psutil
@@ -56,59 +62,272 @@ def get_background_processes() -> List[tuple]:
             continue
     return bg_processes
 
-def collect_process_info(measure_interval: float = 1.0) -> Dict[str, Any]:
+# ---- Process events ----
+STATS_INTERVAL = 30.0  # seconds between full stat polls while process events keep the table current
+EXEC_BACKLOG = 1000    # exec events kept for forwarding; the oldest are dropped first
+
+class ProcessEvents:
     """
-    Collect foreground (visible window) apps and background processes with CPU & memory percents.
-    - measure_interval: seconds to wait between cpu_percent() initialisation and reading.
+    Process births and deaths from the proc connector (functions/procevents.py),
+    accumulated until the next take(), plus a stream of exec events. Raises
+    OSError when the connector is not available (no root, not Linux). `alive`
+    turns false when the reader thread stops.
     """
-    output = {"applications": [], "background_processes": []}
-    if not psutil:
-        return output
 
-    try:
-        # initialize CPU counters
-        for proc in psutil.process_iter():
-            try:
-                proc.cpu_percent(interval=None)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        time.sleep(measure_interval)  # measure CPU usage over interval
+    def __init__(self, proc: str = PROC):
+        self.proc = proc
+        self.connector = ProcConnector()
+        self._lock = threading.Lock()
+        self._born: Dict[int, str] = {}
+        self._dead = set()
+        self._lost = False  # events were dropped since the previous take()
+        self._execs = deque(maxlen=EXEC_BACKLOG)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
 
-        # Foreground apps
-        for pid, title in get_visible_windows():
-            try:
-                proc = psutil.Process(pid)
-                name = proc.name()
-                if not name:
-                    continue
-                output["applications"].append({
-                    "pid": pid,
-                    "name": name,
-                    "title": title,
-                    "cpu_percent": proc.cpu_percent(),
-                    "memory_percent": round(proc.memory_percent(), 2)
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self):
+        try:
+            self._read_events()
+        except Exception:
+            traceback.print_exc()
+
+    def _read_events(self):
+        for kind, pid, arg in self.connector.events():
+            if kind == "overflow":
+                with self._lock:
+                    self._lost = True
                 continue
-            except Exception:
+            if kind == "exit":
+                with self._lock:
+                    self._born.pop(pid, None)
+                    self._dead.add(pid)
                 continue
+            info = read_process(pid, self.proc)
+            if info is None:
+                continue  # already gone; the exit event follows
+            with self._lock:
+                self._born[pid] = info["name"]
+                self._dead.discard(pid)
+                if kind == "exec":
+                    self._execs.append({**info, "timestamp": time.time()})
 
-        # Background processes
-        for pid, name in get_background_processes():
+    def take(self) -> tuple:
+        """({pid: name} born or exec'd, {pid} exited, events lost) since the previous take()."""
+        with self._lock:
+            born, dead, lost = self._born, self._dead, self._lost
+            self._born, self._dead, self._lost = {}, set(), False
+        return born, dead, lost
+
+    def close(self) -> None:
+        self.connector.close()
+
+    def exec_events(self) -> List[Dict[str, Any]]:
+        """Exec events since the previous call: {pid, ppid, name, cmdline, timestamp}."""
+        with self._lock:
+            events = list(self._execs)
+            self._execs.clear()
+        return events
+
+class ProcessSnapshot:
+    """
+    Process table sampler that lives as long as the agent, so CPU percents cover
+    the time since the previous collect() and no priming sleep is needed (the
+    first collect() reports 0.0). Foreground/background is decided against a
+    single window enumeration.
+
+    Backends: "procfs" (Linux, functions/procstat.py: /proc read into columns)
+    or "psutil" (one process_iter(attrs=...) oneshot pass; process_iter keeps its
+    Process objects between calls). The default picks procfs where /proc exists.
+
+    With procfs and the proc connector available (root), process starts and exits
+    are applied from events every collect() and the full stat poll only runs every
+    `stats_interval` seconds; new processes show 0.0 CPU and memory until then.
+    Otherwise every collect() polls. `proc` is where procfs is mounted.
+    """
+
+    ATTRS = ["pid", "name", "cpu_percent", "memory_info"]
+
+    def __init__(self, backend: Optional[str] = None, stats_interval: float = STATS_INTERVAL,
+                 proc: str = PROC):
+        if backend is None:
+            backend = "procfs" if procfs_available(proc) else "psutil"
+        self.backend = backend
+        self.stats_interval = stats_interval
+        self._table = ProcTable(proc) if backend == "procfs" else None
+        self.events = None
+        if self._table is not None:
             try:
-                proc = psutil.Process(pid)
-                output["background_processes"].append({
-                    "pid": pid,
-                    "name": name,
-                    "cpu_percent": proc.cpu_percent(),
-                    "memory_percent": round(proc.memory_percent(), 2)
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-            except Exception:
+                self.events = ProcessEvents(proc)
+            except OSError:
+                pass  # polling only
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._polled = None
+
+    def _event_rows(self) -> Dict[int, Dict[str, Any]]:
+        """Rows of the last full poll, with the processes born and exited since applied."""
+        now = time.monotonic()
+        born, dead, lost = self.events.take()
+        if lost or self._polled is None or now - self._polled >= self.stats_interval:
+            # The poll sees every process the events described (or missed)
+            self._rows, self._polled = self._table.rows(), now
+            return self._rows
+        for pid in dead:
+            self._rows.pop(pid, None)
+        for pid, name in born.items():
+            row = self._rows.get(pid)
+            if row:
+                self._rows[pid] = {**row, "name": name}  # exec
+            elif name:
+                self._rows[pid] = {"pid": pid, "name": name, "cpu_percent": 0.0, "memory_percent": 0.0}
+        return self._rows
+
+    def _psutil_rows(self) -> Dict[int, Dict[str, Any]]:
+        # memory_percent() re-reads total memory per process; read it once per cycle
+        total_memory = psutil.virtual_memory().total
+        rows = {}
+        for proc in psutil.process_iter(self.ATTRS, ad_value=None):
+            info = proc.info
+            if not info["name"] or info["cpu_percent"] is None or info["memory_info"] is None:
                 continue
+            rows[info["pid"]] = {
+                "pid": info["pid"],
+                "name": info["name"],
+                "cpu_percent": info["cpu_percent"],
+                "memory_percent": round(info["memory_info"].rss * 100.0 / total_memory, 2),
+            }
+        return rows
+
+    def collect(self) -> Dict[str, Any]:
+        output = {"applications": [], "background_processes": []}
+        windows = get_visible_windows()
+        visible_pids = {pid for pid, _ in windows}
+        if self.events is not None and not self.events.alive:
+            print("[⚠️] Process event reader stopped; polling the process table every cycle.")
+            self.events.close()
+            self.events = None
+        if self.events is not None:
+            rows = self._event_rows()
+        else:
+            rows = self._table.rows() if self._table else self._psutil_rows()
 
+        for pid, title in windows:
+            row = rows.get(pid)
+            if row:
+                output["applications"].append({"pid": pid, "name": row["name"], "title": title,
+                                               "cpu_percent": row["cpu_percent"],
+                                               "memory_percent": row["memory_percent"]})
+        output["background_processes"] = [row for pid, row in rows.items() if pid not in visible_pids]
         return output
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def _get_snapshot() -> ProcessSnapshot:
+    # run_scans and the exec forwarder thread both get here first on startup
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = ProcessSnapshot()
+        return _snapshot
+
+def collect_process_info() -> Dict[str, Any]:
+    """
+    Collect foreground (visible window) apps and background processes with CPU & memory percents.
+    CPU percents cover the interval since the previous call (see ProcessSnapshot).
+    """
+    if not psutil and not procfs_available():
+        return {"applications": [], "background_processes": []}
+
+    try:
+        return _get_snapshot().collect()
     except Exception as e:
         traceback.print_exc()
         return {"error": str(e)}
+
+def exec_events() -> List[Dict[str, Any]]:
+    """Processes exec'd since the previous call ([] without the proc connector)."""
+    if not procfs_available():
+        return []
+    events = _get_snapshot().events
+    return events.exec_events() if events else []
+
+# ---- Delta reporting ----
+CPU_THRESHOLD = 2.0      # percentage points of CPU before a process counts as changed
+MEMORY_THRESHOLD = 0.5   # percentage points of memory
+KEYFRAME_EVERY = 30      # cycles between full task_info messages
+
+def _row_key(section: str, row: Dict[str, Any]) -> tuple:
+    # A process can own several windows, so applications are keyed by (pid, title)
+    return (row["pid"], row.get("title")) if section == "applications" else row["pid"]
+
+class TaskInfoDelta:
+    """
+    Remembers the last process table sent to the backend and turns each collection
+    into either a full "task_info" keyframe or a "task_info_delta":
+
+      {keyframe_id, seq,
+       applications:         {started: [row], exited: [[pid, title]], changed: [row]},
+       background_processes: {started: [row], exited: [pid],          changed: [row]}}
+
+    A process is "changed" once its CPU or memory moved past the threshold from
+    the value last sent, or its name changed (exec). A keyframe goes out every `keyframe_every` cycles and
+    after request_keyframe() (the backend asks when a delta does not apply). request_keyframe()
+    runs on the socket thread and message() on the scan thread, so both take the lock.
+    """
+
+    SECTIONS = ("applications", "background_processes")
+
+    def __init__(self, cpu_threshold: float = CPU_THRESHOLD, memory_threshold: float = MEMORY_THRESHOLD,
+                 keyframe_every: int = KEYFRAME_EVERY):
+        self.cpu_threshold = cpu_threshold
+        self.memory_threshold = memory_threshold
+        self.keyframe_every = keyframe_every
+        self.keyframe_id = None
+        self.seq = 0
+        self._sent = {}  # section -> {key: row as last sent}
+        self._lock = threading.Lock()
+
+    def request_keyframe(self, *_):
+        with self._lock:
+            self.keyframe_id = None
+
+    def _moved(self, old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+        return (new["name"] != old["name"]
+                or abs((new["cpu_percent"] or 0) - (old["cpu_percent"] or 0)) >= self.cpu_threshold
+                or abs((new["memory_percent"] or 0) - (old["memory_percent"] or 0)) >= self.memory_threshold)
+
+    def message(self, data: Dict[str, Any]) -> tuple:
+        """(message type, payload) to send for this collection."""
+        with self._lock:
+            return self._message(data)
+
+    def _message(self, data: Dict[str, Any]) -> tuple:
+        if "error" in data:
+            self.keyframe_id = None
+            return "task_info", data
+
+        if self.keyframe_id is None or self.seq >= self.keyframe_every:
+            self.keyframe_id = uuid.uuid4().hex[:12]
+            self.seq = 0
+            self._sent = {s: {_row_key(s, r): r for r in data.get(s, [])} for s in self.SECTIONS}
+            return "task_info", {**data, "keyframe_id": self.keyframe_id, "seq": 0}
+
+        self.seq += 1
+        delta = {"keyframe_id": self.keyframe_id, "seq": self.seq}
+        for section in self.SECTIONS:
+            sent = self._sent[section]
+            current = {_row_key(section, r): r for r in data.get(section, [])}
+            started = [r for k, r in current.items() if k not in sent]
+            exited = [list(k) if isinstance(k, tuple) else k for k in sent if k not in current]
+            changed = [r for k, r in current.items() if k in sent and self._moved(sent[k], r)]
+            for k in exited:
+                sent.pop(tuple(k) if isinstance(k, list) else k)
+            for r in started + changed:
+                sent[_row_key(section, r)] = r
+            delta[section] = {"started": started, "exited": exited, "changed": changed}
+        return "task_info_delta", delta
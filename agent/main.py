@@ -1,15 +1,23 @@
 import time
+import uuid
 import traceback
 import threading
 import pythoncom
 
-from functions.system import get_system_info
-from functions.ports import scan_ports
-from functions.taskmanager import collect_process_info
+from functions.system import SystemInfoReport
+from functions.ports import raise_fd_limit, scan_ports_iter
+from functions.taskmanager import collect_process_info, exec_events, TaskInfoDelta
 from functions.installed_apps import get_installed_apps
-from functions.sender import send_data
+from functions.sender import send_data, send_chunk, on_server_event
 from functions.usbMonitor import monitor_usb, connect_socket, sio
 
+# Only process churn is sent between full task_info keyframes
+task_delta = TaskInfoDelta()
+on_server_event("task_info_keyframe", task_delta.request_keyframe)
+# The static system inventory is only resent when it changes
+system_report = SystemInfoReport()
+on_server_event("system_info_static", system_report.request_static)
+
 
 def start_usb_monitor():
     """
@@ -34,26 +42,79 @@ def start_usb_monitor():
         pythoncom.CoUninitialize()
 
 
+def forward_exec_events(interval=5.0):
+    """
+    Ship the processes started since the last batch (proc connector exec events,
+    Linux with root only), including ones that exit before the next task_info.
+    """
+    while True:
+        try:
+            events = exec_events()
+            if events:
+                send_data("process_exec", {"events": events})
+        except Exception as e:
+            print(f"[❌] Exec event forwarding failed: {e}")
+        time.sleep(interval)
+
+
+def stream_port_scan(target, port_range, chunk_size=32, flush_interval=1.0, connect_range=None):
+    """
+    Scan ports and ship open ports to the backend as partial port_scan chunks,
+    so nothing waits for (or holds) the full result. Returns the open port count.
+    connect_range is scanned instead when the ports have to be connected to.
+    A scan that fails ends its stream with a final chunk carrying the error.
+    """
+    stream_id = uuid.uuid4().hex
+    started = time.time()
+    seq = 0
+    sent = 0
+    batch = []
+    last_flush = time.monotonic()
+
+    for event in scan_ports_iter(target, port_range, connect_range=connect_range):
+        kind = event["event"]
+        if kind == "open":
+            batch.append(event["port"])
+        elif kind == "error":
+            print(f"[❌] Port scan failed: {event['error']}")
+            final = {"target": target, "open_ports": batch, "error": event["error"]}
+            send_chunk("port_scan", final, stream_id, seq, final=True, started=started)
+            return sent + len(batch)
+        elif kind == "done":
+            final = {k: v for k, v in event.items() if k not in ("event", "open_count")}
+            final["open_ports"] = batch
+            send_chunk("port_scan", final, stream_id, seq, final=True, started=started)
+            return event["open_count"]
+
+        if batch and (len(batch) >= chunk_size or time.monotonic() - last_flush >= flush_interval):
+            send_chunk("port_scan", {"target": target, "open_ports": batch}, stream_id, seq, started=started)
+            seq += 1
+            sent += len(batch)
+            batch = []
+            last_flush = time.monotonic()
+    return 0
+
+
 def run_scans():
     print("[⚙️] Running all scans...")
 
     try:
         # --- 1. System Info ---
         print("[🧠] Collecting system information...")
-        sys_info = get_system_info()
-        send_data("system_info", sys_info)
+        send_data("system_info", system_report.message())
         print("    ✔ System info collected and sent.")
 
         # --- 2. Port Scan ---
-        print("[🌐] Scanning ports 1-1024 on localhost...")
-        port_data = scan_ports("127.0.0.1", "1-1024")
-        send_data("port_scan", port_data)
-        print("    ✔ Port scan completed and sent.")
+        # Localhost is answered from the kernel socket table, so the full range is cheap;
+        # without the table (no access) it falls back to connecting to 1-1024 only
+        print("[🌐] Scanning ports on localhost...")
+        open_count = stream_port_scan("127.0.0.1", "1-65535", connect_range="1-1024")
+        print(f"    ✔ Port scan completed and sent ({open_count} open).")
 
         # --- 3. Task Manager ---
         print("[🧩] Collecting running processes...")
         process_data = collect_process_info()
-        send_data("task_info", process_data)
+        send_data(*task_delta.message(process_data))
         print("    ✔ Process info collected and sent.")
 
         # --- 4. Installed Apps ---
@@ -75,11 +136,16 @@ def run_scans():
 
 
 if __name__ == "__main__":
+    # Port scans size their in-flight connects by the open-file limit
+    raise_fd_limit()
+
     # Start USB monitor in background thread
     usb_thread = threading.Thread(target=start_usb_monitor, daemon=True)
     usb_thread.start()
     print("[ℹ️] USB monitor thread started.")
 
+    threading.Thread(target=forward_exec_events, daemon=True).start()
+
     # Main scan loop
     while True:
         run_scans()
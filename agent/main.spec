@@ -1,4 +1,14 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import shutil
+
+# Modules shared with the backend scanners live in backend/src/scanner; copy them
+# into functions/ for the build and remove the copies afterwards
+SHARED = ('portspec', 'ratelimit', 'discovery', 'netwatch')
+SCANNER = os.path.join(SPECPATH, '..', 'backend', 'src', 'scanner')
+staged = [os.path.join(SPECPATH, 'functions', f'{name}.py') for name in SHARED]
+for name, path in zip(SHARED, staged):
+    shutil.copyfile(os.path.join(SCANNER, f'{name}.py'), path)
 
 
 a = Analysis(
@@ -36,3 +46,6 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+for path in staged:
+    os.remove(path)
@@ -8,7 +8,7 @@ import os
 from pathlib import Path
 
 # Import agent functions
-from functions.ports import scan_ports
+from functions.ports import raise_fd_limit, scan_ports
 from functions.sender import send_scan_results, set_base_api_url
 from functions.system import get_system_info
 from functions.taskmanager import collect_process_info
@@ -310,5 +310,7 @@ class RunPage(ttk.Frame):
 
 # ---------- Run ----------
 if __name__ == "__main__":
+    # Port scans size their in-flight connects by the open-file limit
+    raise_fd_limit()
     app = WizardApp()
     app.mainloop()
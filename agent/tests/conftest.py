@@ -0,0 +1,43 @@
+import os
+import sys
+
+# The agent imports its modules as functions.<name> from the agent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+class FakeProc:
+    """A procfs tree with the files functions/procstat.py reads: [pid]/stat, [pid]/cmdline, meminfo."""
+
+    MEM_TOTAL = 8 * 1024 ** 3
+
+    def __init__(self, root):
+        self.root = str(root)
+        (root / "self").mkdir(parents=True)
+        (root / "self" / "stat").write_text("1 (self) S 0\n")
+        (root / "meminfo").write_text(f"MemTotal:       {self.MEM_TOTAL // 1024} kB\nMemFree:          1024 kB\n")
+        self.procs = {}
+
+    def add(self, pid, comm, ppid=1, utime=0, stime=0, start=100, rss=0, cmdline=b""):
+        fields = ["S", str(ppid)] + ["0"] * 48
+        fields[11], fields[12], fields[19], fields[21] = str(utime), str(stime), str(start), str(rss)
+        path = os.path.join(self.root, str(pid))
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "stat"), "wb") as f:
+            f.write(b"%d (%s) %s\n" % (pid, comm.encode(), " ".join(fields).encode()))
+        with open(os.path.join(path, "cmdline"), "wb") as f:
+            f.write(cmdline)
+        self.procs[pid] = {"pid": pid, "name": comm, "ppid": ppid, "rss": rss}
+
+    def remove(self, pid):
+        path = os.path.join(self.root, str(pid))
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+        os.rmdir(path)
+        del self.procs[pid]
+
+
+@pytest.fixture
+def fake_proc(tmp_path):
+    return FakeProc(tmp_path / "proc")
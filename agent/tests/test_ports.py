@@ -0,0 +1,143 @@
+import os
+import socket
+import sys
+
+import pytest
+
+from functions import ports
+from functions.ports import RttEstimator, ScanBudget
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.fixture
+def listeners():
+    """Two listening loopback ports and one closed one."""
+    socks = []
+    for _ in range(2):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(16)
+        socks.append(s)
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    closed = probe.getsockname()[1]
+    probe.close()
+    yield [s.getsockname()[1] for s in socks], closed
+    for s in socks:
+        s.close()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_connect_loop_reports_open_and_closed_ports_and_closes_sockets(listeners):
+    open_ports, closed = listeners
+    before = open_fds()
+    rtt = RttEstimator()
+    results = dict(ports._sweep("127.0.0.1", [*open_ports, closed], rtt, ScanBudget(max_inflight=2)))
+    assert results == {open_ports[0]: True, open_ports[1]: True, closed: False}
+    assert rtt.samples == 3  # SYN-ACKs and the RST are all RTT samples
+    assert open_fds() == before
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_abandoned_sweep_closes_in_flight_sockets(listeners):
+    open_ports, closed = listeners
+    before = open_fds()
+    sweep = ports._sweep("127.0.0.1", [*open_ports, closed] * 20, RttEstimator(), ScanBudget(max_inflight=8))
+    next(sweep)
+    sweep.close()
+    assert open_fds() == before
+
+
+def test_max_inflight_leaves_the_fd_limit_alone():
+    resource = pytest.importorskip("resource")
+    limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+    cap = ports._max_inflight(10 ** 6)
+    assert resource.getrlimit(resource.RLIMIT_NOFILE) == limits
+    if limits[0] != resource.RLIM_INFINITY:
+        assert cap == max(16, limits[0] - 64)
+
+
+def test_rtt_estimator_follows_rfc6298():
+    rtt = RttEstimator(initial=0.35, floor=0.05, ceiling=2.0)
+    assert rtt.timeout() == 0.35  # no samples yet
+    rtt.add(0.100)
+    assert (rtt.srtt, rtt.rttvar) == (0.100, 0.050)
+    assert rtt.timeout() == pytest.approx(0.100 + 4 * 0.050)
+    rtt.add(0.200)
+    # RTTVAR = 3/4 * 0.05 + 1/4 * |0.1 - 0.2|, then SRTT = 7/8 * 0.1 + 1/8 * 0.2
+    assert rtt.rttvar == pytest.approx(0.0625)
+    assert rtt.srtt == pytest.approx(0.1125)
+    assert rtt.timeout() == pytest.approx(0.1125 + 4 * 0.0625)
+    assert rtt.as_dict() == {"srtt_ms": 112.5, "rttvar_ms": 62.5, "timeout_ms": 362.5, "samples": 2}
+
+
+def test_rtt_timeout_is_clamped():
+    fast = RttEstimator(floor=0.05)
+    for _ in range(50):
+        fast.add(0.0005)  # loopback: RTTVAR decays towards zero
+    assert fast.timeout() == 0.05
+    slow = RttEstimator(ceiling=2.0)
+    slow.add(1.5)
+    assert slow.timeout() == 2.0
+    # A zero variance still leaves 10 ms of slack above SRTT
+    steady = RttEstimator(floor=0.0)
+    for _ in range(200):
+        steady.add(0.3)
+    assert steady.timeout() == pytest.approx(0.31)
+
+
+little_endian = pytest.mark.skipif(sys.byteorder != "little", reason="fixtures hold little-endian words")
+
+PROC_HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+
+def proc_line(local, remote, state, inode):
+    return f"   0: {local} {remote} {state} 00000000:00000000 00:00000000 00000000     0        0 {inode} 1 0000000000000000 100 0 0 10 0\n"
+
+
+@little_endian
+def test_decode_proc_addr():
+    assert ports._decode_proc_addr("0100007F:0277") == ("127.0.0.1", 631)
+    assert ports._decode_proc_addr("00000000:0035") == ("0.0.0.0", 53)
+    assert ports._decode_proc_addr("00000000000000000000000001000000:1F90") == ("::1", 8080)
+    assert ports._decode_proc_addr("000080FE000000000000000001000000:0016") == ("fe80::1", 22)
+    assert ports._decode_proc_addr("0000000000000000FFFF00000100007F:0050") == ("::ffff:127.0.0.1", 80)
+
+
+@little_endian
+def test_listeners_from_proc_keeps_listening_and_bound_sockets(tmp_path, monkeypatch):
+    tables = {
+        "tcp": [proc_line("0100007F:0277", "00000000:0000", "0A", 101),
+                # An established connection and a TIME_WAIT left by a closed one
+                proc_line("0F02000A:0016", "0102000A:D431", "01", 102),
+                proc_line("0F02000A:9C40", "0202000A:0050", "06", 0)],
+        "tcp6": [proc_line("0000000000000000FFFF00000100007F:0050", "00000000000000000000000000000000:0000", "0A", 103),
+                 proc_line("00000000000000000000000001000000:1F90", "00000000000000000000000000000000:0000", "0A", 104)],
+        # A bound DNS socket and a connected one
+        "udp": [proc_line("00000000:0035", "00000000:0000", "07", 105),
+                proc_line("0F02000A:A1B2", "08080808:0035", "01", 106)],
+        "udp6": [proc_line("00000000000000000000000000000000:14E9", "00000000000000000000000000000000:0000", "07", 107),
+                 "   1: truncated line\n"],
+    }
+    for name, lines in tables.items():
+        (tmp_path / name).write_text(PROC_HEADER + "".join(lines))
+    monkeypatch.setattr(ports, "_PROC_NET_TABLES", tuple(
+        (proto, str(tmp_path / name), state) for proto, name, state in
+        (("tcp", "tcp", "0A"), ("tcp", "tcp6", "0A"), ("udp", "udp", "07"), ("udp", "udp6", "07"))))
+    monkeypatch.setattr(ports, "_owners_by_inode", lambda inodes: {101: (900, "cupsd"), 105: (901, "dnsmasq")})
+
+    assert ports._listeners_from_proc() == [
+        {"proto": "tcp", "address": "127.0.0.1", "port": 631, "pid": 900, "process": "cupsd"},
+        {"proto": "tcp", "address": "::ffff:127.0.0.1", "port": 80, "pid": None, "process": None},
+        {"proto": "tcp", "address": "::1", "port": 8080, "pid": None, "process": None},
+        {"proto": "udp", "address": "0.0.0.0", "port": 53, "pid": 901, "process": "dnsmasq"},
+        {"proto": "udp", "address": "::", "port": 5353, "pid": None, "process": None},
+    ]
+
+
+def test_listeners_from_proc_without_tables(tmp_path, monkeypatch):
+    monkeypatch.setattr(ports, "_PROC_NET_TABLES", (("tcp", str(tmp_path / "missing"), "0A"),))
+    assert ports._listeners_from_proc() is None
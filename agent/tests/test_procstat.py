@@ -0,0 +1,66 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from functions import procstat
+from functions.procstat import ProcTable
+
+TICKS = os.sysconf("SC_CLK_TCK")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(procstat, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_comm_with_spaces_and_parens(fake_proc):
+    fake_proc.add(50, "tmux: a) (b", utime=7, rss=3)
+    fake_proc.add(51, ") )", ppid=50, cmdline=b"./) )\0-x\0")
+    table = ProcTable(fake_proc.root)
+    rows = table.rows()
+    assert {pid: row["name"] for pid, row in rows.items()} == {50: "tmux: a) (b", 51: ") )"}
+    i = list(table.pid).index(50)
+    assert (table.ppid[i], table.utime[i], table.rss[i]) == (1, 7, 3)
+    assert procstat.read_process(51, fake_proc.root) == {"pid": 51, "ppid": 50, "name": ") )", "cmdline": ["./) )", "-x"]}
+
+
+def test_truncated_comm_is_extended_from_the_executable(fake_proc):
+    fake_proc.add(60, "gnome-shell-cal", cmdline=b"/usr/libexec/gnome-shell-calendar-server\0--replace\0")
+    fake_proc.add(61, "kworker/0:1-eve")  # kernel threads have no cmdline
+    fake_proc.add(62, "python3.11-dev-", cmdline=b"/usr/bin/python3 script.py")  # not a prefix: kept
+    names = {pid: row["name"] for pid, row in ProcTable(fake_proc.root).rows().items()}
+    assert names == {60: "gnome-shell-calendar-server", 61: "kworker/0:1-eve", 62: "python3.11-dev-"}
+
+
+def test_vanished_and_unreadable_pids_are_skipped(fake_proc):
+    fake_proc.add(70, "alive")
+    os.mkdir(os.path.join(fake_proc.root, "71"))  # listed, then exited before stat was opened
+    with open(os.path.join(fake_proc.root, "72"), "w"):
+        pass  # not a directory at all
+    os.makedirs(os.path.join(fake_proc.root, "73"))
+    with open(os.path.join(fake_proc.root, "73", "stat"), "wb") as f:
+        f.write(b"73 (short) S 1 2 3\n")  # too few fields
+    table = ProcTable(fake_proc.root)
+    assert list(table.rows()) == [70]
+
+    fake_proc.remove(70)
+    assert table.rows() == {}
+    assert procstat.read_process(70, fake_proc.root) is None
+
+
+def test_cpu_percent_from_tick_deltas(fake_proc, clock):
+    fake_proc.add(80, "busy", utime=100, stime=50)
+    fake_proc.add(81, "reused", utime=500)
+    table = ProcTable(fake_proc.root)
+    assert {row["cpu_percent"] for row in table.rows().values()} == {0.0}  # first sample
+
+    clock.value += 2.0
+    fake_proc.add(80, "busy", utime=100 + TICKS, stime=50 + TICKS // 2)
+    # Same pid, later start time: a new process, whose ticks are not a delta
+    fake_proc.add(81, "reused", utime=600, start=5000)
+    rows = table.rows()
+    assert rows[80]["cpu_percent"] == pytest.approx(round((TICKS + TICKS // 2) * 100.0 / (TICKS * 2.0), 1))
+    assert rows[81]["cpu_percent"] == 0.0
@@ -0,0 +1,17 @@
+import os
+
+import functions
+
+
+def test_shared_modules_come_from_the_scanner_sources():
+    for name in functions.SHARED_MODULES:
+        module = __import__(f"functions.{name}", fromlist=[name])
+        assert os.path.dirname(os.path.abspath(module.__file__)) == functions.SCANNER_DIR
+
+
+def test_specs_stage_every_shared_module():
+    agent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for spec in ("main.spec", "SystemAgent.spec"):
+        with open(os.path.join(agent, spec), encoding="utf-8") as f:
+            text = f.read()
+        assert f"SHARED = {functions.SHARED_MODULES!r}".replace('"', "'") in text, spec
@@ -0,0 +1,27 @@
+from functions import system
+
+
+def test_fingerprint_change_invalidates_static_group(monkeypatch):
+    nics = [("eth0", ("10.0.0.2",))]
+    monkeypatch.setattr(system, "_network_fingerprint", lambda: tuple(nics))
+    cache = system.SystemInfoCache()
+    assert "network" in cache.refresh()
+    assert "network" not in cache.refresh()
+
+    nics.append(("usb0", ("192.168.42.10",)))
+    assert "network" in cache.refresh()
+
+
+def test_static_hash_resent_only_on_change(monkeypatch):
+    cores = [4]
+    monkeypatch.setattr(system, "_get_hardware_info",
+                        lambda: {"cpu": {"logical_cores": cores[0]}, "memory": {}, "disk": {}})
+    monkeypatch.setattr(system, "_hardware_fingerprint", lambda: (cores[0],))
+    report = system.SystemInfoReport(system.SystemInfoCache())
+    first = report.message()
+    assert "partial" not in first and first["cpu"]["logical_cores"] == 4
+    assert report.message()["partial"] is True
+
+    cores[0] = 8  # CPU hotplug
+    changed = report.message()
+    assert "partial" not in changed and changed["static_hash"] != first["static_hash"]
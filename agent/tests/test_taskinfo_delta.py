@@ -0,0 +1,80 @@
+import threading
+
+from functions.taskmanager import TaskInfoDelta
+
+
+def row(pid, name="proc", cpu=0.0, mem=1.0, title=None):
+    r = {"pid": pid, "name": name, "cpu_percent": cpu, "memory_percent": mem}
+    if title is not None:
+        r["title"] = title
+    return r
+
+
+def table(background, applications=()):
+    return {"applications": list(applications), "background_processes": list(background)}
+
+
+def test_keyframe_then_deltas_with_sequence_numbers():
+    delta = TaskInfoDelta(keyframe_every=30)
+    kind, first = delta.message(table([row(1), row(2)], [row(1, title="Editor")]))
+    assert kind == "task_info" and first["seq"] == 0 and len(first["background_processes"]) == 2
+
+    kind, second = delta.message(table([row(1, cpu=1.0), row(2, mem=1.6), row(3)], [row(1, title="Editor")]))
+    assert kind == "task_info_delta"
+    assert (second["keyframe_id"], second["seq"]) == (first["keyframe_id"], 1)
+    assert second["background_processes"] == {"started": [row(3)], "exited": [], "changed": [row(2, mem=1.6)]}
+    assert second["applications"] == {"started": [], "exited": [], "changed": []}
+
+    kind, third = delta.message(table([row(1, cpu=1.0), row(3)], [row(1, title="Other")]))
+    assert third["seq"] == 2
+    assert third["background_processes"]["exited"] == [2]
+    assert third["applications"] == {"started": [row(1, title="Other")], "exited": [[1, "Editor"]], "changed": []}
+
+
+def test_changes_are_measured_from_the_value_last_sent():
+    delta = TaskInfoDelta(cpu_threshold=2.0)
+    delta.message(table([row(1, cpu=0.0)]))
+    # 1.5 points twice: neither step alone crosses the threshold, the sum does
+    assert delta.message(table([row(1, cpu=1.5)]))[1]["background_processes"]["changed"] == []
+    assert delta.message(table([row(1, cpu=3.0)]))[1]["background_processes"]["changed"] == [row(1, cpu=3.0)]
+
+
+def test_seq_gap_resync_and_periodic_keyframes():
+    delta = TaskInfoDelta(keyframe_every=3)
+    _, first = delta.message(table([row(1)]))
+    delta.message(table([row(1)]))
+    # The backend found a gap and asked for a keyframe
+    delta.request_keyframe("task_info_keyframe")
+    kind, resync = delta.message(table([row(1), row(2)]))
+    assert kind == "task_info" and resync["seq"] == 0 and resync["keyframe_id"] != first["keyframe_id"]
+
+    kinds = [delta.message(table([row(1), row(2)]))[0] for _ in range(4)]
+    assert kinds == ["task_info_delta"] * 3 + ["task_info"]
+
+
+def test_errors_pass_through_and_force_a_keyframe():
+    delta = TaskInfoDelta()
+    delta.message(table([row(1)]))
+    assert delta.message({"error": "boom"}) == ("task_info", {"error": "boom"})
+    assert delta.message(table([row(1)]))[0] == "task_info"
+
+
+def test_keyframe_request_from_another_thread():
+    delta = TaskInfoDelta(keyframe_every=10 ** 6)
+    delta.message(table([row(1)]))
+    stop = threading.Event()
+
+    def requester():
+        while not stop.is_set():
+            delta.request_keyframe()
+
+    thread = threading.Thread(target=requester)
+    thread.start()
+    try:
+        for _ in range(2000):
+            kind, payload = delta.message(table([row(1)]))
+            assert payload["keyframe_id"] is not None
+            assert payload["seq"] == 0 if kind == "task_info" else payload["seq"] > 0
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,174 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from functions import procstat, taskmanager
+
+pytestmark = pytest.mark.skipif(not procstat.available(), reason="needs /proc")
+
+
+class FakeConnector:
+    """Stands in for the proc connector: no events until killed, then the reader ends."""
+
+    def __init__(self):
+        self.killed = threading.Event()
+        self.closed = False
+
+    def events(self):
+        self.killed.wait()
+        raise OSError("netlink socket failed")
+        yield  # a generator, like ProcConnector.events()
+
+    def close(self):
+        self.closed = True
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def pids(output):
+    return {row["pid"] for row in output["background_processes"]}
+
+
+def test_dead_event_reader_falls_back_to_polling(monkeypatch):
+    connector = FakeConnector()
+    monkeypatch.setattr(taskmanager, "ProcConnector", lambda: connector)
+    snapshot = taskmanager.ProcessSnapshot(backend="procfs", stats_interval=3600)
+    assert snapshot.events is not None and snapshot.events.alive
+    snapshot.collect()
+
+    child = subprocess.Popen(["sleep", "30"])
+    try:
+        # In event mode with no events, a new process waits for the hourly poll
+        assert child.pid not in pids(snapshot.collect())
+
+        connector.killed.set()
+        assert wait_until(lambda: not snapshot.events.alive)
+        assert child.pid in pids(snapshot.collect())
+        assert snapshot.events is None and connector.closed
+    finally:
+        child.kill()
+        child.wait()
+    assert child.pid not in pids(snapshot.collect())
+
+
+def test_snapshot_is_created_once_across_threads(monkeypatch):
+    created = []
+
+    class CountingSnapshot:
+        def __init__(self):
+            time.sleep(0.05)  # widen the race window
+            created.append(self)
+
+    monkeypatch.setattr(taskmanager, "ProcessSnapshot", CountingSnapshot)
+    monkeypatch.setattr(taskmanager, "_snapshot", None)
+    threads = [threading.Thread(target=taskmanager._get_snapshot) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+
+
+class FakePsutil:
+    """psutil's process_iter()/virtual_memory() over the processes of a FakeProc."""
+
+    def __init__(self, fake_proc):
+        self.fake_proc = fake_proc
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def virtual_memory(self):
+        return SimpleNamespace(total=self.fake_proc.MEM_TOTAL)
+
+    def process_iter(self, attrs, ad_value=None):
+        for p in self.fake_proc.procs.values():
+            yield SimpleNamespace(info={"pid": p["pid"], "name": p["name"], "cpu_percent": 0.0,
+                                        "memory_info": SimpleNamespace(rss=p["rss"] * self.page_size)})
+
+
+def by_pid(rows):
+    return sorted(rows, key=lambda row: row["pid"])
+
+
+def populate(fake_proc):
+    fake_proc.add(10, "init", ppid=0, utime=500, rss=2048)
+    fake_proc.add(20, "sshd", utime=30, stime=10, rss=1024)
+    fake_proc.add(30, "editor", ppid=20, rss=65536)
+
+
+def test_procfs_and_psutil_backends_report_the_same_table(fake_proc, monkeypatch):
+    populate(fake_proc)
+    monkeypatch.setattr(taskmanager, "psutil", FakePsutil(fake_proc))
+    monkeypatch.setattr(taskmanager, "get_visible_windows", lambda: [(30, "notes.txt"), (99, "gone")])
+    monkeypatch.setattr(taskmanager, "ProcConnector", FakeConnector)
+    procfs, ps = [taskmanager.ProcessSnapshot(backend=backend, proc=fake_proc.root).collect()
+                  for backend in ("procfs", "psutil")]
+    procfs["background_processes"] = by_pid(procfs["background_processes"])
+    ps["background_processes"] = by_pid(ps["background_processes"])
+    assert procfs == ps
+    app, = procfs["applications"]
+    assert app == {"pid": 30, "name": "editor", "title": "notes.txt", "cpu_percent": 0.0,
+                   "memory_percent": round(65536 * os.sysconf("SC_PAGE_SIZE") * 100.0 / fake_proc.MEM_TOTAL, 2)}
+    assert [(row["pid"], row["name"]) for row in procfs["background_processes"]] == [(10, "init"), (20, "sshd")]
+
+
+class QueueConnector:
+    """Proc connector fed by the test; join() returns once every queued event was handled."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def events(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            yield event
+            self.queue.task_done()
+
+    def send(self, *events):
+        for event in events:
+            self.queue.put(event)
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+
+
+def test_event_mode_applies_births_exits_and_execs(fake_proc, monkeypatch):
+    populate(fake_proc)
+    connector = QueueConnector()
+    monkeypatch.setattr(taskmanager, "ProcConnector", lambda: connector)
+    snapshot = taskmanager.ProcessSnapshot(backend="procfs", stats_interval=3600, proc=fake_proc.root)
+    polled = by_pid(snapshot.collect()["background_processes"])
+    assert [row["pid"] for row in polled] == [10, 20, 30]
+
+    fake_proc.add(40, "bash", ppid=20, rss=512)
+    connector.send(("fork", 40, 20))
+    fake_proc.add(40, "make", ppid=20, rss=512, cmdline=b"make\0-j4\0")
+    connector.send(("exec", 40, None))
+    fake_proc.remove(30)
+    connector.send(("exit", 30, 0))
+
+    rows = by_pid(snapshot.collect()["background_processes"])
+    # Until the next poll a new process has the same keys with zeroed stats
+    assert rows == polled[:2] + [{"pid": 40, "name": "make", "cpu_percent": 0.0, "memory_percent": 0.0}]
+    execs = snapshot.events.exec_events()
+    assert [{k: e[k] for k in ("pid", "ppid", "name", "cmdline")} for e in execs] == [
+        {"pid": 40, "ppid": 20, "name": "make", "cmdline": ["make", "-j4"]}]
+
+    # Dropped events force a poll, which fills in the stats
+    connector.send(("overflow", 0, None))
+    rows = by_pid(snapshot.collect()["background_processes"])
+    assert rows[-1]["memory_percent"] == round(512 * os.sysconf("SC_PAGE_SIZE") * 100.0 / fake_proc.MEM_TOTAL, 2)
+    assert [row["pid"] for row in rows] == [10, 20, 40]
+    snapshot.events.close()
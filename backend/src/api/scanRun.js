@@ -1,6 +1,7 @@
 // backend/api/scanRun.js
 import express from "express";
-import { execFile } from "child_process";
+import { spawn } from "child_process";
+import readline from "readline";
 import path from "path";
 import { fileURLToPath } from "url";
 import ScanResult from "../models/ScanResult.js";
@@ -11,6 +12,68 @@ const __dirname = path.dirname(__filename);
 
 // Adjust this path if your scanner script name/location differs
 const scannerScript = path.join(__dirname, "../scanner/network_scanner_cli.py");
+const SCAN_TIMEOUT_MS = 3 * 60 * 1000;
+
+// ---------------- Scanner daemon (JSON-RPC over stdio) ----------------
+// The scanner runs once as `network_scanner_cli.py --serve` and is reused for
+// every request, so scans start without paying interpreter/import startup.
+let daemon = null;
+let nextId = 1;
+const pending = new Map(); // request id -> { resolve, reject }
+
+function startDaemon() {
+  const child = spawn("python", [scannerScript, "--serve"], { stdio: ["pipe", "pipe", "pipe"] });
+
+  readline.createInterface({ input: child.stdout }).on("line", (line) => {
+    let msg;
+    try {
+      msg = JSON.parse(line);
+    } catch {
+      console.error("[api/scan] Unexpected scanner output:", line);
+      return;
+    }
+    if (msg.id === undefined || msg.id === null) {
+      if (msg.method) console.log(`[api/scan] ${msg.method}`, msg.params || {});
+      return;
+    }
+    const waiter = pending.get(msg.id);
+    if (!waiter) return;
+    pending.delete(msg.id);
+    if (msg.error) waiter.reject(new Error(msg.error.message));
+    else waiter.resolve(msg.result);
+  });
+
+  // Log scanner stderr as it streams (helpful for debugging)
+  child.stderr.on("data", (chunk) => {
+    console.error("[scanner stderr]", chunk.toString());
+  });
+
+  const fail = (err) => {
+    if (daemon === child) daemon = null;
+    for (const waiter of pending.values()) waiter.reject(err);
+    pending.clear();
+  };
+  child.on("error", fail);
+  child.on("exit", (code) => fail(new Error(`Scanner daemon exited with code ${code}`)));
+
+  return child;
+}
+
+function rpc(method, params = {}, timeoutMs = 10000) {
+  if (!daemon) daemon = startDaemon();
+  const id = nextId++;
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      reject(new Error(`Scanner ${method} timed out`));
+    }, timeoutMs);
+    pending.set(id, {
+      resolve: (v) => { clearTimeout(timer); resolve(v); },
+      reject: (e) => { clearTimeout(timer); reject(e); },
+    });
+    daemon.stdin.write(JSON.stringify({ jsonrpc: "2.0", id, method, params }) + "\n");
+  });
+}
 
 // Helper: compute overall impact for the whole network
 function computeOverallImpact(hosts = []) {
@@ -29,78 +92,83 @@ function computeOverallImpact(hosts = []) {
 router.post("/", async (req, res) => {
   console.log("[api/scan] Triggered network scan");
 
-  // You can accept flags from req.body in future (e.g., no_arp)
-  // const noArp = req.body?.no_arp === true;
-
-  // Spawn python scanner
-  const child = execFile(
-    "python",
-    [scannerScript],
-    { timeout: 3 * 60 * 1000, maxBuffer: 20 * 1024 * 1024 }, // 3 min, 20MB stdout
-    async (error, stdout, stderr) => {
-      if (error) {
-        console.error("[api/scan] Scanner process error:", error);
-        // include stderr for debugging when available
-        return res.status(500).json({ ok: false, error: error.message, stderr: (stderr || "").toString() });
-      }
-
-      try {
-        const outText = (stdout || "").toString().trim();
-        if (!outText) {
-          console.error("[api/scan] Scanner produced no stdout. Stderr:", (stderr || "").toString());
-          return res.status(500).json({ ok: false, error: "Scanner produced no output", stderr: (stderr || "").toString() });
-        }
-
-        let parsed;
-        try {
-          parsed = JSON.parse(outText);
-        } catch (parseErr) {
-          console.error("[api/scan] Failed to parse scanner JSON:", parseErr);
-          console.error("Raw stdout:", outText);
-          console.error("Stderr:", (stderr || "").toString());
-          return res.status(500).json({ ok: false, error: "Invalid JSON from scanner", detail: parseErr.message, raw: outText });
-        }
-
-        // Normalize parsed shape: expect top-level { ok, scanned_at, network, duration_seconds, hosts }
-        if (!parsed || typeof parsed !== "object") {
-          return res.status(500).json({ ok: false, error: "Scanner returned unexpected payload" });
-        }
-
-        const hosts = Array.isArray(parsed.hosts) ? parsed.hosts : [];
-        const overallImpact = computeOverallImpact(hosts);
-
-        // Replace single doc in DB (upsert)
-        const updatedDoc = await ScanResult.findOneAndUpdate(
-          {},
-          {
-            $set: {
-              ok: parsed.ok !== undefined ? parsed.ok : true,
-              network: parsed.network || "unknown",
-              scanned_at: parsed.scanned_at || new Date().toISOString(),
-              duration_seconds: parsed.duration_seconds || 0,
-              hosts,
-              overall_impact: overallImpact,
-              raw: parsed,
-              source: "local-scanner",
-              updated_at: new Date(),
-            },
-          },
-          { upsert: true, new: true }
-        );
-
-        console.log(`[api/scan] Scan saved. hosts=${hosts.length} overall=${overallImpact}`);
-        return res.json({ ok: true, saved: true, id: updatedDoc._id, result: parsed, overall_impact: overallImpact });
-      } catch (err) {
-        console.error("[api/scan] Error while saving/parsing scanner output:", err);
-        return res.status(500).json({ ok: false, error: "Internal server error", detail: err.message });
-      }
+  let scanId;
+  try {
+    ({ scan_id: scanId } = await rpc("scan.start", {
+      network: req.body?.network,
+      ports: req.body?.ports,
+      // Verify known hosts instead of rescanning them (scanner keeps state on disk)
+      incremental: Boolean(req.body?.incremental),
+      // scan_id of a timed-out or interrupted scan to continue from its checkpoint journal
+      resume: req.body?.resume,
+    }));
+  } catch (err) {
+    console.error("[api/scan] Failed to start scan:", err);
+    return res.status(500).json({ ok: false, error: err.message });
+  }
+
+  let parsed;
+  try {
+    parsed = await rpc("scan.result", { scan_id: scanId, wait: true }, SCAN_TIMEOUT_MS);
+  } catch (err) {
+    console.error("[api/scan] Scanner error:", err);
+    rpc("scan.cancel", { scan_id: scanId }).catch(() => {});
+    return res.status(500).json({ ok: false, error: err.message, scan_id: scanId });
+  }
+
+  try {
+    // Normalize parsed shape: expect top-level { ok, scanned_at, network, duration_seconds, hosts }
+    if (!parsed || typeof parsed !== "object" || parsed.state !== "done") {
+      return res.status(500).json({ ok: false, error: parsed?.error || "Scanner returned unexpected payload", scan_id: scanId });
     }
-  );
+    delete parsed.state;
 
-  // Log scanner stderr as it streams (helpful for debugging)
-  child.stderr?.on("data", (chunk) => {
-    console.error("[scanner stderr]", chunk.toString());
-  });
+    const hosts = Array.isArray(parsed.hosts) ? parsed.hosts : [];
+    const overallImpact = computeOverallImpact(hosts);
+
+    // Replace single doc in DB (upsert)
+    const updatedDoc = await ScanResult.findOneAndUpdate(
+      {},
+      {
+        $set: {
+          ok: parsed.ok !== undefined ? parsed.ok : true,
+          network: parsed.network || "unknown",
+          scanned_at: parsed.scanned_at || new Date().toISOString(),
+          duration_seconds: parsed.duration_seconds || 0,
+          hosts,
+          overall_impact: overallImpact,
+          raw: parsed,
+          source: "local-scanner",
+          updated_at: new Date(),
+        },
+      },
+      { upsert: true, new: true }
+    );
+
+    console.log(`[api/scan] Scan saved. hosts=${hosts.length} overall=${overallImpact}`);
+    return res.json({ ok: true, saved: true, id: updatedDoc._id, result: parsed, overall_impact: overallImpact });
+  } catch (err) {
+    console.error("[api/scan] Error while saving scanner output:", err);
+    return res.status(500).json({ ok: false, error: "Internal server error", detail: err.message });
+  }
+});
+
+// GET /api/scan/progress/:id
+router.get("/progress/:id", async (req, res) => {
+  try {
+    return res.json(await rpc("scan.progress", { scan_id: req.params.id }));
+  } catch (err) {
+    return res.status(404).json({ ok: false, error: err.message });
+  }
+});
+
+// POST /api/scan/cancel/:id
+router.post("/cancel/:id", async (req, res) => {
+  try {
+    return res.json(await rpc("scan.cancel", { scan_id: req.params.id }));
+  } catch (err) {
+    return res.status(404).json({ ok: false, error: err.message });
+  }
 });
 
 // GET /api/scan/latest
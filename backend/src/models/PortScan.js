@@ -8,6 +8,14 @@ const portScanSchema = new mongoose.Schema({
     target: String,
     open_ports: [Number],
     scanned_range: String,
+    rtt: Object,
+    rate: Object,
+    source: String,
+    udp_ports: [Number],
+    listeners: [Object],
+    scan_id: String,
+    started: Number, // stream start (epoch seconds); orders chunks of different streams
+    complete: { type: Boolean, default: true },
   },
 });
 
@@ -12,6 +12,7 @@ const VulnFlagSchema = new mongoose.Schema({
 const HostSchema = new mongoose.Schema({
   ip: String,
   mac: String,
+  vendor: String,
   open_ports: Object,
   impact_level: {
     type: String,
@@ -19,6 +20,7 @@ const HostSchema = new mongoose.Schema({
     default: "Info",
   },
   vuln_flags: [VulnFlagSchema],
+  rtt: Object,
 });
 
 const ScanResultSchema = new mongoose.Schema({
@@ -47,6 +47,8 @@ const systemInfoSchema = new mongoose.Schema({
     machine_id: String,
     wlan_info: [wlanSchema],
     ip: String,
+    // Hash of the static inventory; partial messages apply only on top of it
+    static_hash: String,
   },
 });
 
@@ -22,6 +22,9 @@ const taskInfoSchema = new mongoose.Schema({
   data: {
     applications: [appSchema],
     background_processes: [processSchema],
+    // Set by the agent's keyframes; task_info_delta messages apply on top of them
+    keyframe_id: String,
+    seq: Number,
   },
 });
 
@@ -3,6 +3,7 @@ import SystemInfo from "./models/SystemInfo.js";
 import InstalledApps from "./models/InstalledApps.js";
 import PortScanData from "./models/PortScan.js";
 import TaskInfo from "./models/TaskInfo.js";
+import { applySystemInfoPartial, applyTaskInfoDelta } from "./utils/deltaUpdates.js";
 
 export async function saveAgentData(payload) {
   try {
@@ -40,7 +41,29 @@ export async function saveAgentData(payload) {
       return;
     }
 
-    // 3️⃣ Select the correct model
+    // Process exec events are a live feed (kept in the agent data log), not stored
+    if (type === "process_exec") {
+      console.log(`ℹ️ ${data.events?.length || 0} process exec events from agent ${agentId}`);
+      return;
+    }
+
+    // 3️⃣ Streamed port scans arrive in chunks that are merged into one document
+    if (type === "port_scan" && payload.chunk) {
+      await savePortScanChunk(agentId, timestamp, data, payload.chunk);
+      return;
+    }
+
+    // Process table deltas apply on top of the last task_info keyframe
+    if (type === "task_info_delta") {
+      return await saveTaskInfoDelta(agentId, timestamp, data);
+    }
+
+    // Partial system_info: dynamic metrics on top of the stored static inventory
+    if (type === "system_info" && data.partial) {
+      return await saveSystemInfoPartial(agentId, timestamp, data);
+    }
+
+    // 4️⃣ Select the correct model
     let Model;
     switch (type) {
       case "system_info":
@@ -62,7 +85,7 @@ export async function saveAgentData(payload) {
 
     const doc = { agentId, timestamp, type, data };
 
-    // 4️⃣ Save to MongoDB
+    // 5️⃣ Save to MongoDB
     try {
       await Model.findOneAndUpdate(
         { agentId },
@@ -77,3 +100,72 @@ export async function saveAgentData(payload) {
     console.error("❌ Failed to save agent data:", err);
   }
 }
+
+// Merge one chunk of a streamed port scan in a single atomic update, so chunks
+// saved concurrently cannot overwrite each other. A chunk of the stored stream
+// adds its open ports; a chunk of a newer stream (later chunk.started) resets the
+// stored result; a late chunk of an older stream changes nothing.
+async function savePortScanChunk(agentId, timestamp, data, chunk) {
+  const openPorts = Array.isArray(data.open_ports) ? data.open_ports : [];
+  const final = !!chunk.final;
+  // Agents before chunk.started: the message time orders streams well enough
+  const started = Number(chunk.started) || Date.parse(timestamp) / 1000 || 0;
+  const extra = {};
+  if (data.scanned_range) extra.scanned_range = data.scanned_range;
+  for (const key of ["rtt", "rate", "source", "udp_ports", "listeners", "error"]) {
+    if (data[key] !== undefined) extra[key] = data[key];
+  }
+
+  const sameStream = { $eq: ["$data.scan_id", chunk.id] };
+  const newerStream = { $gte: [started, { $ifNull: ["$data.started", 0] }] };
+  const merged = {
+    $mergeObjects: [
+      "$data",
+      { $literal: extra },
+      {
+        open_ports: { $setUnion: [{ $ifNull: ["$data.open_ports", []] }, { $literal: openPorts }] },
+        complete: { $or: [{ $eq: ["$data.complete", true] }, final] },
+      },
+    ],
+  };
+  const fresh = {
+    $literal: {
+      target: data.target,
+      ...extra,
+      open_ports: openPorts,
+      scan_id: chunk.id,
+      started,
+      complete: final,
+    },
+  };
+
+  try {
+    await PortScanData.updateOne(
+      { agentId },
+      [
+        {
+          $set: {
+            agentId,
+            type: "port_scan",
+            timestamp: { $cond: [{ $or: [sameStream, newerStream] }, timestamp, "$timestamp"] },
+            data: { $cond: [sameStream, merged, { $cond: [newerStream, fresh, "$data"] }] },
+          },
+        },
+      ],
+      { upsert: true }
+    );
+    console.log(`✅ [port_scan] chunk ${chunk.seq}${final ? " (final)" : ""} saved for agent ${agentId}`);
+  } catch (err) {
+    console.error(`❌ Failed to save [port_scan] chunk for agent ${agentId}:`, err);
+  }
+}
+
+// Process table deltas: see utils/deltaUpdates.js
+async function saveTaskInfoDelta(agentId, timestamp, data) {
+  return await applyTaskInfoDelta(TaskInfo, agentId, timestamp, data);
+}
+
+// Partial system_info merges: see utils/deltaUpdates.js
+async function saveSystemInfoPartial(agentId, timestamp, data) {
+  return await applySystemInfoPartial(SystemInfo, agentId, timestamp, data);
+}
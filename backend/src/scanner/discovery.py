@@ -0,0 +1,296 @@
+# scanner/discovery.py
+"""
+In-process host discovery. Echo requests are sent in bulk from one ICMP socket
+and replies are matched back to hosts by identifier/sequence, so a sweep costs
+one socket instead of one ping process per address.
+
+Socket choice, best first:
+  - unprivileged ICMP datagram socket (Linux when ping_group_range allows, macOS)
+  - raw ICMP socket (root / Administrator)
+  - TCP connect probes, where a SYN-ACK or a RST both prove the host is up
+  - on Windows without Administrator, one ping.exe per host (as before), since
+    hosts that firewall every probe port still answer echo requests
+"""
+import errno
+import itertools
+import os
+import random
+import selectors
+import socket
+import struct
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Optional send pacer: returns 0 when a packet may go out now, else seconds to wait
+Pacer = Optional[Callable[[], float]]
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+# Ports tried by the TCP fallback; any answer (open or refused) means "alive"
+TCP_PROBE_PORTS = (80, 443, 22, 445)
+
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", 10035)}
+_REFUSED = {errno.ECONNREFUSED, getattr(errno, "WSAECONNREFUSED", 10061)}
+_NO_DESCRIPTORS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, getattr(errno, "WSAEMFILE", 10024)}
+_PAYLOAD = b"ntool-discovery"
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident: int, seq: int) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = _checksum(header + _PAYLOAD)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, ident, seq) + _PAYLOAD
+
+
+def open_icmp_socket() -> Tuple[Optional[socket.socket], Optional[str]]:
+    """Return (socket, "dgram" | "raw"), or (None, None) when ICMP is not available."""
+    for kind, sock_type in (("dgram", socket.SOCK_DGRAM), ("raw", socket.SOCK_RAW)):
+        try:
+            s = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except (OSError, AttributeError):
+            continue
+        try:
+            if kind == "raw" and os.name == "nt":
+                s.bind(("", 0))  # Windows raw sockets must be bound before receiving
+            s.setblocking(False)
+            try:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            return s, kind
+        except OSError:
+            s.close()
+    return None, None
+
+
+def _parse_reply(packet: bytes, kind: str) -> Optional[Tuple[int, int]]:
+    """Return (ident, seq) of an echo reply, or None for anything else."""
+    if kind == "raw":
+        if not packet:
+            return None
+        packet = packet[(packet[0] & 0x0F) * 4:]  # strip the IPv4 header
+    if len(packet) < 8:
+        return None
+    icmp_type, _, _, ident, seq = struct.unpack("!BBHHH", packet[:8])
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return ident, seq
+
+
+def _icmp_iter(sock: socket.socket, kind: str, hosts: List[str],
+               timeout: float, retries: int, pacer: Pacer = None) -> Iterator[str]:
+    # Datagram sockets get their identifier rewritten by the kernel, which also
+    # only delivers our own replies; raw sockets see every reply on the host.
+    ident = random.randrange(1, 0xFFFF)
+    pending: Dict[int, str] = {}
+    sel = selectors.DefaultSelector()
+    sel.register(sock, selectors.EVENT_READ)
+    try:
+        for batch_start in range(0, len(hosts), 0xFFFF):
+            batch = hosts[batch_start:batch_start + 0xFFFF]
+            pending = {seq: ip for seq, ip in enumerate(batch, 1)}
+            for _ in range(retries + 1):
+                if not pending:
+                    break
+                queue = list(pending.items())
+                deadline = None
+                while queue or time.monotonic() < deadline:
+                    # --- send as many requests as the socket buffer (and pacer) accepts ---
+                    throttle = 0.0
+                    while queue:
+                        seq, ip = queue[-1]
+                        throttle = pacer() if pacer else 0.0
+                        if throttle:
+                            break
+                        try:
+                            sock.sendto(_echo_request(ident, seq), (ip, 0))
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError as e:
+                            if e.errno == errno.ENOBUFS:
+                                break
+                            pending.pop(seq, None)  # unroutable address
+                        queue.pop()
+                        deadline = time.monotonic() + timeout
+                    if deadline is None and not queue:
+                        break  # nothing could be sent
+
+                    # --- collect replies ---
+                    wait = max(throttle, 0.001) if queue else max(0.0, deadline - time.monotonic())
+                    if not sel.select(wait):
+                        continue
+                    while True:
+                        try:
+                            packet, addr = sock.recvfrom(2048)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError:
+                            break
+                        reply = _parse_reply(packet, kind)
+                        if reply is None:
+                            continue
+                        r_ident, seq = reply
+                        if kind == "raw" and r_ident != ident:
+                            continue
+                        ip = pending.get(seq)
+                        if ip is not None and ip == addr[0]:
+                            del pending[seq]
+                            yield ip
+                    if not pending:
+                        break
+    finally:
+        sel.close()
+
+
+def _tcp_iter(hosts: List[str], timeout: float, max_inflight: int = 256,
+              pacer: Pacer = None) -> Iterator[str]:
+    """Non-blocking TCP connect probes; a host is alive on any SYN-ACK or RST."""
+    sel = selectors.DefaultSelector()
+    inflight: Dict[int, Tuple[socket.socket, str, float]] = {}
+    alive = set()
+    probes = ((ip, port) for ip in hosts for port in TCP_PROBE_PORTS)
+    exhausted = False
+    try:
+        while True:
+            throttle = 0.0
+            while not exhausted and len(inflight) < max_inflight:
+                probe = next(probes, None)
+                if probe is None:
+                    exhausted = True
+                    break
+                ip, port = probe
+                if ip in alive:
+                    continue
+                throttle = pacer() if pacer else 0.0
+                if throttle:
+                    probes = itertools.chain([probe], probes)
+                    break
+                try:
+                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                except OSError as e:
+                    if e.errno in _NO_DESCRIPTORS and inflight:
+                        # Out of sockets: retry once some in-flight probes finish
+                        max_inflight = max(1, len(inflight))
+                        probes = itertools.chain([probe], probes)
+                        break
+                    continue  # counts as a failed probe
+                try:
+                    s.setblocking(False)
+                    res = s.connect_ex((ip, port))
+                except OSError:
+                    s.close()  # e.g. EINVAL or ENETUNREACH raised for this address
+                    continue
+                if res in _IN_PROGRESS:
+                    inflight[s.fileno()] = (s, ip, time.monotonic() + timeout)
+                    sel.register(s, selectors.EVENT_WRITE)
+                    continue
+                s.close()
+                if (res == 0 or res in _REFUSED) and ip not in alive:
+                    alive.add(ip)
+                    yield ip
+            if not inflight:
+                if exhausted:
+                    return
+                if throttle:
+                    time.sleep(throttle)
+                continue
+
+            wait = max(0.0, min(d for _, _, d in inflight.values()) - time.monotonic())
+            if throttle:
+                wait = min(wait, throttle)
+            for key, _ in sel.select(wait):
+                s, ip, _ = inflight.pop(key.fd)
+                sel.unregister(s)
+                err = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                s.close()
+                if (err == 0 or err in _REFUSED) and ip not in alive:
+                    alive.add(ip)
+                    yield ip
+            now = time.monotonic()
+            for fd in [fd for fd, (_, _, d) in inflight.items() if d <= now]:
+                s, _, _ = inflight.pop(fd)
+                sel.unregister(s)
+                s.close()
+    finally:
+        for s, _, _ in inflight.values():
+            s.close()
+        sel.close()
+
+
+def _ping(ip: str, timeout: float) -> bool:
+    try:
+        result = subprocess.run(
+            ["ping", "-n", "1", "-w", str(max(1, int(timeout * 1000))), ip],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=timeout + 5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+def _ping_iter(hosts: List[str], timeout: float, max_workers: int = 50,
+               pacer: Pacer = None) -> Iterator[str]:
+    """One ping.exe per host, for Windows without an ICMP socket."""
+    queue = list(reversed(hosts))
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while queue or running:
+            throttle = 0.0
+            while queue and len(running) < max_workers:
+                throttle = pacer() if pacer else 0.0
+                if throttle:
+                    break
+                ip = queue.pop()
+                running[executor.submit(_ping, ip, timeout)] = ip
+            if not running:
+                time.sleep(throttle)
+                continue
+            done, _ = wait(running, timeout=throttle or None, return_when=FIRST_COMPLETED)
+            for future in done:
+                ip = running.pop(future)
+                if future.result():
+                    yield ip
+
+
+def iter_alive(hosts: Iterable, timeout: float = 1.0, retries: int = 1, pacer: Pacer = None) -> Iterator[str]:
+    """Yield each host (as a string) the moment it answers."""
+    hosts = [str(h) for h in hosts]
+    sock, kind = open_icmp_socket()
+    if sock is None:
+        if os.name == "nt":
+            yield from _ping_iter(hosts, timeout, pacer=pacer)
+        else:
+            yield from _tcp_iter(hosts, timeout, pacer=pacer)
+        return
+    try:
+        yield from _icmp_iter(sock, kind, hosts, timeout, retries, pacer)
+    finally:
+        sock.close()
+
+
+def sweep(hosts: Iterable, timeout: float = 1.0, retries: int = 1, pacer: Pacer = None) -> List[str]:
+    """Return the hosts that answered, sorted numerically."""
+    alive = list(iter_alive(hosts, timeout, retries, pacer))
+    alive.sort(key=lambda s: tuple(int(x) for x in s.split(".")))
+    return alive
+
+
+def discovery_method() -> str:
+    """Which mechanism iter_alive will use on this host: "dgram", "raw", "ping" or "tcp"."""
+    sock, kind = open_icmp_socket()
+    if sock is None:
+        return "ping" if os.name == "nt" else "tcp"
+    sock.close()
+    return kind
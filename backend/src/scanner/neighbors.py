@@ -0,0 +1,178 @@
+# scanner/neighbors.py
+"""
+Passive MAC discovery from the kernel neighbor (ARP) table. Every host that
+answered a ping sweep had to be resolved first, so its MAC is already there;
+reading the table costs no probes.
+
+  read_neighbors()   {ip: mac} for complete IPv4 entries: an rtnetlink
+                     RTM_GETNEIGH dump, else /proc/net/arp; None when neither
+                     can be read (non-Linux), as opposed to an empty table
+  NeighborWatcher    subscription to neighbor table changes (RTMGRP_NEIGH),
+                     so a new device can be probed as soon as the kernel learns it
+"""
+import errno
+import os
+import socket
+import struct
+from typing import Dict, Iterator, Optional, Tuple
+
+NETLINK_ROUTE = 0
+RTMGRP_NEIGH = 0x4
+RTM_NEWNEIGH, RTM_DELNEIGH, RTM_GETNEIGH = 28, 29, 30
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+NLM_F_REQUEST, NLM_F_DUMP = 0x1, 0x300
+NDA_DST, NDA_LLADDR = 1, 2
+# Neighbor states (NUD_*) whose link-layer address cannot be trusted
+NUD_INCOMPLETE, NUD_FAILED = 0x01, 0x20
+NUD_REACHABLE = 0x02
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_NDMSG = struct.Struct("=BBHiHBB")
+_RTATTR = struct.Struct("=HH")
+_ZERO_MAC = "00:00:00:00:00:00"
+
+
+def _format_mac(raw: bytes) -> Optional[str]:
+    if len(raw) != 6:
+        return None
+    mac = ":".join(f"{b:02x}" for b in raw)
+    return None if mac == _ZERO_MAC else mac
+
+
+def _parse_neigh(payload: bytes) -> Optional[Tuple[str, Optional[str], int]]:
+    """(ip, mac or None, NUD state) from an RTM_NEWNEIGH/RTM_DELNEIGH body; None for non-IPv4."""
+    if len(payload) < _NDMSG.size:
+        return None
+    family, _, _, _, state, _, _ = _NDMSG.unpack_from(payload)
+    if family != socket.AF_INET:
+        return None
+    ip = mac = None
+    offset = _NDMSG.size
+    while offset + _RTATTR.size <= len(payload):
+        length, kind = _RTATTR.unpack_from(payload, offset)
+        if length < _RTATTR.size:
+            break
+        value = payload[offset + _RTATTR.size:offset + length]
+        if kind == NDA_DST and len(value) == 4:
+            ip = socket.inet_ntoa(value)
+        elif kind == NDA_LLADDR:
+            mac = _format_mac(value)
+        offset += (length + 3) & ~3
+    if ip is None:
+        return None
+    return ip, mac, state
+
+
+def _messages(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, kind, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size or offset + length > len(data):
+            break  # malformed or truncated
+        yield kind, data[offset + _NLMSGHDR.size:offset + length]
+        offset += (length + 3) & ~3
+
+
+def _usable(mac: Optional[str], state: int) -> bool:
+    return mac is not None and not state & (NUD_INCOMPLETE | NUD_FAILED)
+
+
+def _neighbors_from_netlink() -> Dict[str, str]:
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        body = _NDMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0)
+        sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(body), RTM_GETNEIGH,
+                                 NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + body)
+        table = {}
+        while True:
+            data = sock.recv(1 << 16)
+            if not data:
+                return table
+            for kind, payload in _messages(data):
+                if kind == NLMSG_DONE:
+                    return table
+                if kind == NLMSG_ERROR:
+                    raise OSError("RTM_GETNEIGH dump failed")
+                if kind == RTM_NEWNEIGH:
+                    entry = _parse_neigh(payload)
+                    if entry and _usable(entry[1], entry[2]):
+                        table[entry[0]] = entry[1]
+    finally:
+        sock.close()
+
+
+def _neighbors_from_proc(path: str = "/proc/net/arp") -> Dict[str, str]:
+    table = {}
+    with open(path, "r", encoding="ascii", errors="replace") as f:
+        next(f, None)  # header
+        for line in f:
+            fields = line.split()
+            # IP address, HW type, Flags, HW address, Mask, Device; flag 0x2 = complete
+            if len(fields) < 4 or not int(fields[2], 16) & 0x2:
+                continue
+            mac = fields[3].lower()
+            if mac != _ZERO_MAC:
+                table[fields[0]] = mac
+    return table
+
+
+def read_neighbors() -> Optional[Dict[str, str]]:
+    """{ip: mac} for the IPv4 neighbors the kernel has resolved, or None if the table is unreadable."""
+    if hasattr(socket, "AF_NETLINK"):
+        try:
+            return _neighbors_from_netlink()
+        except OSError:
+            pass
+    if os.path.exists("/proc/net/arp"):
+        try:
+            return _neighbors_from_proc()
+        except (OSError, ValueError):
+            pass
+    return None
+
+
+class NeighborWatcher:
+    """
+    Neighbor table change notifications. events() blocks and yields
+    ("new" | "del", ip, mac, reachable) for IPv4 entries as the kernel changes them.
+    Raises OSError when netlink is not available (non-Linux).
+    """
+
+    def __init__(self):
+        if not hasattr(socket, "AF_NETLINK"):
+            raise OSError("neighbor notifications need Linux rtnetlink")
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        except OSError:
+            pass
+        self.sock.bind((0, RTMGRP_NEIGH))
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def events(self) -> Iterator[Tuple[str, str, Optional[str], bool]]:
+        while True:
+            try:
+                data = self.sock.recv(1 << 16)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    continue  # notifications were dropped; the next dump catches up
+                return
+            if not data:
+                return
+            for kind, payload in _messages(data):
+                if kind not in (RTM_NEWNEIGH, RTM_DELNEIGH):
+                    continue
+                entry = _parse_neigh(payload)
+                if entry is None:
+                    continue
+                ip, mac, state = entry
+                if kind == RTM_DELNEIGH:
+                    yield "del", ip, mac, False
+                elif _usable(mac, state):
+                    yield "new", ip, mac, bool(state & NUD_REACHABLE)
+
+    def close(self) -> None:
+        self.sock.close()
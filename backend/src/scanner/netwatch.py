@@ -0,0 +1,253 @@
+# scanner/netwatch.py
+"""
+Network topology view shared by the agent collectors (functions/system.py,
+functions/network_scan.py) and the backend scanners (network_scanner_cli.py,
+scanner_service.py).
+
+The view is the interface carrying the default route:
+  {"iface", "ip", "prefixlen", "cidr", "gateway"}
+
+On Linux it is read from rtnetlink (route and address dumps) and kept current
+by a thread listening for link, IPv4 address and IPv4 route notifications, so
+callers never redo detection and learn about DHCP renewals or Wi-Fi roaming as
+they happen. Elsewhere it falls back to the source address the OS picks for an
+Internet destination (a UDP connect, which sends nothing), cached for TTL seconds.
+"""
+import errno
+import ipaddress
+import socket
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+NETLINK_ROUTE = 0
+RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV4_ROUTE = 0x1, 0x10, 0x40
+RTM_NEWADDR, RTM_GETADDR = 20, 22
+RTM_NEWROUTE, RTM_GETROUTE = 24, 26
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+NLM_F_REQUEST, NLM_F_DUMP = 0x1, 0x300
+RTA_OIF, RTA_GATEWAY, RTA_PRIORITY, RTA_TABLE = 4, 5, 6, 15
+IFA_ADDRESS, IFA_LOCAL = 1, 2
+RT_TABLE_MAIN = 254
+
+TTL = 30.0        # seconds a polled view is reused where notifications are not available
+DEBOUNCE = 0.5    # a DHCP renewal arrives as a burst of messages; re-read once it settles
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_RTMSG = struct.Struct("=BBBBBBBBI")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTATTR = struct.Struct("=HH")
+
+View = Dict[str, Any]
+
+
+def _messages(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, kind, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size or offset + length > len(data):
+            break  # malformed or truncated
+        yield kind, data[offset + _NLMSGHDR.size:offset + length]
+        offset += (length + 3) & ~3
+
+
+def _attrs(payload: bytes, offset: int) -> Dict[int, bytes]:
+    attrs = {}
+    while offset + _RTATTR.size <= len(payload):
+        length, kind = _RTATTR.unpack_from(payload, offset)
+        if length < _RTATTR.size:
+            break
+        attrs[kind] = payload[offset + _RTATTR.size:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+def _dump(msg_type: int, body: bytes) -> List[Tuple[int, bytes]]:
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(body), msg_type, NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + body)
+        out = []
+        while True:
+            data = sock.recv(1 << 16)
+            if not data:
+                return out
+            for kind, payload in _messages(data):
+                if kind == NLMSG_DONE:
+                    return out
+                if kind == NLMSG_ERROR:
+                    raise OSError(f"rtnetlink dump {msg_type} failed")
+                out.append((kind, payload))
+    finally:
+        sock.close()
+
+
+def _view_from_netlink() -> Optional[View]:
+    # Default route with the lowest metric in the main table
+    best = None
+    for kind, payload in _dump(RTM_GETROUTE, _RTMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0, 0, 0)):
+        if kind != RTM_NEWROUTE or len(payload) < _RTMSG.size:
+            continue
+        _, dst_len, _, _, table, _, _, _, _ = _RTMSG.unpack_from(payload)
+        attrs = _attrs(payload, _RTMSG.size)
+        if RTA_TABLE in attrs:
+            table = struct.unpack("=I", attrs[RTA_TABLE])[0]
+        if dst_len != 0 or table != RT_TABLE_MAIN or RTA_OIF not in attrs:
+            continue
+        metric = struct.unpack("=I", attrs[RTA_PRIORITY])[0] if RTA_PRIORITY in attrs else 0
+        gateway = socket.inet_ntoa(attrs[RTA_GATEWAY]) if len(attrs.get(RTA_GATEWAY, b"")) == 4 else None
+        oif = struct.unpack("=i", attrs[RTA_OIF])[0]
+        if best is None or metric < best[0]:
+            best = (metric, oif, gateway)
+    if best is None:
+        return None
+    _, oif, gateway = best
+
+    for kind, payload in _dump(RTM_GETADDR, _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)):
+        if kind != RTM_NEWADDR or len(payload) < _IFADDRMSG.size:
+            continue
+        _, prefixlen, _, _, index = _IFADDRMSG.unpack_from(payload)
+        if index != oif:
+            continue
+        attrs = _attrs(payload, _IFADDRMSG.size)
+        raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+        if not raw or len(raw) != 4:
+            continue
+        ip = socket.inet_ntoa(raw)
+        try:
+            iface = socket.if_indextoname(oif)
+        except OSError:
+            iface = str(oif)
+        return _make_view(iface, ip, prefixlen, gateway)
+    return None
+
+
+def _view_from_socket() -> Optional[View]:
+    """Source address for an Internet destination; the prefix is assumed to be /24."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        s.close()
+    return _make_view(None, ip, 24, None)
+
+
+def _make_view(iface: Optional[str], ip: str, prefixlen: int, gateway: Optional[str]) -> View:
+    cidr = str(ipaddress.IPv4Network(f"{ip}/{prefixlen}", strict=False))
+    return {"iface": iface, "ip": ip, "prefixlen": prefixlen, "cidr": cidr, "gateway": gateway}
+
+
+def detect() -> Optional[View]:
+    """Detect the current view now (no caching)."""
+    if hasattr(socket, "AF_NETLINK"):
+        try:
+            view = _view_from_netlink()
+            if view is not None:
+                return view
+        except OSError:
+            pass
+    return _view_from_socket()
+
+
+class TopologyWatcher:
+    """
+    Cached view plus change notification. current() is cheap: on Linux it only
+    changes when rtnetlink says something did; elsewhere it is re-detected at
+    most every `ttl` seconds. Subscribers are called as callback(old, new) from
+    the watcher thread whenever the view changes.
+    """
+
+    def __init__(self, ttl: float = TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._view: Optional[View] = None
+        self._stamp = None
+        self._subscribers: List[Callable[[Optional[View], Optional[View]], None]] = []
+        self._thread = None
+        self._sock = None
+        if hasattr(socket, "AF_NETLINK"):
+            try:
+                self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+                self._sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            except OSError:
+                self._sock = None
+
+    @property
+    def event_driven(self) -> bool:
+        return self._sock is not None
+
+    def current(self) -> Optional[View]:
+        with self._lock:
+            fresh = self._stamp is not None and (
+                self._thread is not None or time.monotonic() - self._stamp < self.ttl)
+            if fresh:
+                return self._view
+        return self.refresh()
+
+    def refresh(self) -> Optional[View]:
+        """Re-detect now and notify subscribers if the view changed."""
+        view = detect()
+        with self._lock:
+            known, old = self._stamp is not None, self._view
+            self._view, self._stamp = view, time.monotonic()
+            subscribers = list(self._subscribers) if known and old != view else []
+        for callback in subscribers:
+            try:
+                callback(old, view)
+            except Exception:
+                pass
+        return view
+
+    def subscribe(self, callback: Callable[[Optional[View], Optional[View]], None]) -> None:
+        """Call callback(old, new) on every change; starts the listener thread on first use."""
+        with self._lock:
+            self._subscribers.append(callback)
+        self.start()
+
+    def start(self) -> None:
+        if self._sock is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                self._sock.settimeout(None)
+                self._sock.recv(1 << 16)
+                # Drain the rest of the burst before re-reading
+                self._sock.settimeout(DEBOUNCE)
+                while True:
+                    self._sock.recv(1 << 16)
+            except socket.timeout:
+                pass
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:  # dropped notifications: re-read anyway
+                    with self._lock:
+                        self._thread = None  # fall back to the TTL
+                    return
+            self.refresh()
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher() -> TopologyWatcher:
+    """Process-wide watcher; its listener starts with the first subscriber or start()."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = TopologyWatcher()
+        return _watcher
+
+
+def current() -> Optional[View]:
+    """Current view from the process-wide watcher."""
+    watcher = get_watcher()
+    watcher.start()
+    return watcher.current()
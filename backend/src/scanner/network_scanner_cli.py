@@ -6,40 +6,74 @@ Auto-detect local network (gateway/interface) and run local vulnerability scan.
 Usage:
   python network_scanner_cli.py
   python network_scanner_cli.py 192.168.1.0/24
+  python network_scanner_cli.py --stream                # NDJSON events instead of one JSON blob
+  python network_scanner_cli.py --serve                 # JSON-RPC daemon on stdin/stdout
+  python network_scanner_cli.py --serve --socket PATH   # JSON-RPC daemon on a Unix socket
+  python network_scanner_cli.py --resume SCAN_ID        # continue an interrupted scan
+  python network_scanner_cli.py --incremental           # verify known hosts, fully scan new ones
+  python network_scanner_cli.py --startup-profile       # import cost and cold-start check
 """
 
 import argparse
 import asyncio
+import importlib
 import json
 import socket
 import sys
+import threading
 import time
+import uuid
 from datetime import datetime
 from ipaddress import IPv4Network, ip_interface
 from collections import OrderedDict
 
-# Optional libraries
-_have_netifaces = False
-_have_psutil = False
-try:
-    import netifaces as _netifaces
-    _have_netifaces = True
-except Exception:
-    _netifaces = None
+import netwatch
+from oui_index import vendor_for
+from portspec import compile_ports
+from ratelimit import RateController
+from scan_journal import ScanJournal, block_map
+from scan_state import ScanState
 
 try:
-    import psutil as _psutil
-    _have_psutil = True
+    import resource
 except Exception:
-    _psutil = None
+    resource = None
 
-try:
-    from scapy.all import ARP, Ether, srp, conf
-except Exception:
-    ARP = Ether = srp = conf = None
+# Optional libraries are imported on first use, not at startup: scapy alone costs
+# more than the rest of the scanner, and this script is started once per request.
+# Run with --startup-profile to see where start-up time goes.
+DEFERRED_MODULES = ("scapy.all", "netifaces", "psutil")
+_optional_modules = {}
 
 
-COMMON_PORTS = [21, 22, 23, 25, 53, 80, 110, 139, 143, 161, 443, 445, 3306, 3389, 5900, 8080]
+def _optional(name):
+    """Import an optional module the first time it is needed; None if it is not installed."""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except Exception:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+# Port spec (see portspec.py), e.g. "common", "top:100", "1-1024,!135-139"
+DEFAULT_PORT_SPEC = "common"
+
+# Timeout bounds (seconds). Until a host has answered, its connect timeout is CONNECT_TIMEOUT_INITIAL.
+CONNECT_TIMEOUT_INITIAL = 1.5
+CONNECT_TIMEOUT_FLOOR = 0.1
+CONNECT_TIMEOUT_CEILING = 3.0
+BANNER_TIMEOUT_FLOOR = 0.3
+BANNER_TIMEOUT_CEILING = 1.0
+
+# Connects in flight across the whole scan, and per host (for fairness between hosts)
+GLOBAL_CONCURRENCY = 512
+PER_HOST_CONCURRENCY = 32
+
+# TCP-probe discovery (used when ARP is unavailable): ports raced per host, worker pool size
+DISCOVERY_PORTS = (80, 443, 22)
+DISCOVERY_TIMEOUT = 0.6
+DISCOVERY_WORKERS = 1024
 
 
 # ------------------ Network Detection ------------------
@@ -69,6 +103,9 @@ def cidr_from_ip_and_mask(ip_str, mask_str):
 
 
 def detect_network_with_netifaces():
+    _netifaces = _optional("netifaces")
+    if _netifaces is None:
+        return None
     try:
         gws = _netifaces.gateways()
         default = gws.get("default", {})
@@ -89,6 +126,9 @@ def detect_network_with_netifaces():
 
 
 def detect_network_with_psutil():
+    _psutil = _optional("psutil")
+    if _psutil is None:
+        return None
     try:
         conns = _psutil.net_if_addrs()
         for iface, addrlist in conns.items():
@@ -111,17 +151,16 @@ def detect_network_fallback():
     return f"{base}.0/24"
 
 
+def detect_network_with_netwatch():
+    # Only the rtnetlink view: its fallback guesses a /24, which netifaces/psutil can do better
+    view = netwatch.get_watcher().current()
+    return view["cidr"] if view and view["iface"] else None
+
+
 def auto_detect_network():
-    if _have_netifaces:
-        try:
-            cidr = detect_network_with_netifaces()
-            if cidr:
-                return cidr
-        except Exception:
-            pass
-    if _have_psutil:
+    for detect in (detect_network_with_netwatch, detect_network_with_netifaces, detect_network_with_psutil):
         try:
-            cidr = detect_network_with_psutil()
+            cidr = detect()
             if cidr:
                 return cidr
         except Exception:
@@ -196,49 +235,158 @@ def heuristic_flags(host_entry):
     return findings
 
 
+# ------------------ RTT Estimation ------------------
+class RttEstimator:
+    """
+    Per-host smoothed RTT and variance, updated the way TCP computes its RTO (RFC 6298).
+    Both SYN-ACKs (open ports) and RSTs (closed ports) count as samples.
+    """
+
+    def __init__(self, initial=CONNECT_TIMEOUT_INITIAL, floor=CONNECT_TIMEOUT_FLOOR,
+                 ceiling=CONNECT_TIMEOUT_CEILING, banner_floor=BANNER_TIMEOUT_FLOOR,
+                 banner_ceiling=BANNER_TIMEOUT_CEILING):
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.banner_floor = banner_floor
+        self.banner_ceiling = banner_ceiling
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def add(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.samples += 1
+
+    def connect_timeout(self):
+        if self.srtt is None:
+            return self.initial
+        rto = self.srtt + max(0.01, 4 * self.rttvar)
+        return min(self.ceiling, max(self.floor, rto))
+
+    def banner_timeout(self):
+        # A banner needs one more round trip plus the service's own think time
+        if self.srtt is None:
+            return self.banner_ceiling
+        return min(self.banner_ceiling, max(self.banner_floor, 2 * self.connect_timeout()))
+
+    def as_dict(self):
+        return {
+            "srtt_ms": round(self.srtt * 1000, 3) if self.srtt is not None else None,
+            "rttvar_ms": round(self.rttvar * 1000, 3) if self.rttvar is not None else None,
+            "connect_timeout_ms": round(self.connect_timeout() * 1000, 1),
+            "banner_timeout_ms": round(self.banner_timeout() * 1000, 1),
+            "samples": self.samples,
+        }
+
+
 # ------------------ Port Scanning ------------------
-async def scan_host_ports(ip, ports, concurrency=200):
-    sem = asyncio.Semaphore(concurrency)
-    open_ports = {}
+async def pace(rate):
+    """Wait for a send token from the scan's RateController."""
+    while True:
+        wait = rate.delay()
+        if not wait:
+            return
+        await asyncio.sleep(wait)
+
+
+async def probe_port(ip, port, rtt, rate=None):
+    """
+    Connect to ip:port and try to read a banner.
+    Returns {"banner": ...} when the port is open, False when the host refused
+    the connection (RST) and None when nothing answered.
+    With a RateController, the connect waits for a send token and its outcome is reported back.
+    """
+    if rate is not None:
+        await pace(rate)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port),
+                                                timeout=rtt.connect_timeout())
+    except ConnectionRefusedError:
+        rtt.add(loop.time() - started)
+        if rate is not None:
+            rate.record(answered=1)
+        return False
+    except asyncio.TimeoutError:
+        if rate is not None:
+            rate.record(timeouts=1)
+        return None
+    except Exception:
+        if rate is not None:
+            rate.record(answered=1)  # unreachable and similar errors are answers too
+        return None
+    rtt.add(loop.time() - started)
+    if rate is not None:
+        rate.record(answered=1)
+    try:
+        writer.write(b"\r\n")
+        await writer.drain()
+        try:
+            data = await asyncio.wait_for(reader.read(1024), timeout=rtt.banner_timeout())
+        except Exception:
+            data = b""
+    except Exception:
+        data = b""
+    finally:
+        writer.close()  # also runs when a discovery race cancels this probe
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    banner = data.decode(errors="ignore").strip() if data else ""
+    return {"banner": banner}
 
-    async def worker(port):
-        async with sem:
-            try:
-                fut = asyncio.open_connection(ip, port)
-                reader, writer = await asyncio.wait_for(fut, timeout=1.5)
-                writer.write(b"\r\n")
-                await writer.drain()
-                try:
-                    data = await asyncio.wait_for(reader.read(1024), timeout=1.0)
-                except Exception:
-                    data = b""
-                banner = data.decode(errors="ignore").strip() if data else ""
-                open_ports[port] = {"banner": banner}
-                writer.close()
-                try:
-                    await writer.wait_closed()
-                except Exception:
-                    pass
-            except Exception:
-                pass
 
-    tasks = [asyncio.create_task(worker(p)) for p in ports]
-    await asyncio.gather(*tasks)
+async def scan_host_ports(ip, ports, concurrency=PER_HOST_CONCURRENCY, rtt=None, limiter=None, known=None,
+                          on_result=None, rate=None):
+    """
+    Scan `ports` on one host with at most `concurrency` connects of its own in flight.
+    `limiter` is a semaphore shared by every host of a scan; `known` holds ports
+    already found open (with banners) that are reused instead of probed again.
+    `on_result(port, result)` is called for every port as it settles (result as from probe_port).
+    `rate` is the scan's RateController, if any.
+    """
+    open_ports = dict(known or {})
+    if rtt is None:
+        rtt = RttEstimator()
+    if limiter is None:
+        limiter = asyncio.Semaphore(concurrency)
+    port_iter = iter([p for p in ports if p not in open_ports])
+
+    async def worker():
+        for port in port_iter:
+            async with limiter:
+                result = await probe_port(ip, port, rtt, rate)
+            if result:
+                open_ports[port] = result
+            if on_result:
+                on_result(port, result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(ports))))]
+    await asyncio.gather(*workers)
     return open_ports
 
 
 # ------------------ ARP Discovery ------------------
 def arp_discover(network_cidr, timeout=2):
-    if not ARP:
+    scapy = _optional("scapy.all")
+    if scapy is None:
         return []
-    conf.verb = 0
+    scapy.conf.verb = 0
     try:
         net = IPv4Network(network_cidr, strict=False)
     except Exception:
         return []
-    pkt = Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=str(net.with_prefixlen))
+    pkt = scapy.Ether(dst="ff:ff:ff:ff:ff:ff") / scapy.ARP(pdst=str(net.with_prefixlen))
     try:
-        ans, _ = srp(pkt, timeout=timeout, verbose=0)
+        ans, _ = scapy.srp(pkt, timeout=timeout, verbose=0)
     except PermissionError:
         raise PermissionError("ARP discovery requires elevated privileges.")
     hosts = []
@@ -247,74 +395,584 @@ def arp_discover(network_cidr, timeout=2):
     return hosts
 
 
-# ------------------ Network Scanner ------------------
-async def scan_network(network_cidr, ports=COMMON_PORTS):
-    start = time.time()
-    hosts = []
+# ------------------ TCP-Probe Discovery ------------------
+def _discovery_worker_count(workers=DISCOVERY_WORKERS, sockets_per_worker=len(DISCOVERY_PORTS)):
+    """Bound discovery workers so their sockets fit under RLIMIT_NOFILE."""
+    if resource is not None:
+        try:
+            soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+            if soft != resource.RLIM_INFINITY:
+                workers = min(workers, max(1, (soft - 128) // sockets_per_worker))
+        except Exception:
+            pass
+    elif sys.platform == "win32":
+        workers = min(workers, 500 // sockets_per_worker)  # select() limit of the selector loop
+    return max(1, workers)
+
+
+async def probe_host(ip, rate=None):
+    """
+    Probe DISCOVERY_PORTS on ip in parallel and return on the first answer,
+    cancelling the other probes. A refused connection counts as alive: the RST
+    proves the host is up. Returns a discovered-host entry or None.
+    """
+    rtt = RttEstimator(initial=DISCOVERY_TIMEOUT)
+    tasks = {asyncio.create_task(probe_port(ip, p, rtt, rate)): p for p in DISCOVERY_PORTS}
     try:
-        discovered = arp_discover(network_cidr)
-    except PermissionError:
-        print("ARP discovery requires elevated privileges. Falling back to TCP-probe discovery.")
-        discovered = []
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    open_ports = {tasks[task]: result} if result else {}
+                    return {"ip": ip, "mac": "", "open_ports": open_ports, "rtt": rtt}
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-    if not discovered:
-        net = IPv4Network(network_cidr, strict=False)
-        ips = [str(ip) for ip in net.hosts()]
 
-        async def probe(ip):
-            for p in (80, 443, 22):
-                try:
-                    fut = asyncio.open_connection(ip, p)
-                    r, w = await asyncio.wait_for(fut, timeout=0.6)
-                    w.close()
-                    try:
-                        await w.wait_closed()
-                    except Exception:
-                        pass
-                    return ip
-                except Exception:
-                    pass
-            return None
+async def tcp_discover(network_cidr, workers=DISCOVERY_WORKERS, on_probe=None, rate=None):
+    """
+    Find live hosts with TCP probes. A fixed pool of workers pulls addresses from
+    a lazy iterator, so memory stays flat however large the network is.
+    `on_probe(entry_or_None)` is called after every address.
+    """
+    net = IPv4Network(network_cidr, strict=False)
+    addresses = (str(ip) for ip in net.hosts())
+    discovered = []
 
-        tasks = [asyncio.create_task(probe(ip)) for ip in ips]
-        results = await asyncio.gather(*tasks)
-        discovered = [{"ip": r, "mac": ""} for r in results if r]
-
-    for entry in discovered:
-        ip = entry["ip"]
-        host_entry = {"ip": ip, "mac": entry.get("mac", ""), "open_ports": {}, "vuln_flags": [], "impact_level": "Info"}
-        open_ports = await scan_host_ports(ip, ports)
-        host_entry["open_ports"] = open_ports
-        host_entry["vuln_flags"] = heuristic_flags(host_entry)
-        # Compute overall impact level
-        impacts = [f["impact"] for f in host_entry["vuln_flags"]]
-        levels = ["Info", "Low", "Medium", "High", "Critical"]
-        if impacts:
-            host_entry["impact_level"] = max(impacts, key=lambda i: levels.index(i))
-        hosts.append(host_entry)
+    async def worker():
+        for ip in addresses:
+            entry = await probe_host(ip, rate)
+            if entry:
+                discovered.append(entry)
+            if on_probe:
+                on_probe(entry)
 
-    elapsed = time.time() - start
+    count = min(_discovery_worker_count(workers), max(1, net.num_addresses))
+    await asyncio.gather(*(asyncio.create_task(worker()) for _ in range(count)))
+    discovered.sort(key=lambda e: tuple(int(x) for x in e["ip"].split(".")))
+    return discovered
+
+
+# ------------------ Network Scanner ------------------
+IMPACT_LEVELS = ["Info", "Low", "Medium", "High", "Critical"]
+PROGRESS_INTERVAL = 1.0  # seconds between progress events
+DISCOVERY_WEIGHT = 0.3   # share of the overall percentage given to discovery
+
+
+def progress_snapshot(progress, started):
+    """Percent complete, ETA and probe rate from the counters scan_network keeps in `progress`."""
+    if progress.get("phase") == "done":
+        frac = 1.0
+    elif progress.get("phase") == "ports":
+        total = progress.get("probes_total") or 0
+        frac = DISCOVERY_WEIGHT + (1 - DISCOVERY_WEIGHT) * (progress.get("probes_done", 0) / total if total else 1.0)
+    else:
+        total = progress.get("addresses_total") or 0
+        frac = DISCOVERY_WEIGHT * (progress.get("addresses_probed", 0) / total if total else 0.0)
+    elapsed = time.time() - started
+    eta = round(elapsed / frac - elapsed, 1) if frac > 0 else None
     return {
+        "phase": progress.get("phase"),
+        "percent": round(100 * frac, 1),
+        "eta_seconds": eta,
+        "hosts_discovered": progress.get("hosts_discovered", 0),
+        "hosts_done": progress.get("hosts_done", 0),
+        "rate": progress["rate"].stats() if progress.get("rate") else None,
+    }
+
+
+async def scan_network(network_cidr, ports=DEFAULT_PORT_SPEC, progress=None, rtt_cache=None,
+                       emit=None, keep_hosts=True, arp=True, state=None, journal=None, pps=None):
+    """
+    Discover hosts on network_cidr and scan their ports.
+    - progress: optional dict updated in place (phase, host and probe counters)
+    - rtt_cache: optional {ip: RttEstimator} reused across scans by the daemon
+    - emit: optional callback receiving event dicts as the scan runs: host_discovered,
+      port_open, host_done (the full host entry), progress (percent, ETA) and summary
+    - keep_hosts: when False, finished hosts are only emitted, not collected in the result
+    - arp: when False, skip ARP (and the scapy import) and go straight to TCP-probe discovery
+    - state: optional ScanState; known hosts then only get a verification pass (see scan_state.py)
+      and the state is updated with what was found (the caller saves it)
+    - journal: optional ScanJournal; finished (host, port block) units are checkpointed to it,
+      and hosts/units already in it (a resumed scan) are skipped and merged into the result
+    - pps: probes per second ceiling (unlimited when None); the rate also backs off when
+      the timeout ratio spikes (see ratelimit.py) and is reported under "rate"
+    """
+    start = time.time()
+    ports = compile_ports(ports)
+    net = IPv4Network(network_cidr, strict=False)
+    if progress is None:
+        progress = {}
+    rate = RateController(pps)
+    progress.update({"phase": "discovery", "hosts_discovered": 0, "hosts_done": 0,
+                     "addresses_total": max(1, net.num_addresses - 2), "addresses_probed": 0,
+                     "probes_total": 0, "probes_done": 0, "rate": rate})
+    send = emit or (lambda event: None)
+    blocks = block_map(ports) if journal is not None else None
+    resumed_units = sum(len(units) for units in journal.units.values()) if journal is not None else 0
+
+    async def ticker():
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            send({"event": "progress", **progress_snapshot(progress, start)})
+
+    ticker_task = asyncio.create_task(ticker()) if emit else None
+    completed = False
+    try:
+        if journal is not None:
+            send({"event": "scan_started", "scan_id": journal.scan_id, "network": network_cidr,
+                  "resumed_units": resumed_units})
+        discovered = []
+        if journal is not None and journal.hosts is not None:
+            discovered = [dict(h) for h in journal.hosts]
+            progress["addresses_probed"] = progress["addresses_total"]
+        elif arp:
+            try:
+                discovered = await asyncio.to_thread(arp_discover, network_cidr)
+            except PermissionError:
+                print("ARP discovery requires elevated privileges. Falling back to TCP-probe discovery.", file=sys.stderr)
+        for entry in discovered:
+            send({"event": "host_discovered", "ip": entry["ip"], "mac": entry.get("mac", "")})
+
+        limiter = asyncio.Semaphore(GLOBAL_CONCURRENCY)
+
+        if not discovered:
+            def on_probe(entry):
+                progress["addresses_probed"] += 1
+                if entry:
+                    progress["hosts_discovered"] += 1
+                    send({"event": "host_discovered", "ip": entry["ip"], "mac": ""})
+
+            discovered = await tcp_discover(network_cidr, on_probe=on_probe, rate=rate)
+        if journal is not None and journal.hosts is None:
+            journal.record_hosts(discovered)
+        plans = {}
+        if state is not None:
+            now = time.time()
+            plans = {e["ip"]: state.plan(network_cidr, e["ip"], e.get("mac", ""), ports, now) for e in discovered}
+
+        def probe_count(ip):
+            done = journal.units.get(ip) if journal is not None else None
+            base = plans[ip]["ports"] if plans else ports
+            if not done:
+                return len(base)
+            return sum(1 for p in base if blocks[p] not in done)
+
+        progress.update({"phase": "ports", "hosts_discovered": len(discovered),
+                         "probes_total": sum(probe_count(e["ip"]) for e in discovered)})
+
+        hosts = []
+        impact_counts = {level: 0 for level in IMPACT_LEVELS}
+
+        async def scan_one(entry):
+            ip = entry["ip"]
+            host_entry = {"ip": ip, "mac": entry.get("mac", ""), "open_ports": {}, "vuln_flags": [], "impact_level": "Info"}
+            if host_entry["mac"]:
+                host_entry["vendor"] = vendor_for(host_entry["mac"].lower()) or "Unknown"
+            rtt = entry.get("rtt") or (rtt_cache or {}).get(ip) or RttEstimator()
+            # Discovery probes its own ports; only the ones in the requested spec count
+            known = {p: r for p, r in (entry.get("open_ports") or {}).items() if p in ports}
+            plan = plans.get(ip)
+            probe = plan["ports"] if plan else ports
+            if plan:
+                planned = set(plan["ports"])
+                known = {p: r for p, r in known.items() if p in planned}
+
+            # Checkpointing: skip blocks a previous run finished, journal each block as it completes
+            resumed = {}
+            remaining, block_open = {}, {}
+            if journal is not None:
+                done = journal.units.get(ip, {})
+                if done:
+                    resumed = {p: {"banner": b} for found in done.values() for p, b in found.items()}
+                    probe = [p for p in probe if blocks[p] not in done]
+                    known = {p: r for p, r in known.items() if blocks[p] not in done}
+                for p in probe:
+                    if p not in known:
+                        remaining[blocks[p]] = remaining.get(blocks[p], 0) + 1
+                for p, r in known.items():
+                    block_open.setdefault(blocks[p], {})[p] = r.get("banner", "")
+                # Blocks answered entirely from `known` get no results: journal them now
+                for block in sorted({blocks[p] for p in probe} - remaining.keys()):
+                    journal.record_unit(ip, block, block_open.pop(block, {}))
+            progress["probes_done"] += len(known)
+
+            def on_result(port, result):
+                progress["probes_done"] += 1
+                if result:
+                    send({"event": "port_open", "ip": ip, "port": port, "banner": result.get("banner", "")})
+                if journal is not None:
+                    block = blocks[port]
+                    if result:
+                        block_open.setdefault(block, {})[port] = result.get("banner", "")
+                    remaining[block] -= 1
+                    if not remaining[block]:
+                        journal.record_unit(ip, block, block_open.pop(block, {}))
+
+            open_ports = await scan_host_ports(ip, probe, rtt=rtt, limiter=limiter,
+                                               known=known, on_result=on_result, rate=rate)
+            if resumed:
+                open_ports = {**resumed, **open_ports}
+            if rtt_cache is not None:
+                rtt_cache[ip] = rtt
+            host_entry["open_ports"] = open_ports
+            if plan:
+                host_entry["scan_mode"] = plan["mode"]
+                host_entry["scan_reason"] = plan["reason"]
+                state.record(network_cidr, host_entry, plan, ports)
+            host_entry["rtt"] = rtt.as_dict()
+            host_entry["vuln_flags"] = heuristic_flags(host_entry)
+            # Compute overall impact level
+            impacts = [f["impact"] for f in host_entry["vuln_flags"]]
+            if impacts:
+                host_entry["impact_level"] = max(impacts, key=lambda i: IMPACT_LEVELS.index(i))
+            progress["hosts_done"] += 1
+            impact_counts[host_entry["impact_level"]] += 1
+            send({"event": "host_done", **host_entry})
+            if keep_hosts:
+                hosts.append(host_entry)
+
+        # All hosts are scanned concurrently; each is capped at PER_HOST_CONCURRENCY
+        # connects so one slow host cannot starve the rest of the global budget.
+        await asyncio.gather(*(scan_one(entry) for entry in discovered))
+        del discovered
+        completed = True
+    finally:
+        if ticker_task:
+            ticker_task.cancel()
+        if journal is not None:
+            if completed:
+                journal.complete()
+            else:
+                journal.flush()
+
+    progress["phase"] = "done"
+    hosts.sort(key=lambda h: tuple(int(x) for x in h["ip"].split(".")))
+    elapsed = time.time() - start
+    overall = max((lvl for lvl, n in impact_counts.items() if n), key=IMPACT_LEVELS.index, default="Info")
+    result = {
         "ok": True,
         "scanned_at": datetime.utcnow().isoformat() + "Z",
         "network": network_cidr,
         "duration_seconds": round(elapsed, 2),
-        "hosts": hosts,
+        "ports": ports.ranges(),
+        "hosts_count": progress["hosts_done"],
+        "impact_counts": impact_counts,
+        "overall_impact": overall,
+        "rate": rate.stats(),
     }
+    if journal is not None:
+        result["scan_id"] = journal.scan_id
+        if resumed_units:
+            result["resumed_units"] = resumed_units
+    if plans:
+        modes = [plan["mode"] for plan in plans.values()]
+        result["incremental"] = {"full": modes.count("full"), "verified": modes.count("verify"),
+                                 "probes": progress["probes_total"]}
+    send({"event": "summary", **result})
+    if keep_hosts:
+        result["hosts"] = hosts
+    return result
+
+
+# ------------------ Scanner Daemon ------------------
+class ScanServer:
+    """
+    Long-lived scanner speaking JSON-RPC 2.0, one message per line.
+    Keeps imports, the detected network and per-host RTT estimates warm between scans.
+
+    Methods:
+      scan.start    {network?, ports?, events?, incremental?, resume?, pps?} -> {scan_id}
+      scan.progress {scan_id}                -> {state, phase, hosts_discovered, hosts_done, elapsed, rate}
+      scan.cancel   {scan_id}                -> {cancelled}
+      scan.result   {scan_id, wait?}         -> scan result (waits for completion when wait is true)
+    Notifications: scan.finished {scan_id, state} when a scan ends, and, when the scan
+    was started with events=true, scan.event {scan_id, event, ...} for every --stream event.
+    """
+
+    MAX_KEPT = 8  # finished scans kept for scan.result
+
+    def __init__(self):
+        self.scans = OrderedDict()
+        self.rtt_cache = {}
+        self.state = None
+        self.writers = set()
+
+    # --- transport ---
+    def send(self, message, writer=None):
+        line = json.dumps(message) + "\n"
+        targets = [writer] if writer else list(self.writers)
+        for w in targets:
+            try:
+                w(line)
+            except Exception:
+                self.writers.discard(w)
+
+    async def handle_line(self, line, writer):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self.send({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}, writer)
+            return
+        if not isinstance(request, dict):
+            # Batches are not supported either: every request is one object per line
+            self.send({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}, writer)
+            return
+        req_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+        handler = {
+            "scan.start": self.rpc_start,
+            "scan.progress": self.rpc_progress,
+            "scan.cancel": self.rpc_cancel,
+            "scan.result": self.rpc_result,
+        }.get(method)
+        if handler is None:
+            reply = {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": f"Unknown method {method}"}}
+        elif not isinstance(params, dict):
+            reply = {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32602, "message": "params must be an object"}}
+        else:
+            try:
+                reply = {"jsonrpc": "2.0", "id": req_id, "result": await handler(params)}
+            except (KeyError, ValueError) as e:
+                reply = {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32602, "message": str(e)}}
+            except Exception as e:
+                reply = {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32000, "message": str(e)}}
+        if req_id is not None:
+            self.send(reply, writer)
+
+    # --- RPC methods ---
+    async def rpc_start(self, params):
+        if params.get("resume"):
+            # Continue an interrupted scan (this daemon's or a killed CLI run's) from its journal
+            scan_id = params["resume"]
+            if self.scans.get(scan_id, {}).get("state") == "running":
+                raise ValueError(f"scan {scan_id!r} is still running")
+            journal = ScanJournal.load(scan_id)
+            network, ports = journal.network, compile_ports(journal.ports)
+        else:
+            ports = compile_ports(params.get("ports") or DEFAULT_PORT_SPEC)
+            network = params.get("network")
+            if not network:
+                # Cached by the topology watcher, which follows DHCP renewals and roaming
+                network = await asyncio.to_thread(auto_detect_network)
+            if not network:
+                raise ValueError("Unable to detect network.")
+            scan_id = uuid.uuid4().hex[:12]
+            try:
+                journal = ScanJournal.create(scan_id, network, ports.ranges())
+            except OSError as e:
+                print(f"Checkpointing disabled, cannot write journal: {e}", file=sys.stderr)
+                journal = None
+
+        scan = {"state": "running", "progress": {}, "result": None, "started": time.time(), "done": asyncio.Event()}
+        emit = None
+        if params.get("events"):
+            emit = lambda event: self.send({"jsonrpc": "2.0", "method": "scan.event",
+                                            "params": {"scan_id": scan_id, **event}})
+        state = None
+        if params.get("incremental"):
+            if self.state is None:
+                self.state = ScanState()
+            state = self.state
+        pps = float(params["pps"]) if params.get("pps") else None
+        scan["task"] = asyncio.create_task(self._run(scan_id, scan, network, ports, emit, state, journal, pps))
+        self.scans.pop(scan_id, None)
+        self.scans[scan_id] = scan
+        while len(self.scans) > self.MAX_KEPT:
+            oldest_id, oldest = next(iter(self.scans.items()))
+            if oldest["state"] == "running":
+                break
+            del self.scans[oldest_id]
+        return {"scan_id": scan_id}
+
+    async def _run(self, scan_id, scan, network, ports, emit=None, state=None, journal=None, pps=None):
+        try:
+            scan["result"] = await scan_network(network, ports, progress=scan["progress"],
+                                                rtt_cache=self.rtt_cache, emit=emit, state=state,
+                                                journal=journal, pps=pps)
+            scan["state"] = "done"
+            if state is not None:
+                try:
+                    state.save()
+                except OSError as e:
+                    print(f"Could not save scan state to {state.path}: {e}", file=sys.stderr)
+        except asyncio.CancelledError:
+            scan["state"] = "cancelled"
+        except Exception as e:
+            scan["state"] = "error"
+            scan["result"] = {"ok": False, "error": str(e)}
+        finally:
+            scan["done"].set()
+            self.send({"jsonrpc": "2.0", "method": "scan.finished", "params": {"scan_id": scan_id, "state": scan["state"]}})
+
+    def _get(self, params):
+        scan = self.scans.get(params["scan_id"])
+        if scan is None:
+            raise ValueError(f"Unknown scan_id {params['scan_id']}")
+        return scan
+
+    async def rpc_progress(self, params):
+        scan = self._get(params)
+        return {"state": scan["state"], "elapsed": round(time.time() - scan["started"], 2),
+                **progress_snapshot(scan["progress"], scan["started"])}
+
+    async def rpc_cancel(self, params):
+        scan = self._get(params)
+        if scan["state"] != "running":
+            return {"cancelled": False}
+        scan["task"].cancel()
+        await scan["done"].wait()
+        return {"cancelled": True}
+
+    async def rpc_result(self, params):
+        scan = self._get(params)
+        if params.get("wait"):
+            await scan["done"].wait()
+        if scan["state"] == "running":
+            return {"state": "running"}
+        return {"state": scan["state"], **(scan["result"] or {})}
+
+    # --- serving ---
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        lines = asyncio.Queue()
+
+        def read_stdin():
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+
+        def write_stdout(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        self.writers.add(write_stdout)
+        threading.Thread(target=read_stdin, daemon=True).start()
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            if line.strip():
+                asyncio.create_task(self.handle_line(line, write_stdout))
+
+    async def serve_unix(self, path):
+        async def client(reader, writer):
+            write = lambda text: writer.write(text.encode())
+            self.writers.add(write)
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        asyncio.create_task(self.handle_line(line.decode(), write))
+            finally:
+                self.writers.discard(write)
+                writer.close()
+
+        server = await asyncio.start_unix_server(client, path=path)
+        async with server:
+            await server.serve_forever()
 
 
 # ------------------ CLI Entry ------------------
 def main():
     parser = argparse.ArgumentParser(description="Auto-detect local network and run vulnerability scan.")
     parser.add_argument("network", nargs="?", help="Target network (optional)")
+    parser.add_argument("--ports", default=DEFAULT_PORT_SPEC,
+                        help='Port spec, e.g. "common", "top:100", "1-1024,!135-139" (default: common)')
+    parser.add_argument("--stream", action="store_true",
+                        help="Emit newline-delimited JSON events (host_discovered, port_open, host_done, progress, summary)")
+    parser.add_argument("--serve", action="store_true", help="Run as a JSON-RPC scanner daemon")
+    parser.add_argument("--socket", help="Unix socket path for --serve (default: stdin/stdout)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fully scan only new, changed or stale hosts; verify known hosts (see scan_state.py)")
+    parser.add_argument("--state-file", help="Scan state file for --incremental (default: ~/.cache/ntool/scan_state.json)")
+    parser.add_argument("--resume", metavar="SCAN_ID",
+                        help="Continue an interrupted scan from its checkpoint journal (network and ports come from it)")
+    parser.add_argument("--journal-dir", help="Checkpoint journal directory (default: ~/.cache/ntool/scans)")
+    parser.add_argument("--pps", type=float, help="Probes per second ceiling (default: unlimited, backing off on loss)")
+    parser.add_argument("--no-arp", action="store_true",
+                        help="Skip ARP discovery (and loading scapy); use TCP-probe discovery only")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Report per-module import cost and cold-start-to-first-probe time, then exit "
+                             "(non-zero when over --startup-budget)")
+    parser.add_argument("--startup-budget", type=float, default=None, metavar="MS",
+                        help="Cold start to first probe budget for --startup-profile, in milliseconds")
+    parser.add_argument("--first-probe", action="store_true", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
-    network = args.network or auto_detect_network()
-    if not network:
-        print(json.dumps({"ok": False, "error": "Unable to detect network."}))
-        sys.exit(1)
+    if args.startup_profile:
+        import startup_profile
+        budget = args.startup_budget if args.startup_budget is not None else startup_profile.DEFAULT_BUDGET_MS
+        sys.exit(startup_profile.run(__file__, DEFERRED_MODULES, budget))
+
+    if args.first_probe:
+        # Used by --startup-profile: one connect on loopback through the normal probe path
+        asyncio.run(probe_port("127.0.0.1", 9, RttEstimator()))
+        return
+
+    if args.serve:
+        # Warm the ARP path in the background so the first scan does not pay for the import
+        threading.Thread(target=_optional, args=("scapy.all",), daemon=True).start()
+        # Keep the detected network current between scans instead of re-detecting per scan
+        netwatch.get_watcher().start()
+        server = ScanServer()
+        try:
+            asyncio.run(server.serve_unix(args.socket) if args.socket else server.serve_stdio())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    journal = None
+    if args.resume:
+        try:
+            journal = ScanJournal.load(args.resume, args.journal_dir)
+        except ValueError as e:
+            print(json.dumps({"ok": False, "error": str(e)}))
+            sys.exit(1)
+        network, ports = journal.network, compile_ports(journal.ports)
+    else:
+        try:
+            ports = compile_ports(args.ports)
+        except ValueError as e:
+            print(json.dumps({"ok": False, "error": str(e)}))
+            sys.exit(1)
+
+        network = args.network or auto_detect_network()
+        if not network:
+            print(json.dumps({"ok": False, "error": "Unable to detect network."}))
+            sys.exit(1)
 
-    print(json.dumps(asyncio.run(scan_network(network))))
+        try:
+            journal = ScanJournal.create(uuid.uuid4().hex[:12], network, ports.ranges(), args.journal_dir)
+        except OSError as e:
+            print(f"Checkpointing disabled, cannot write journal: {e}", file=sys.stderr)
+    if journal is not None:
+        print(f"scan {journal.scan_id}: if interrupted, continue with --resume {journal.scan_id}", file=sys.stderr)
+
+    state = ScanState(args.state_file) if args.incremental else None
+    emit = None
+    if args.stream:
+        def emit(event):
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+    result = asyncio.run(scan_network(network, ports, emit=emit, keep_hosts=not args.stream,
+                                      arp=not args.no_arp, state=state, journal=journal, pps=args.pps))
+    if state is not None:
+        try:
+            state.save()
+        except OSError as e:
+            print(f"Could not save scan state to {state.path}: {e}", file=sys.stderr)
+    if not args.stream:
+        print(json.dumps(result))
 
 
 if __name__ == "__main__":
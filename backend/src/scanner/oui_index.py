@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+oui_index.py
+Compact MAC vendor index shared by network_scanner_cli.py and scanner_service.py.
+
+The IEEE registries (MA-L 24-bit, MA-M 28-bit and MA-S 36-bit prefixes) are
+compiled offline into one binary file, which is memory-mapped and searched with
+bisect: O(log n) lookups, no parsing at startup, and only the pages touched are
+resident. Layout (little endian, every section 8-byte aligned):
+
+  header   magic "NTOUI\\x00\\x01\\x00", then uint32 counts: MA-L, MA-M, MA-S, vendors, blob size
+  per registry (MA-S, MA-M, MA-L): uint64 prefixes[n] (sorted), uint32 vendor ids[n]
+  uint32 vendor offsets[vendors + 1] into the blob
+  blob     UTF-8 vendor names, each stored once
+
+Usage:
+  python oui_index.py fetch [--out PATH]
+  python oui_index.py build oui.csv mam.csv oui36.csv [--out PATH]
+  python oui_index.py lookup 00:1a:2b:3c:4d:5e [--index PATH]
+
+The CSVs are the IEEE downloads (REGISTRY_URLS): Registry, Assignment,
+Organization Name, ... `fetch` downloads and builds them in one step; it runs in
+the backend build (npm run build:oui) and, when the index is still missing, on
+the first lookup (set NTOOL_OUI_FETCH=0 to skip that and use mac_vendor_lookup).
+"""
+import argparse
+import bisect
+import csv
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import urllib.request
+from functools import lru_cache
+
+MAGIC = b"NTOUI\x00\x01\x00"
+_HEADER = struct.Struct("<8s5I")
+# Registry -> prefix length in bits, longest first (a MA-S block sits inside a MA-L block)
+REGISTRIES = (("MA-S", 36), ("MA-M", 28), ("MA-L", 24))
+CACHE_SIZE = 4096  # MACs whose vendor is remembered; lookups are cheap, so this stays small
+REGISTRY_URLS = (
+    "https://standards-oui.ieee.org/oui/oui.csv",
+    "https://standards-oui.ieee.org/oui28/mam.csv",
+    "https://standards-oui.ieee.org/oui36/oui36.csv",
+)
+FETCH_TIMEOUT = 60.0
+AUTO_FETCH = os.environ.get("NTOOL_OUI_FETCH", "1") != "0"
+
+DEFAULT_INDEX = os.environ.get("NTOOL_OUI_INDEX") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "oui.idx")
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def mac_to_int(mac):
+    """48-bit integer from any common MAC notation, or None."""
+    if isinstance(mac, int):
+        return mac
+    hexonly = re.sub(r"[^0-9a-fA-F]", "", str(mac or ""))
+    return int(hexonly, 16) if len(hexonly) == 12 else None
+
+
+class OuiIndex:
+    """Read-only view of an index file built by build()."""
+
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, n_l, n_m, n_s, n_vendors, blob_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an OUI index")
+        offset = _align(_HEADER.size)
+        self._tables = []
+        for (_, bits), count in zip(REGISTRIES, (n_s, n_m, n_l)):
+            prefixes = view[offset:offset + 8 * count].cast("Q")
+            offset = _align(offset + 8 * count)
+            vendor_ids = view[offset:offset + 4 * count].cast("I")
+            offset = _align(offset + 4 * count)
+            self._tables.append((48 - bits, prefixes, vendor_ids))
+        self._offsets = view[offset:offset + 4 * (n_vendors + 1)].cast("I")
+        offset = _align(offset + 4 * (n_vendors + 1))
+        self._blob = view[offset:offset + blob_size]
+        self.counts = {"MA-L": n_l, "MA-M": n_m, "MA-S": n_s, "vendors": n_vendors}
+
+    def vendor(self, vendor_id):
+        return bytes(self._blob[self._offsets[vendor_id]:self._offsets[vendor_id + 1]]).decode("utf-8")
+
+    def lookup(self, mac):
+        """Vendor name for a MAC (most specific registry first), or None."""
+        value = mac_to_int(mac)
+        if value is None:
+            return None
+        for shift, prefixes, vendor_ids in self._tables:
+            key = value >> shift
+            i = bisect.bisect_left(prefixes, key)
+            if i < len(prefixes) and prefixes[i] == key:
+                return self.vendor(vendor_ids[i])
+        return None
+
+    def close(self):
+        for _, prefixes, vendor_ids in self._tables:
+            prefixes.release()
+            vendor_ids.release()
+        self._offsets.release()
+        self._blob.release()
+        self._map.close()
+
+
+def _read_registry_csv(path):
+    """Yield (prefix length, prefix, vendor) rows from an IEEE registry CSV."""
+    bits_by_registry = dict(REGISTRIES)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or row[0] == "Registry":
+                continue
+            assignment = row[1].strip()
+            bits = bits_by_registry.get(row[0].strip(), len(assignment) * 4)
+            if bits not in (24, 28, 36) or len(assignment) * 4 != bits:
+                continue
+            try:
+                prefix = int(assignment, 16)
+            except ValueError:
+                continue
+            yield bits, prefix, row[2].strip()
+
+
+def build(csv_paths, out_path=DEFAULT_INDEX):
+    """Compile IEEE registry CSVs into an index file. Returns the entry counts."""
+    tables = {bits: {} for _, bits in REGISTRIES}
+    vendor_ids, vendors = {}, []
+    for path in csv_paths:
+        for bits, prefix, name in _read_registry_csv(path):
+            if name not in vendor_ids:
+                vendor_ids[name] = len(vendors)
+                vendors.append(name)
+            tables[bits][prefix] = vendor_ids[name]
+
+    blob = bytearray()
+    offsets = [0]
+    for name in vendors:
+        blob += name.encode("utf-8")
+        offsets.append(len(blob))
+
+    def pad(buf):
+        buf += b"\0" * (_align(len(buf)) - len(buf))
+
+    out = bytearray(_HEADER.pack(MAGIC, len(tables[24]), len(tables[28]), len(tables[36]),
+                                 len(vendors), len(blob)))
+    pad(out)
+    for _, bits in REGISTRIES:
+        entries = sorted(tables[bits].items())
+        out += struct.pack(f"<{len(entries)}Q", *(p for p, _ in entries))
+        pad(out)
+        out += struct.pack(f"<{len(entries)}I", *(v for _, v in entries))
+        pad(out)
+    out += struct.pack(f"<{len(offsets)}I", *offsets)
+    pad(out)
+    out += blob
+
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(out)
+        os.replace(tmp, out_path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return {"MA-L": len(tables[24]), "MA-M": len(tables[28]), "MA-S": len(tables[36]),
+            "vendors": len(vendors), "bytes": len(out)}
+
+
+def fetch(out_path=None, urls=None):
+    """Download the IEEE registry CSVs and build the index at out_path. Returns the entry counts."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, url in enumerate(urls or REGISTRY_URLS):
+            path = os.path.join(tmp, f"registry{i}.csv")
+            request = urllib.request.Request(url, headers={"User-Agent": "ntool-oui-index"})
+            with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response, open(path, "wb") as f:
+                shutil.copyfileobj(response, f)
+            paths.append(path)
+        return build(paths, out_path or DEFAULT_INDEX)
+
+
+# ---- Shared lookup ----
+_index = None
+_index_lock = threading.Lock()
+_fallback = None
+
+
+def _open_default():
+    """The index at DEFAULT_INDEX, fetched and built there first if it is missing; None if unavailable."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                if AUTO_FETCH and not os.path.exists(DEFAULT_INDEX):
+                    print(f"Building the MAC vendor index at {DEFAULT_INDEX} ...", file=sys.stderr)
+                    fetch(DEFAULT_INDEX)
+                _index = OuiIndex(DEFAULT_INDEX)
+            except (OSError, ValueError) as e:
+                print(f"MAC vendor index unavailable ({e}); using mac_vendor_lookup", file=sys.stderr)
+                _index = False
+    return _index or None
+
+
+def _fallback_lookup(mac):
+    """mac_vendor_lookup, imported on first use, for installs without a built index."""
+    global _fallback
+    if _fallback is None:
+        try:
+            from mac_vendor_lookup import MacLookup
+            _fallback = MacLookup()
+        except Exception:
+            _fallback = False
+    if not _fallback:
+        return None
+    try:
+        return _fallback.lookup(mac)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def vendor_for(mac):
+    """Vendor for a normalized MAC string, or None. Uses the index, else mac_vendor_lookup."""
+    index = _open_default()
+    if index is not None:
+        return index.lookup(mac)
+    return _fallback_lookup(mac)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the MAC vendor (OUI) index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fetch_cmd = sub.add_parser("fetch", help="Download the IEEE registries and build the index")
+    fetch_cmd.add_argument("--out", default=DEFAULT_INDEX)
+    build_cmd = sub.add_parser("build", help="Compile IEEE registry CSVs (MA-L, MA-M, MA-S) into an index")
+    build_cmd.add_argument("csv", nargs="+")
+    build_cmd.add_argument("--out", default=DEFAULT_INDEX)
+    lookup_cmd = sub.add_parser("lookup", help="Look up the vendor of one or more MACs")
+    lookup_cmd.add_argument("mac", nargs="+")
+    lookup_cmd.add_argument("--index", default=DEFAULT_INDEX)
+    args = parser.parse_args()
+
+    if args.command in ("build", "fetch"):
+        try:
+            counts = build(args.csv, args.out) if args.command == "build" else fetch(args.out)
+        except OSError as e:
+            print(json.dumps({"ok": False, "error": str(e)}))
+            sys.exit(1)
+        print(json.dumps(counts))
+        return
+    try:
+        index = OuiIndex(args.index)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"ok": False, "error": str(e)}))
+        sys.exit(1)
+    print(json.dumps({mac: index.lookup(mac) for mac in args.mac}))
+
+
+if __name__ == "__main__":
+    main()
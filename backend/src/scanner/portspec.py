@@ -0,0 +1,167 @@
+# scanner/portspec.py
+"""
+Port specification compiler shared by the agent port scanner and the backend
+scanner CLI.
+
+A spec is a comma separated list of tokens:
+  80            single port
+  1-1024        range (either bound may be left out: "-1024", "60000-")
+  top:100       the 100 ports most often found open (capped at len(TOP_PORTS))
+  web           named profile (see PROFILES); "all" is 1-65535
+  !135-139      exclude any of the above
+
+Specs compile to a PortSpec: an 8 KiB bitmap for membership tests plus an
+array of the selected ports in probe order, most frequently open first.
+"""
+from array import array
+from typing import Iterable, Iterator, Union
+
+# Ports ranked by how often they are found open on scanned hosts, most frequent
+# first (derived from nmap's nmap-services open-frequency table, with a few
+# services common on LANs today appended).
+TOP_PORTS = tuple(dict.fromkeys((
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995,
+    993, 5900, 1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000, 514, 5060, 179,
+    1026, 2000, 8443, 8000, 32768, 554, 26, 1433, 49152, 2001, 515, 8008, 49154, 1027, 5666,
+    646, 5000, 5631, 631, 49153, 8081, 2049, 88, 79, 5800, 106, 2121, 1110, 49155, 6000, 513,
+    990, 5357, 427, 49156, 543, 544, 5101, 144, 7, 389, 8009, 3128, 444, 9999, 5009, 7070,
+    5190, 3000, 5432, 1900, 3986, 13, 1029, 9, 5051, 6646, 49157, 1028, 873, 1755, 2717,
+    4899, 9100, 119, 37, 1000, 3001, 5001, 82, 10010, 1030, 9090, 2107, 1024, 2103, 6004,
+    1801, 5050, 19, 8031, 1041, 255, 1048, 1049, 1053, 1054, 1056, 1064, 1065, 2967, 3703,
+    17, 808, 3689, 1031, 1044, 1071, 5901, 100, 9102, 8010, 2869, 1039, 5120, 4001, 9000,
+    2105, 636, 1038, 2601, 1, 7000, 1066, 1069, 625, 311, 280, 254, 4000, 1761, 5003, 2002,
+    2005, 1998, 1032, 1050, 6112, 3690, 1521, 2161, 6002, 1080, 2401, 4045, 902, 7937, 787,
+    1058, 2383, 32771, 1033, 1040, 1059, 50000, 5555, 10001, 1494, 593, 2301, 3, 3268, 7938,
+    1234, 1022, 1074, 8002, 1036, 1035, 9001, 1037, 464, 497, 1935, 6666, 2003, 6543, 1352,
+    24, 3269, 1111, 407, 500, 20, 2006, 3260, 15000, 1218, 1034, 4444, 264, 2004, 33, 1042,
+    42510, 999, 3052, 1023, 1068, 222, 7100, 888, 563, 1717, 2008, 992, 32770, 32772, 7001,
+    8082, 2007, 5550, 2009, 5801, 1043, 512, 2701, 7019, 50001,
+    5985, 5986, 6379, 27017, 9200, 11211, 1883, 8883, 9443, 5984, 137,
+)))
+
+PROFILES = {
+    "common": (21, 22, 23, 25, 53, 80, 110, 139, 143, 161, 443, 445, 3306, 3389, 5900, 8080),
+    "web": (80, 81, 443, 591, 3000, 5000, 8000, 8008, 8080, 8081, 8443, 8888, 9000, 9090, 9443),
+    "db": (1433, 1521, 3306, 5432, 5984, 6379, 9200, 11211, 27017),
+    "remote": (22, 23, 3389, 5800, 5900, 5901, 5985, 5986),
+    "mail": (25, 110, 143, 465, 587, 993, 995),
+    "windows": (135, 137, 139, 445, 3389, 5985, 5986),
+    "iot": (23, 80, 554, 1883, 8080, 8883, 49152),
+}
+
+MAX_PORT = 65535
+
+
+class PortSpec:
+    """A compiled port set: bitmap for membership, array for probe order."""
+
+    __slots__ = ("spec", "bitmap", "order")
+
+    def __init__(self, spec: str, bitmap: bytearray, order: array):
+        self.spec = spec
+        self.bitmap = bitmap
+        self.order = order
+
+    def __contains__(self, port: int) -> bool:
+        return 0 < port <= MAX_PORT and bool(self.bitmap[port >> 3] & (1 << (port & 7)))
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __iter__(self) -> Iterator[int]:
+        """Ports in probe order (most frequently open first)."""
+        return iter(self.order)
+
+    def ranges(self) -> str:
+        """Canonical ascending form, e.g. '1-1024,3389'."""
+        parts = []
+        start = prev = None
+        for port in sorted(self.order):
+            if prev is not None and port == prev + 1:
+                prev = port
+                continue
+            if start is not None:
+                parts.append(str(start) if start == prev else f"{start}-{prev}")
+            start = prev = port
+        if start is not None:
+            parts.append(str(start) if start == prev else f"{start}-{prev}")
+        return ",".join(parts)
+
+    def __repr__(self) -> str:
+        return f"PortSpec({self.spec!r}, {len(self)} ports)"
+
+
+def _expand(token: str) -> Iterable[int]:
+    name = token.lower()
+    if name == "all":
+        return range(1, MAX_PORT + 1)
+    if name in PROFILES:
+        return PROFILES[name]
+    if name.startswith("top:"):
+        count = int(name[4:])
+        if count < 0:
+            raise ValueError(f"invalid port token {token!r}")
+        return TOP_PORTS[:count]
+    if "-" in name:
+        lo, hi = name.split("-", 1)
+        start = int(lo) if lo else 1
+        end = int(hi) if hi else MAX_PORT
+        if end < start:
+            start, end = end, start
+        return range(max(1, start), min(MAX_PORT, end) + 1)
+    return (int(name),)
+
+
+def compile_ports(spec: Union[str, Iterable[int], PortSpec]) -> PortSpec:
+    """Compile a spec string (or an iterable of ports) into a PortSpec. Raises ValueError on bad input."""
+    if isinstance(spec, PortSpec):
+        return spec
+
+    include, exclude = [], []
+    if isinstance(spec, str):
+        for token in spec.replace(" ", "").split(","):
+            if not token:
+                continue
+            try:
+                if token.startswith("!"):
+                    exclude.append(_expand(token[1:]))
+                else:
+                    include.append(_expand(token))
+            except ValueError:
+                raise ValueError(f"invalid port token {token!r}")
+        text = spec
+    else:
+        include.append([int(p) for p in spec])
+        text = None
+
+    bitmap = bytearray((MAX_PORT >> 3) + 1)
+    for ports in include:
+        for p in ports:
+            if 0 < p <= MAX_PORT:
+                bitmap[p >> 3] |= 1 << (p & 7)
+    for ports in exclude:
+        for p in ports:
+            if 0 < p <= MAX_PORT:
+                bitmap[p >> 3] &= ~(1 << (p & 7)) & 0xFF
+
+    # Probe order: ranked ports first, then everything else ascending
+    order = array("H")
+    ranked = set()
+    for p in TOP_PORTS:
+        if bitmap[p >> 3] & (1 << (p & 7)):
+            order.append(p)
+            ranked.add(p)
+    for i, byte in enumerate(bitmap):
+        if not byte:
+            continue
+        base = i << 3
+        for bit in range(8):
+            if byte & (1 << bit):
+                p = base + bit
+                if p and p not in ranked:
+                    order.append(p)
+
+    compiled = PortSpec(text or "", bitmap, order)
+    if text is None:
+        compiled.spec = compiled.ranges()
+    return compiled
@@ -0,0 +1,132 @@
+# scanner/ratelimit.py
+"""
+Probe rate controller shared by the agent scanners (functions/ports.py,
+functions/network_scan.py) and the backend scanners (network_scanner_cli.py,
+scanner_service.py).
+
+A token bucket paces probes; its rate follows AIMD feedback, like TCP
+congestion control:
+  - every `window` probe outcomes, the share that timed out is compared with a
+    slowly moving baseline (dead addresses and filtered ports always time out,
+    so only a jump above the usual share means the link is dropping probes)
+  - on a jump the rate is cut by `decrease` (multiplicative decrease), starting
+    from the rate actually achieved when the bucket was not limiting yet
+  - the baseline keeps drifting towards the observed share during spikes, and
+    after `rearm` consecutive cuts it is reset to it: a share that stays high
+    (a filtered host joining the scan) is the new normal, not ongoing loss
+  - each clean window adds a fixed `increase` pps back, up to max_pps or, when
+    unlimited, the rate measured before the first cut (additive increase)
+With max_pps=None probes are unpaced until the first loss spike. Send rates are
+measured over active time only; gaps longer than IDLE_GAP between sends are skipped.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+IDLE_GAP = 0.5  # seconds between sends that count as idle rather than sending time
+
+
+class RateController:
+    """Token bucket with AIMD feedback. delay() doubles as a discovery pacer."""
+
+    def __init__(self, max_pps: Optional[float] = None, min_pps: float = 20.0, window: int = 64,
+                 spike: float = 0.15, decrease: float = 0.5, increase: Optional[float] = None,
+                 rearm: int = 3):
+        self.max_pps = max_pps
+        self.min_pps = min(min_pps, max_pps) if max_pps else min_pps
+        self.window = window
+        self.spike = spike
+        self.decrease = decrease
+        self.increase = increase or (max_pps / 20 if max_pps else None)  # fixed at the first cut otherwise
+        self.rearm = rearm
+        self.ceiling = max_pps
+        self.rate = None
+        self._tokens = 0.0
+        self._burst = 0.0
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+        self._last_send = None
+        self._active = 0.0  # seconds spent sending, idle gaps excluded
+        self._baseline = None
+        self._streak = 0    # consecutive cuts
+        self._w_answered = self._w_timeouts = 0
+        self._w_sent, self._w_active = 0, 0.0
+        self.sent = self.answered = self.timeouts = self.backoffs = 0
+        if max_pps:
+            self._set_rate(max_pps)
+            self._tokens = self._burst
+
+    def _set_rate(self, rate: float) -> None:
+        self.rate = rate
+        self._burst = max(1.0, rate / 20)
+        self._tokens = min(self._tokens, self._burst)
+
+    def delay(self) -> float:
+        """Take a send token and return 0, or return the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate is not None:
+                self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens < 1:
+                    return (1 - self._tokens) / self.rate
+                self._tokens -= 1
+            if self._last_send is not None and now - self._last_send < IDLE_GAP:
+                self._active += now - self._last_send
+            self._last_send = now
+            self.sent += 1
+            return 0.0
+
+    def record(self, answered: int = 0, timeouts: int = 0) -> None:
+        """Feed probe outcomes: answered (any reply, including a refusal) or timed out."""
+        with self._lock:
+            self.answered += answered
+            self.timeouts += timeouts
+            self._w_answered += answered
+            self._w_timeouts += timeouts
+            total = self._w_answered + self._w_timeouts
+            if total < self.window:
+                return
+            ratio = self._w_timeouts / total
+            window_pps = None
+            if self._active > self._w_active:
+                window_pps = (self.sent - self._w_sent) / (self._active - self._w_active)
+            self._w_answered = self._w_timeouts = 0
+            self._w_sent, self._w_active = self.sent, self._active
+
+            if self._baseline is None:
+                self._baseline = ratio
+            elif ratio > self._baseline + self.spike:
+                current = self.rate if self.rate is not None else (window_pps or self.min_pps)
+                if self.ceiling is None:
+                    self.ceiling = max(current, self.min_pps)
+                if self.increase is None:
+                    self.increase = max(1.0, self.ceiling / 20)
+                self._set_rate(max(self.min_pps, current * self.decrease))
+                self.backoffs += 1
+                self._streak += 1
+                if self._streak >= self.rearm:
+                    self._baseline, self._streak = ratio, 0
+                else:
+                    self._baseline = 0.9375 * self._baseline + 0.0625 * ratio
+            else:
+                self._streak = 0
+                self._baseline = 0.875 * self._baseline + 0.125 * ratio
+                if self.rate is not None:
+                    self._set_rate(min(self.ceiling, self.rate + self.increase))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, achieved send rate and drop (timeout) rate."""
+        with self._lock:
+            elapsed = self._active
+            outcomes = self.answered + self.timeouts
+            return {
+                "pps_limit": round(self.rate, 1) if self.rate is not None else None,
+                "max_pps": self.max_pps,
+                "achieved_pps": round(self.sent / elapsed, 1) if elapsed > 0 else None,
+                "sent": self.sent,
+                "answered": self.answered,
+                "timeouts": self.timeouts,
+                "drop_rate": round(self.timeouts / outcomes, 4) if outcomes else None,
+                "backoffs": self.backoffs,
+            }
@@ -0,0 +1,145 @@
+"""
+Checkpoint journal for long scans (network_scanner_cli.py --resume SCAN_ID).
+
+Each scan appends to <journal dir>/<scan_id>.journal, one JSON array per line:
+
+  ["scan", scan_id, network, ports, block_size, started]   header
+  ["hosts", [[ip, mac], ...]]                                discovery finished
+  ["unit", ip, block, {port: banner}]                        one port block of a host finished
+
+A block is BLOCK_SIZE consecutive ports of the spec's probe order, so the same
+spec always splits the same way. Units are buffered and appended every
+CHECKPOINT_INTERVAL seconds; a crash loses at most that much work. The journal
+is removed when the scan completes and kept when it is cancelled or dies, so a
+later run can skip discovery and every finished unit, and merge their results.
+Journals nobody resumed are pruned MAX_AGE after their last write, whenever a
+new scan starts.
+"""
+import json
+import os
+import time
+from array import array
+
+from scan_state import cache_dir
+
+BLOCK_SIZE = 256
+CHECKPOINT_INTERVAL = 2.0  # seconds between journal flushes
+MAX_AGE = 7 * 86400        # seconds an abandoned journal is kept
+
+
+def default_journal_dir():
+    return os.path.join(cache_dir(), "scans")
+
+
+def block_map(ports):
+    """Port -> block index over the spec's probe order, as a 64K array."""
+    blocks = array("H", bytes(2 * 65536))
+    for i, port in enumerate(ports):
+        blocks[port] = i // BLOCK_SIZE
+    return blocks
+
+
+class ScanJournal:
+    def __init__(self, path, scan_id, network, ports):
+        self.path = path
+        self.scan_id = scan_id
+        self.network = network
+        self.ports = ports
+        self.hosts = None    # [{"ip", "mac"}] once discovery has been journaled
+        self.units = {}      # ip -> {block: {port: banner}}
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def create(cls, scan_id, network, ports, directory=None):
+        """Start a journal for a new scan. `ports` is the scan's port spec string."""
+        directory = directory or default_journal_dir()
+        os.makedirs(directory, exist_ok=True)
+        cls.prune(directory)
+        journal = cls(os.path.join(directory, f"{scan_id}.journal"), scan_id, network, ports)
+        journal._pending.append(["scan", scan_id, network, ports, BLOCK_SIZE, time.time()])
+        journal.flush()
+        return journal
+
+    @staticmethod
+    def prune(directory=None, max_age=MAX_AGE):
+        """Remove journals not written to for max_age seconds; returns the scan ids removed."""
+        directory = directory or default_journal_dir()
+        cutoff = time.time() - max_age
+        removed = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return removed
+        for entry in entries:
+            if not entry.name.endswith(".journal"):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed.append(entry.name[:-len(".journal")])
+            except OSError:
+                continue  # removed concurrently, or not ours to remove
+        return removed
+
+    @classmethod
+    def load(cls, scan_id, directory=None):
+        """Reopen the journal of an interrupted scan. Raises ValueError if there is none."""
+        path = os.path.join(directory or default_journal_dir(), f"{scan_id}.journal")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            raise ValueError(f"no journal for scan {scan_id!r}")
+        journal = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            kind = record[0]
+            if kind == "scan":
+                if record[4] != BLOCK_SIZE:
+                    raise ValueError(f"journal for scan {scan_id!r} uses a different block size")
+                journal = cls(path, record[1], record[2], record[3])
+            elif journal is None:
+                break
+            elif kind == "hosts":
+                journal.hosts = [{"ip": ip, "mac": mac} for ip, mac in record[1]]
+            elif kind == "unit":
+                _, ip, block, found = record
+                journal.units.setdefault(ip, {})[block] = {int(p): b for p, b in found.items()}
+        if journal is None:
+            raise ValueError(f"journal for scan {scan_id!r} is unreadable")
+        return journal
+
+    def record_hosts(self, hosts):
+        self.hosts = [{"ip": h["ip"], "mac": h.get("mac", "")} for h in hosts]
+        self._pending.append(["hosts", [[h["ip"], h["mac"]] for h in self.hosts]])
+        self.flush()
+
+    def record_unit(self, ip, block, found):
+        """found: {port: banner} of the open ports in this block."""
+        self.units.setdefault(ip, {})[block] = found
+        self._pending.append(["unit", ip, block, found])
+        if time.monotonic() - self._last_flush >= CHECKPOINT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in self._pending)
+        self._pending = []
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def complete(self):
+        """The scan finished: its journal is no longer needed."""
+        self._pending = []
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
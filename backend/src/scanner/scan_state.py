@@ -0,0 +1,123 @@
+"""
+On-disk scan state for incremental rescans (network_scanner_cli.py --incremental).
+
+State is kept per network CIDR and per host (keyed by MAC, or by IP when the MAC
+is unknown): last-seen open ports with their banners, and when the host was last
+seen and last fully scanned. For each discovered host, plan() decides:
+
+  full    host is new, its MAC changed, its last full scan is older than
+          STALE_AFTER, or the port spec differs from the one it was scanned with
+  verify  re-probe the previously open ports plus a rotating sample of the
+          others, so every port is eventually revisited without a full scan
+"""
+import json
+import os
+import time
+
+STATE_VERSION = 1
+STALE_AFTER = 24 * 3600          # seconds before a known host gets a full rescan again
+PRUNE_AFTER = 30 * 24 * 3600     # hosts unseen this long are dropped from the state
+SAMPLE_SIZE = 64                 # not-previously-open ports re-probed per verify pass
+
+
+def cache_dir():
+    base = (os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "ntool")
+
+
+def default_state_path():
+    return os.path.join(cache_dir(), "scan_state.json")
+
+
+def host_key(ip, mac):
+    return mac.lower() if mac else f"ip:{ip}"
+
+
+class ScanState:
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("NTOOL_SCAN_STATE") or default_state_path()
+        self.networks = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self.networks = data.get("networks", {})
+        except (OSError, ValueError, AttributeError):
+            pass  # missing or unreadable state: everything gets a full scan
+
+    def _hosts(self, network):
+        return self.networks.setdefault(network, {}).setdefault("hosts", {})
+
+    def plan(self, network, ip, mac, ports, now=None):
+        """
+        Return {"mode", "reason", "ports"} for one discovered host, where "ports"
+        is the list to probe (in the spec's probe order).
+        """
+        now = now or time.time()
+        hosts = self._hosts(network)
+        record = hosts.get(host_key(ip, mac))
+        reason = None
+        if record is None:
+            previous = next((r for r in hosts.values() if r.get("ip") == ip), None)
+            reason = "mac_changed" if previous is not None and previous.get("mac") != (mac or "") else "new"
+        elif now - record.get("last_full_scan", 0) > STALE_AFTER:
+            reason = "stale"
+        elif record.get("ports") != ports.ranges():
+            reason = "ports_changed"
+        if reason:
+            return {"mode": "full", "reason": reason, "ports": list(ports)}
+
+        previously_open = [p for p in map(int, record.get("open_ports", {})) if p in ports]
+        skip = set(previously_open)
+        others = [p for p in ports if p not in skip]
+        sample = []
+        if others:
+            cursor = record.get("cursor", 0) % len(others)
+            sample = (others[cursor:] + others[:cursor])[:SAMPLE_SIZE]
+            record["cursor"] = cursor + len(sample)
+        return {"mode": "verify", "reason": "known", "ports": previously_open + sample}
+
+    def record(self, network, host_entry, plan, ports, now=None):
+        """Store the outcome of a host scan made according to plan()."""
+        now = now or time.time()
+        ip, mac = host_entry["ip"], host_entry.get("mac", "")
+        hosts = self._hosts(network)
+        key = host_key(ip, mac)
+        # An address that moved to a new MAC (or lost/gained one) no longer describes the old record
+        for other_key in [k for k, r in hosts.items() if r.get("ip") == ip and k != key]:
+            del hosts[other_key]
+
+        record = hosts.get(key) or {"first_seen": now, "open_ports": {}, "cursor": 0}
+        previous = record["open_ports"]
+        if plan["mode"] == "full":
+            previous = {}
+            record["last_full_scan"] = now
+            record["ports"] = ports.ranges()
+            record["cursor"] = 0
+        else:
+            previous = {p: v for p, v in previous.items() if int(p) not in plan["ports"]}
+
+        found = {}
+        for port, info in host_entry.get("open_ports", {}).items():
+            old = record["open_ports"].get(str(port), {})
+            found[str(port)] = {
+                "banner": info.get("banner", ""),
+                "first_seen": old.get("first_seen", now),
+                "last_seen": now,
+            }
+        previous.update(found)
+        record.update({"ip": ip, "mac": mac, "last_seen": now, "open_ports": previous})
+        hosts[key] = record
+
+    def save(self, now=None):
+        now = now or time.time()
+        for network in self.networks.values():
+            hosts = network.get("hosts", {})
+            for key in [k for k, r in hosts.items() if now - r.get("last_seen", 0) > PRUNE_AFTER]:
+                del hosts[key]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": STATE_VERSION, "networks": self.networks}, f)
+        os.replace(tmp, self.path)
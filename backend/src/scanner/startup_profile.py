@@ -0,0 +1,88 @@
+"""
+Startup cost reporting for the scanner entry points (--startup-profile).
+
+Node starts network_scanner_cli.py and scanner_service.py fresh, so every
+millisecond spent importing is paid per request. This module measures that:
+
+  - per-module import cost of the entry point, from `python -X importtime`
+  - the cost of each deferred (lazily imported) optional dependency
+  - wall time from interpreter launch to the first probe completing
+    (the entry point's --first-probe mode), checked against a budget
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Cold start to first probe, in milliseconds, before --startup-profile fails
+DEFAULT_BUDGET_MS = 1000
+TOP_MODULES = 25
+
+
+def import_profile(module, cwd, top=TOP_MODULES):
+    """Import `module` in a fresh interpreter and return its -X importtime breakdown."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    rows = []
+    total_ms = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # column header
+        name = parts[2].strip()
+        rows.append({"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000})
+        if name == module:
+            total_ms = cumulative_us / 1000
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "total_ms": total_ms,
+        "modules_imported": len(rows),
+        "top": rows[:top],
+    }
+
+
+def cold_start_ms(script, cwd):
+    """Wall time for `python script --first-probe`: interpreter start, imports, one probe, exit."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, script, "--first-probe"], cwd=cwd,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = (time.perf_counter() - started) * 1000
+    return round(elapsed, 1), proc.returncode == 0
+
+
+def run(script, deferred=(), budget_ms=DEFAULT_BUDGET_MS):
+    """Print the startup report for `script` as JSON; return the process exit code."""
+    script = os.path.abspath(script)
+    cwd = os.path.dirname(script)
+    module = os.path.splitext(os.path.basename(script))[0]
+
+    report = {"ok": True, "entry_point": module, "import": import_profile(module, cwd)}
+    report["deferred"] = {}
+    for name in deferred:
+        profile = import_profile(name, cwd, top=0)
+        report["deferred"][name] = profile["total_ms"] if profile["ok"] else None
+
+    elapsed, probed = cold_start_ms(script, cwd)
+    report["cold_start_to_first_probe_ms"] = elapsed
+    report["budget_ms"] = budget_ms
+    report["within_budget"] = probed and elapsed <= budget_ms
+    if not probed:
+        report["ok"] = False
+        report["error"] = "--first-probe run failed"
+    elif not report["within_budget"]:
+        report["ok"] = False
+        report["error"] = f"cold start took {elapsed} ms, budget is {budget_ms} ms"
+
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
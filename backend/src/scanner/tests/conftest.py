@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scanner modules are plain scripts next to this directory, imported by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
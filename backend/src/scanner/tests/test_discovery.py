@@ -0,0 +1,33 @@
+import errno
+import socket
+
+import discovery
+
+
+class FlakySocket(socket.socket):
+    """connect_ex raises for one address, as Windows does for some unroutable ones."""
+
+    def connect_ex(self, address):
+        if address[0] == "127.0.0.2":
+            raise OSError(errno.EINVAL, "invalid argument")
+        return super().connect_ex(address)
+
+
+def test_tcp_probe_errors_fail_only_that_host(monkeypatch):
+    monkeypatch.setattr(discovery.socket, "socket", FlakySocket)
+    # Nothing listens on the probe ports, so 127.0.0.1 answers with RSTs
+    assert list(discovery._tcp_iter(["127.0.0.2", "127.0.0.1"], timeout=1.0)) == ["127.0.0.1"]
+
+
+def test_tcp_probe_out_of_descriptors_keeps_going(monkeypatch):
+    calls = []
+    real_socket = socket.socket
+
+    def exhausted(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError(errno.EMFILE, "too many open files")
+        return real_socket(*args)
+
+    monkeypatch.setattr(discovery.socket, "socket", exhausted)
+    assert list(discovery._tcp_iter(["127.0.0.1"], timeout=1.0)) == ["127.0.0.1"]
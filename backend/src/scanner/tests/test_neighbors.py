@@ -0,0 +1,60 @@
+import socket
+import struct
+
+import neighbors
+from neighbors import NDA_DST, NDA_LLADDR, NUD_REACHABLE, RTM_NEWNEIGH
+
+
+def attr(kind, value):
+    data = struct.pack("=HH", 4 + len(value), kind) + value
+    return data + b"\0" * (-len(data) % 4)
+
+
+def neigh_message(ip, mac, state=NUD_REACHABLE, family=socket.AF_INET):
+    body = struct.pack("=BBHiHBB", family, 0, 0, 2, state, 0, 1)
+    body += attr(NDA_DST, socket.inet_aton(ip)) + attr(NDA_LLADDR, bytes.fromhex(mac.replace(":", "")))
+    return struct.pack("=IHHII", 16 + len(body), RTM_NEWNEIGH, 0, 1, 0) + body
+
+
+def test_parses_a_dump():
+    data = neigh_message("192.0.2.1", "aa:bb:cc:00:11:22") + neigh_message("192.0.2.7", "00:00:00:00:00:00")
+    entries = [neighbors._parse_neigh(payload) for kind, payload in neighbors._messages(data)]
+    assert entries == [("192.0.2.1", "aa:bb:cc:00:11:22", NUD_REACHABLE), ("192.0.2.7", None, NUD_REACHABLE)]
+    assert not neighbors._usable(entries[1][1], entries[1][2])
+
+
+def test_truncated_message_is_dropped():
+    first = neigh_message("192.0.2.1", "aa:bb:cc:00:11:22")
+    data = first + neigh_message("192.0.2.2", "aa:bb:cc:00:11:33")
+    for cut in range(len(first) + 1, len(data)):
+        assert [p for _, p in neighbors._messages(data[:cut])] == [first[16:]]
+    assert list(neighbors._messages(first[:10])) == []
+
+
+def test_truncated_or_foreign_payloads():
+    payload = neigh_message("192.0.2.1", "aa:bb:cc:00:11:22")[16:]
+    assert neighbors._parse_neigh(payload[:8]) is None                  # shorter than ndmsg
+    assert neighbors._parse_neigh(payload[:12 + 6]) is None             # cut inside NDA_DST
+    assert neighbors._parse_neigh(payload[:12 + 8 + 6]) == ("192.0.2.1", None, NUD_REACHABLE)  # cut MAC
+    ipv6 = neigh_message("192.0.2.1", "aa:bb:cc:00:11:22", family=socket.AF_INET6)[16:]
+    assert neighbors._parse_neigh(ipv6) is None
+
+
+def test_proc_fallback(tmp_path):
+    arp = tmp_path / "arp"
+    arp.write_text(
+        "IP address       HW type     Flags       HW address            Mask     Device\n"
+        "192.0.2.1        0x1         0x2         AA:BB:CC:00:11:22     *        eth0\n"
+        "192.0.2.9        0x1         0x0         00:00:00:00:00:00     *        eth0\n")
+    assert neighbors._neighbors_from_proc(str(arp)) == {"192.0.2.1": "aa:bb:cc:00:11:22"}
+
+
+def test_read_neighbors_tells_an_empty_table_from_an_unreadable_one(monkeypatch):
+    def unreadable(*_):
+        raise OSError("no netlink")
+
+    monkeypatch.setattr(neighbors, "_neighbors_from_netlink", lambda: {})
+    assert neighbors.read_neighbors() == {}
+    monkeypatch.setattr(neighbors, "_neighbors_from_netlink", unreadable)
+    monkeypatch.setattr(neighbors, "_neighbors_from_proc", unreadable)
+    assert neighbors.read_neighbors() is None
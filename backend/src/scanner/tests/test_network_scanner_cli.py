@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import network_scanner_cli as cli
+from scan_journal import ScanJournal
+
+
+def test_discovery_ports_outside_the_spec_are_dropped(tmp_path, monkeypatch):
+    async def discovered(network_cidr, on_probe=None, rate=None):
+        # Discovery found 127.0.0.1 through port 80, which the scan did not ask for
+        return [{"ip": "127.0.0.1", "mac": "", "open_ports": {80: {"banner": "nginx"}}}]
+
+    monkeypatch.setattr(cli, "tcp_discover", discovered)
+    journal = ScanJournal.create("s", "127.0.0.1/32", "1-3", str(tmp_path))
+    progress = {}
+    result = asyncio.run(cli.scan_network("127.0.0.1/32", "1-3", progress=progress, arp=False, journal=journal))
+
+    host, = result["hosts"]
+    assert host["open_ports"] == {}
+    assert progress["probes_done"] == progress["probes_total"] == 3
+
+
+def rpc(server, line):
+    replies = []
+    asyncio.run(server.handle_line(line, lambda text: replies.append(json.loads(text))))
+    return replies
+
+
+def test_rpc_rejects_requests_that_are_not_objects():
+    server = cli.ScanServer()
+    for line in ("[]", "1", '"x"', "null", '[{"jsonrpc": "2.0", "id": 1, "method": "scan.progress"}]'):
+        assert rpc(server, line) == [{"jsonrpc": "2.0", "id": None,
+                                      "error": {"code": -32600, "message": "Invalid Request"}}], line
+    assert rpc(server, "{")[0]["error"]["code"] == -32700
+
+
+def test_rpc_error_replies():
+    server = cli.ScanServer()
+    unknown = rpc(server, '{"jsonrpc": "2.0", "id": 1, "method": "scan.nope"}')
+    assert unknown[0]["error"]["code"] == -32601
+    bad_params = rpc(server, '{"jsonrpc": "2.0", "id": 2, "method": "scan.progress", "params": [1]}')
+    assert bad_params[0]["error"]["code"] == -32602
+    missing = rpc(server, '{"jsonrpc": "2.0", "id": 3, "method": "scan.progress", "params": {"scan_id": "x"}}')
+    assert missing == [{"jsonrpc": "2.0", "id": 3, "error": {"code": -32602, "message": "Unknown scan_id x"}}]
+    # Notifications (no id) get no reply
+    assert rpc(server, '{"jsonrpc": "2.0", "method": "scan.nope"}') == []
+
+
+def test_rtt_estimator_timeouts():
+    rtt = cli.RttEstimator(initial=0.5, floor=0.05, ceiling=2.0, banner_floor=0.3, banner_ceiling=3.0)
+    assert (rtt.connect_timeout(), rtt.banner_timeout()) == (0.5, 3.0)
+    for sample in (0.100, 0.200):
+        rtt.add(sample)
+    assert (rtt.srtt, rtt.rttvar) == (pytest.approx(0.1125), pytest.approx(0.0625))
+    assert rtt.connect_timeout() == pytest.approx(0.3625)
+    assert rtt.banner_timeout() == pytest.approx(0.725)  # two round trips' worth
+    for _ in range(100):
+        rtt.add(0.001)
+    assert (rtt.connect_timeout(), rtt.banner_timeout()) == (0.05, 0.3)
+
+
+def test_deferred_modules_are_not_imported_at_startup():
+    # In a fresh interpreter: this test process may already have imported them
+    script = ("import json, sys, network_scanner_cli as m; "
+              "deferred = {d.split('.')[0] for d in m.DEFERRED_MODULES}; "
+              "print(json.dumps(sorted(n for n in sys.modules if n.split('.')[0] in deferred)))")
+    out = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(cli.__file__),
+                         capture_output=True, text=True, check=True).stdout
+    assert json.loads(out) == []
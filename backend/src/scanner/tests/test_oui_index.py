@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import oui_index
+from oui_index import OuiIndex, build, mac_to_int
+
+HEADER = "Registry,Assignment,Organization Name,Organization Address\n"
+
+
+def write_registries(directory):
+    # One MA-L block with a MA-M block inside it, and a MA-S block inside that
+    (directory / "oui.csv").write_text(HEADER + 'MA-L,001A2B,Large Corp,"1 Main St"\n'
+                                                "MA-L,ACDE48,Private,\n")
+    (directory / "mam.csv").write_text(HEADER + "MA-M,001A2B3,Medium Corp,\n")
+    (directory / "oui36.csv").write_text(HEADER + "MA-S,001A2B3C4,Small Corp,\n"
+                                                  "MA-S,bogus,Broken Row,\n")
+    return [directory / n for n in ("oui.csv", "mam.csv", "oui36.csv")]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "oui.idx")
+    counts = build([str(p) for p in write_registries(tmp_path)], path)
+    assert counts["MA-L"] == 2 and counts["MA-M"] == 1 and counts["MA-S"] == 1
+    idx = OuiIndex(path)
+    yield idx
+    idx.close()
+
+
+def test_most_specific_registry_wins(index):
+    assert index.lookup("00:1a:2b:3c:4d:5e") == "Small Corp"     # MA-S 001A2B3C4
+    assert index.lookup("00:1a:2b:3c:5d:5e") == "Medium Corp"    # MA-M 001A2B3 only
+    assert index.lookup("00:1a:2b:4c:4d:5e") == "Large Corp"     # MA-L 001A2B only
+    assert index.lookup("ac:de:48:00:00:01") == "Private"
+    assert index.lookup("00:1a:2c:00:00:00") is None
+
+
+def test_mac_notations(index):
+    assert index.lookup("001A.2B3C.4D5E") == "Small Corp"
+    assert index.lookup("00-1A-2B-3C-4D-5E") == "Small Corp"
+    assert index.lookup(0x001A2B3C4D5E) == "Small Corp"
+    assert index.lookup("00:1a:2b") is None
+    assert mac_to_int("not a mac") is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.idx"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        OuiIndex(str(path))
+
+
+def test_default_index_lives_next_to_the_module():
+    if not os.environ.get("NTOOL_OUI_INDEX"):
+        assert os.path.dirname(oui_index.DEFAULT_INDEX) == os.path.dirname(os.path.abspath(oui_index.__file__))
+
+
+def test_missing_default_index_is_fetched_on_first_use(tmp_path, monkeypatch):
+    csvs = write_registries(tmp_path)
+    path = str(tmp_path / "out" / "oui.idx")
+    os.makedirs(os.path.dirname(path))
+    monkeypatch.setattr(oui_index, "DEFAULT_INDEX", path)
+    monkeypatch.setattr(oui_index, "REGISTRY_URLS", tuple(p.as_uri() for p in csvs))
+    monkeypatch.setattr(oui_index, "AUTO_FETCH", True)
+    monkeypatch.setattr(oui_index, "_index", None)
+
+    index = oui_index._open_default()
+    assert index is not None and index.lookup("00:1a:2b:3c:4d:5e") == "Small Corp"
+    assert os.listdir(os.path.dirname(path)) == ["oui.idx"]  # no temporary files left
+    index.close()
+
+
+def test_failed_fetch_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(oui_index, "DEFAULT_INDEX", str(tmp_path / "oui.idx"))
+    monkeypatch.setattr(oui_index, "REGISTRY_URLS", ((tmp_path / "missing.csv").as_uri(),))
+    monkeypatch.setattr(oui_index, "AUTO_FETCH", True)
+    monkeypatch.setattr(oui_index, "_index", None)
+    assert oui_index._open_default() is None
+    assert not (tmp_path / "oui.idx").exists()
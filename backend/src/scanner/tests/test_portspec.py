@@ -0,0 +1,28 @@
+import pytest
+
+from portspec import TOP_PORTS, compile_ports
+
+
+def test_ranges_profiles_and_exclusions():
+    spec = compile_ports("1-10, web, !3-5")
+    assert 4 not in spec and 10 in spec and 8443 in spec
+    assert compile_ports("-3,65534-").ranges() == "1-3,65534-65535"
+    assert compile_ports("20-10").ranges() == "10-20"
+    assert list(compile_ports("top:5")) == list(TOP_PORTS[:5])
+    assert len(compile_ports("all")) == 65535
+
+
+def test_probe_order_is_frequency_first():
+    order = list(compile_ports("1-1024"))
+    assert order[:3] == [80, 23, 443]
+    assert sorted(order) == list(range(1, 1025))
+
+
+@pytest.mark.parametrize("spec", ["http", "80-x", "1-2-3", "top:x", "top:-5", "!nope", "80;443", "0x50"])
+def test_malformed_specs_raise(spec):
+    with pytest.raises(ValueError, match="invalid port token"):
+        compile_ports(spec)
+
+
+def test_empty_tokens_are_skipped():
+    assert compile_ports(",,80,").ranges() == "80"
@@ -0,0 +1,46 @@
+from ratelimit import RateController
+
+
+def feed(rc, windows, timeout_share, window=64):
+    timeouts = round(window * timeout_share)
+    for _ in range(windows):
+        for _ in range(window):
+            rc.delay()
+        rc.record(answered=window - timeouts, timeouts=timeouts)
+
+
+def test_steady_timeout_share_does_not_cut_rate():
+    rc = RateController(max_pps=1000)
+    feed(rc, 50, 0.5)
+    assert rc.backoffs == 0
+    assert rc.rate == 1000
+
+
+def test_sustained_shift_rearms_baseline():
+    # A responsive host, then a filtered one joins: half the probes time out from
+    # then on, with no real loss. Only the first few windows may cut the rate.
+    rc = RateController(max_pps=1000)
+    feed(rc, 5, 0.0)
+    feed(rc, 60, 0.5)
+    assert rc.backoffs <= rc.rearm
+    assert rc.rate == 1000  # additive increase recovered
+
+
+def test_loss_spike_cuts_then_recovers_additively():
+    rc = RateController(max_pps=1000)
+    feed(rc, 5, 0.1)
+    feed(rc, 1, 0.9)
+    assert rc.backoffs == 1
+    assert rc.rate == 500
+    feed(rc, 1, 0.1)
+    assert rc.rate == 550  # fixed step of max_pps / 20
+
+
+def test_unlimited_rate_recovers_to_measured_ceiling():
+    rc = RateController()
+    feed(rc, 5, 0.0)
+    feed(rc, 1, 0.9)
+    assert rc.rate is not None and rc.ceiling is not None
+    assert rc.rate <= rc.ceiling
+    feed(rc, 200, 0.0)
+    assert rc.rate == rc.ceiling
@@ -0,0 +1,65 @@
+import os
+import time
+
+import pytest
+
+from portspec import compile_ports
+from scan_journal import BLOCK_SIZE, ScanJournal, block_map
+
+
+def test_prune_removes_only_abandoned_journals(tmp_path):
+    old = ScanJournal.create("old", "10.0.0.0/24", "1-1024", str(tmp_path))
+    stale = time.time() - 8 * 86400
+    os.utime(old.path, (stale, stale))
+    (tmp_path / "notes.txt").write_text("not a journal")
+
+    fresh = ScanJournal.create("fresh", "10.0.0.0/24", "1-1024", str(tmp_path))
+
+    assert not os.path.exists(old.path)
+    assert os.path.exists(fresh.path)
+    assert (tmp_path / "notes.txt").exists()
+    assert ScanJournal.prune(str(tmp_path)) == []
+
+
+def test_round_trip_and_resume_merge(tmp_path):
+    journal = ScanJournal.create("s1", "10.0.0.0/24", "1-1024", str(tmp_path))
+    journal.record_hosts([{"ip": "10.0.0.5", "mac": "aa:bb:cc:dd:ee:ff"}, {"ip": "10.0.0.9"}])
+    journal.record_unit("10.0.0.5", 0, {80: "nginx"})
+    journal.record_unit("10.0.0.9", 0, {})
+    journal.flush()
+
+    # A resumed run appends its units to the same journal
+    resumed = ScanJournal.load("s1", str(tmp_path))
+    assert (resumed.network, resumed.ports) == ("10.0.0.0/24", "1-1024")
+    assert resumed.hosts == [{"ip": "10.0.0.5", "mac": "aa:bb:cc:dd:ee:ff"}, {"ip": "10.0.0.9", "mac": ""}]
+    resumed.record_unit("10.0.0.5", 3, {1000: ""})
+    resumed.flush()
+
+    final = ScanJournal.load("s1", str(tmp_path))
+    assert final.units == {"10.0.0.5": {0: {80: "nginx"}, 3: {1000: ""}}, "10.0.0.9": {0: {}}}
+
+    final.complete()
+    with pytest.raises(ValueError):
+        ScanJournal.load("s1", str(tmp_path))
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = ScanJournal.create("s2", "10.0.0.0/24", "80", str(tmp_path))
+    journal.record_unit("10.0.0.5", 0, {80: ""})
+    journal.flush()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('["unit","10.0.0.6",0,{"8')  # crash mid-write
+    assert ScanJournal.load("s2", str(tmp_path)).units == {"10.0.0.5": {0: {80: ""}}}
+
+
+def test_block_size_mismatch_is_refused(tmp_path):
+    (tmp_path / "s3.journal").write_text('["scan","s3","10.0.0.0/24","80",512,0]\n')
+    with pytest.raises(ValueError, match="block size"):
+        ScanJournal.load("s3", str(tmp_path))
+
+
+def test_block_map_follows_probe_order():
+    ports = compile_ports("1-1024")
+    blocks = block_map(ports)
+    order = list(ports)
+    assert blocks[order[0]] == 0 and blocks[order[BLOCK_SIZE]] == 1
@@ -113,7 +113,11 @@ io.on("connection", (socket) => {
       }
 
       // --- Save data for all other agent types ---
-      await saveAgentData(payload);
+      const saved = await saveAgentData(payload);
+      // The agent resends a full task_info / system_info on request
+      if (saved?.request) {
+        socket.emit(saved.request, { agentId: payload.agentId });
+      }
       socket.emit("agent_response", {
         success: true,
         message: `${payload.type} saved successfully`,
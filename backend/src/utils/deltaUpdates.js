@@ -0,0 +1,113 @@
+// utils/deltaUpdates.js
+// Applies the agents' incremental messages to stored documents. The model is
+// passed in, so the update logic can be exercised without a database
+// (see backend/tests/deltaUpdates.test.js).
+
+const TASK_SECTIONS = ["applications", "background_processes"];
+
+// Updates for one task_info_delta, in order: $pull, $set and $push on the same
+// array cannot share one update.
+export function taskInfoDeltaOps(data) {
+  const ops = [];
+
+  for (const section of TASK_SECTIONS) {
+    const delta = data[section] || {};
+    const field = `data.${section}`;
+    const exited = delta.exited || [];
+    if (exited.length) {
+      const match = section === "applications"
+        ? { $or: exited.map(([pid, title]) => ({ pid, title })) }
+        : { pid: { $in: exited } };
+      ops.push({ $pull: { [field]: match } });
+    }
+
+    const changed = delta.changed || [];
+    if (changed.length) {
+      const set = {};
+      const arrayFilters = changed.map((row, i) => {
+        for (const key of ["name", "cpu_percent", "memory_percent"]) {
+          set[`${field}.$[r${i}].${key}`] = row[key];
+        }
+        return section === "applications"
+          ? { [`r${i}.pid`]: row.pid, [`r${i}.title`]: row.title }
+          : { [`r${i}.pid`]: row.pid };
+      });
+      ops.push({ $set: set, arrayFilters });
+    }
+
+    if (delta.started?.length) {
+      ops.push({ $push: { [field]: { $each: delta.started } } });
+    }
+  }
+  return ops;
+}
+
+// Apply a task_info_delta to the stored process table. Only the started, exited
+// and changed rows are written. Returns { request: "task_info_keyframe" } when the
+// delta does not follow the stored document (a missed message, or a different
+// keyframe), so the caller can ask the agent for a full task_info.
+export async function applyTaskInfoDelta(TaskInfo, agentId, timestamp, data) {
+  const base = { agentId, "data.keyframe_id": data.keyframe_id, "data.seq": data.seq - 1 };
+  const ops = taskInfoDeltaOps(data);
+
+  try {
+    // The sequence check and the version bump go first, so a delta that does not
+    // follow the stored document changes nothing
+    const advanced = await TaskInfo.updateOne(base, { $set: { timestamp, "data.seq": data.seq } });
+    if (advanced.matchedCount === 0) {
+      console.warn(`⚠️ [task_info_delta] ${data.keyframe_id}#${data.seq} does not apply for agent ${agentId}; requesting keyframe`);
+      return { request: "task_info_keyframe" };
+    }
+
+    const query = { agentId, "data.keyframe_id": data.keyframe_id, "data.seq": data.seq };
+    for (const { arrayFilters, ...update } of ops) {
+      await TaskInfo.updateOne(query, update, arrayFilters ? { arrayFilters } : {});
+    }
+    console.log(`✅ [task_info_delta] #${data.seq} applied for agent ${agentId} (${ops.length} updates)`);
+  } catch (err) {
+    console.error(`❌ Failed to apply [task_info_delta] for agent ${agentId}:`, err);
+    return { request: "task_info_keyframe" };
+  }
+}
+
+// Aggregation expression for `stored` with the plain objects of `value` merged into
+// it key by key, like the agent's SystemInfoCache._merge. $getField/$setField take
+// keys literally, so keys holding "." (mount points, VLAN interfaces) or a leading
+// "$" are stored as they are; a dotted $set path would nest them. Needs MongoDB 5.0.
+function mergeExpr(stored, value, depth = 0) {
+  if (!value || typeof value !== "object" || Array.isArray(value)) return { $literal: value };
+  const current = `$$m${depth}`;
+  let expr = current;
+  for (const [key, inner] of Object.entries(value)) {
+    const field = { $literal: key };
+    expr = {
+      $setField: {
+        field,
+        input: expr,
+        value: mergeExpr({ $getField: { field, input: current } }, inner, depth + 1),
+      },
+    };
+  }
+  // A missing (or non-object) stored value starts out empty
+  const base = { $cond: [{ $eq: [{ $type: stored }, "object"] }, stored, {}] };
+  return { $let: { vars: { [`m${depth}`]: base }, in: expr } };
+}
+
+// Merge a partial system_info into the stored document field by field. It only
+// applies on top of the static inventory it was computed against; otherwise
+// returns { request: "system_info_static" } so the agent resends everything.
+export async function applySystemInfoPartial(SystemInfo, agentId, timestamp, data) {
+  const { partial, static_hash, ...fields } = data;
+  const update = [{ $set: { timestamp: { $literal: timestamp }, data: mergeExpr("$data", fields) } }];
+
+  try {
+    const merged = await SystemInfo.updateOne({ agentId, "data.static_hash": static_hash }, update);
+    if (merged.matchedCount === 0) {
+      console.warn(`⚠️ [system_info] partial for agent ${agentId} has no matching inventory; requesting it`);
+      return { request: "system_info_static" };
+    }
+    console.log(`✅ [system_info] ${Object.keys(fields).join(", ")} merged for agent ${agentId}`);
+  } catch (err) {
+    console.error(`❌ Failed to merge [system_info] for agent ${agentId}:`, err);
+  }
+}
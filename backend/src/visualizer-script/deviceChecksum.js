@@ -0,0 +1,29 @@
+// visualizer-script/deviceChecksum.js
+// The scanner's device keys and list digest (scanner_service.device_key and
+// devices_checksum), kept apart from visualizerScanner.js so they can be tested
+// against the vectors both sides share (backend/tests/fixtures/device_checksums.json).
+import crypto from "crypto";
+
+export function deviceKey(d) {
+  return d.mac || `ip:${d.ips[0]}`;
+}
+
+// JSON with keys sorted at every level, like json.dumps(sort_keys=True, separators=(",", ":")).
+// Devices hold strings, booleans, null and arrays; Python would write a float 1.0 as "1.0".
+function canonicalJSON(value) {
+  if (Array.isArray(value)) return `[${value.map(canonicalJSON).join(",")}]`;
+  if (value && typeof value === "object") {
+    const fields = Object.keys(value).sort().map((k) => `${JSON.stringify(k)}:${canonicalJSON(value[k])}`);
+    return `{${fields.join(",")}}`;
+  }
+  return JSON.stringify(value);
+}
+
+// sha1 over the sorted keys, each followed by its device's canonical JSON
+export function devicesChecksum(devices) {
+  const hash = crypto.createHash("sha1");
+  for (const key of [...devices.keys()].sort()) {
+    hash.update(`${key}\n${canonicalJSON(devices.get(key))}\n`);
+  }
+  return hash.digest("hex");
+}
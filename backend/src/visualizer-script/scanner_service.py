@@ -2,38 +2,45 @@
 """
 ping_only_scanner_json_only.py
 
-Outputs only JSON.
-Ping-only discovery.
+Outputs only newline-delimited JSON events (see DeltaWriter).
+Ping discovery; MACs are read from the kernel neighbor table (scanner/neighbors.py).
 No logs or status messages printed.
-Continuously runs every second.
+Runs continuously: each address is probed on its own schedule (see ProbeScheduler)
+and only changes to the device list are written.
 """
 
+import argparse
+import hashlib
 import ipaddress
-import platform
-import subprocess
+import queue
+import threading
 import sys
 import os
 import json
+import heapq
+import random
 import time
 from collections import OrderedDict
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
 from typing import Tuple
 
+# Shared scanner helpers live next to network_scanner_cli.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scanner"))
+import discovery
+import neighbors
+import netwatch
+import oui_index
+from ratelimit import RateController
+
 try:
     import netifaces
 except Exception:
-    sys.exit("netifaces required. Install with: pip install netifaces")
+    netifaces = None
 
 # ---------------- Vendor Lookup ----------------
-try:
-    from mac_vendor_lookup import MacLookup
-    MACLOOKUP_AVAILABLE = True
-except Exception:
-    MACLOOKUP_AVAILABLE = False
-
-_mac_lookup = None
-_vendor_cache = {}
+# Vendors come from the memory-mapped OUI index (scanner/oui_index.py); mac_vendor_lookup
+# is only imported, on the first lookup, when no index has been built.
+DEFERRED_MODULES = ("mac_vendor_lookup",)
 
 def normalize_mac(mac):
     if mac is None:
@@ -60,19 +67,7 @@ def safe_vendor_lookup(mac):
     mac_n = normalize_mac(mac)
     if not mac_n:
         return "Unknown"
-    if mac_n in _vendor_cache:
-        return _vendor_cache[mac_n]
-    vendor = "Unknown"
-    if MACLOOKUP_AVAILABLE:
-        global _mac_lookup
-        try:
-            if _mac_lookup is None:
-                _mac_lookup = MacLookup()
-            vendor = _mac_lookup.lookup(mac_n)
-        except Exception:
-            vendor = "Unknown"
-    _vendor_cache[mac_n] = vendor
-    return vendor
+    return oui_index.vendor_for(mac_n) or "Unknown"
 
 # ---------------- Network detection ----------------
 def auto_select_iface_and_network() -> Tuple[str, str, str, str]:
@@ -83,6 +78,14 @@ def auto_select_iface_and_network() -> Tuple[str, str, str, str]:
     def is_ignored_ip(ip):
         return any(ip.startswith(p) for p in ignore_prefixes)
 
+    # The default-route interface, from the shared rtnetlink view (no netifaces needed on Linux)
+    view = netwatch.get_watcher().current()
+    if view and view["iface"] and not is_ignored_ip(view["ip"]):
+        netmask = str(ipaddress.IPv4Network(view["cidr"]).netmask)
+        return view["iface"], view["ip"], netmask, view["cidr"]
+    if netifaces is None:
+        sys.exit("netifaces required. Install with: pip install netifaces")
+
     try:
         gws = netifaces.gateways()
         if netifaces.AF_INET in gws:
@@ -129,35 +132,126 @@ def auto_select_iface_and_network() -> Tuple[str, str, str, str]:
 
 # ---------------- Ping Sweep ----------------
 def ping_host(ip, timeout=1):
-    system = platform.system().lower()
     try:
-        if system == "windows":
-            cmd = ["ping", "-n", "1", "-w", str(int(max(1, timeout) * 1000)), ip]
-        elif system == "darwin":
-            cmd = ["ping", "-c", "1", "-W", str(max(1, int(round(timeout)))), ip]
-        else:
-            cmd = ["ping", "-c", "1", "-W", str(max(1, int(round(timeout)))), ip]
-        res = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return res.returncode == 0
+        return bool(discovery.sweep([ip], timeout=timeout))
     except Exception:
         return False
 
-def ping_sweep(network_cidr, max_workers=200, timeout=0.5):
+def ping_sweep(network_cidr, timeout=0.5, retries=1, rate=None):
+    """Sweep the network, paced by `rate` (a RateController) and feeding it the sweep's outcome."""
     net = ipaddress.IPv4Network(network_cidr, strict=False)
-    ips = [str(ip) for ip in net.hosts()]
-    alive = []
-    with ThreadPoolExecutor(max_workers=max(4, min(max_workers, 1000))) as exe:
-        futures = {exe.submit(ping_host, ip, timeout): ip for ip in ips}
-        for fut in as_completed(futures):
-            ip = futures[fut]
-            try:
-                if fut.result():
-                    alive.append(ip)
-            except Exception:
-                pass
-    alive.sort(key=lambda s: tuple(int(x) for x in s.split(".")))
+    if rate is None:
+        return discovery.sweep(net.hosts(), timeout=timeout, retries=retries)
+    return probe_batch(list(net.hosts()), timeout=timeout, retries=retries, rate=rate)
+
+def probe_batch(ips, timeout=0.5, retries=0, rate=None):
+    """Echo-probe a list of addresses in one sweep; paced by and reported to `rate` when given."""
+    if rate is None:
+        return discovery.sweep(ips, timeout=timeout, retries=retries)
+    alive = discovery.sweep(ips, timeout=timeout, retries=retries, pacer=rate.delay)
+    rate.record(answered=len(alive), timeouts=max(0, len(ips) - len(alive)))
     return alive
 
+# ---------------- Probe Scheduler ----------------
+# Seconds between liveness checks of a host that is answering
+ALIVE_INTERVAL = 5.0
+# Quick re-checks after a live host misses a reply; it is declared gone after the last one
+RECHECK_DELAYS = (1.0, 1.0, 2.0)
+# Addresses that do not answer are retried with exponential backoff between these bounds
+SILENT_MIN_INTERVAL = 5.0
+SILENT_MAX_INTERVAL = 60.0
+JITTER = 0.1  # +/- share of each interval, so backed-off addresses do not fire in lockstep
+
+class HostSchedule:
+    __slots__ = ("ip", "state", "misses", "interval", "last_seen", "due_at")
+
+    def __init__(self, ip):
+        self.ip = ip
+        self.state = "unknown"   # unknown -> alive -> suspect -> silent
+        self.misses = 0
+        self.interval = 0.0
+        self.last_seen = None
+        self.due_at = None
+
+class ProbeScheduler:
+    """
+    Per-address probe timing. Each address has its own next-due time, so sweep
+    cost follows how much is changing on the network rather than its size:
+      alive    answered recently; re-checked every ALIVE_INTERVAL
+      suspect  was alive and just missed; re-checked after RECHECK_DELAYS, then silent
+      silent / unknown  never answered or gone; backoff from SILENT_MIN to SILENT_MAX
+    Every address is due immediately when the scheduler starts.
+    """
+
+    def __init__(self, addresses, now=None):
+        now = time.monotonic() if now is None else now
+        self.hosts = {}
+        self.heap = []
+        for ip in addresses:
+            ip = str(ip)
+            self.hosts[ip] = HostSchedule(ip)
+            self.hosts[ip].due_at = now
+            self.heap.append((now, ip))
+        heapq.heapify(self.heap)
+        self.probes = 0
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    def due(self, now=None):
+        """Pop and return every address whose probe is due."""
+        now = time.monotonic() if now is None else now
+        ips = []
+        while self.heap and self.heap[0][0] <= now:
+            due_at, ip = heapq.heappop(self.heap)
+            if self.hosts[ip].due_at == due_at:  # else superseded by poke()
+                self.hosts[ip].due_at = None
+                ips.append(ip)
+        return ips
+
+    def poke(self, ip, now=None):
+        """Probe an address that is not known to be up right away (e.g. the kernel just resolved it)."""
+        h = self.hosts.get(ip)
+        if h is None or h.state == "alive" or h.due_at is None:
+            return
+        now = time.monotonic() if now is None else now
+        if h.due_at > now:
+            h.due_at = now
+            heapq.heappush(self.heap, (now, ip))
+
+    def update(self, probed, alive, now=None):
+        """Reschedule the probed addresses from the sweep result."""
+        now = time.monotonic() if now is None else now
+        alive = set(alive)
+        self.probes += len(probed)
+        for ip in probed:
+            h = self.hosts[ip]
+            if ip in alive:
+                h.state, h.misses, h.last_seen = "alive", 0, now
+                delay = ALIVE_INTERVAL
+            elif h.state in ("alive", "suspect") and h.misses < len(RECHECK_DELAYS):
+                h.state = "suspect"
+                delay = RECHECK_DELAYS[h.misses]
+                h.misses += 1
+            else:
+                if h.state in ("alive", "suspect"):
+                    h.state, h.interval = "silent", 0.0
+                h.interval = min(SILENT_MAX_INTERVAL, h.interval * 2) if h.interval else SILENT_MIN_INTERVAL
+                delay = h.interval
+            h.due_at = now + delay * random.uniform(1 - JITTER, 1 + JITTER)
+            heapq.heappush(self.heap, (h.due_at, ip))
+
+    def present(self):
+        """Addresses currently considered up (a suspect host stays up until its re-checks run out)."""
+        return sorted((ip for ip, h in self.hosts.items() if h.state in ("alive", "suspect")),
+                      key=lambda ip: tuple(int(x) for x in ip.split(".")))
+
+    def stats(self):
+        counts = {"alive": 0, "suspect": 0, "silent": 0, "unknown": 0}
+        for h in self.hosts.values():
+            counts[h.state] += 1
+        return {**counts, "probes": self.probes}
+
 # ---------------- JSON Output ----------------
 def merge_and_dedupe(arp_map, ping_list):
     mac_map = OrderedDict()
@@ -201,21 +295,194 @@ def results_to_json(mac_map):
             })
     return out
 
+# ---------------- Event Output ----------------
+CHECKSUM_INTERVAL = 30.0  # seconds between checksum events
+
+def device_key(device):
+    return device["mac"] or f"ip:{device['ips'][0]}"
+
+def devices_checksum(devices):
+    """
+    Digest of a {key: device} map, independent of order. visualizerScanner.js
+    computes the same digest over its copy to detect drift.
+    """
+    digest = hashlib.sha1()
+    for key in sorted(devices):
+        body = json.dumps(devices[key], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        digest.update(f"{key}\n{body}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+class DeltaWriter:
+    """
+    Writes the device list as one JSON object per line, each with a "type" and a
+    "seq" that increases by one per line:
+      snapshot        {devices: [...], checksum}   first message, and on request
+      device_joined   {device}
+      device_changed  {device, previous}
+      device_left     {device}
+      checksum        {count, checksum}            every CHECKSUM_INTERVAL seconds
+    A reader that sees a gap in seq or a checksum that does not match its own
+    state writes "snapshot" to stdin to get the full list again.
+    """
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.seq = 0
+        self.devices = None
+
+    def _send(self, kind, **fields):
+        self.seq += 1
+        self.out.write(json.dumps({"type": kind, "seq": self.seq, **fields}, separators=(",", ":")) + "\n")
+        self.out.flush()
+
+    def snapshot(self, devices):
+        self.devices = dict(devices)
+        self._send("snapshot", devices=list(self.devices.values()), checksum=devices_checksum(self.devices))
+
+    def update(self, devices):
+        """Emit the events that turn the last written device list into `devices`."""
+        if self.devices is None:
+            self.snapshot(devices)
+            return
+        # Departures first: a device whose key changed (its MAC became known) is
+        # re-added under the new key after the old entry has been removed.
+        for key, device in self.devices.items():
+            if key not in devices:
+                self._send("device_left", device=device)
+        for key, device in devices.items():
+            previous = self.devices.get(key)
+            if previous is None:
+                self._send("device_joined", device=device)
+            elif previous != device:
+                self._send("device_changed", device=device, previous=previous)
+        self.devices = dict(devices)
+
+    def checksum(self):
+        devices = self.devices or {}
+        self._send("checksum", count=len(devices), checksum=devices_checksum(devices))
+
+def watch_neighbors(watcher, events, wake):
+    """Forward neighbor table changes to the main loop."""
+    for event in watcher.events():
+        events.put(event)
+        wake.set()
+
+def watch_requests(wake, snapshot_requested):
+    """Read commands from stdin ("snapshot") until it is closed."""
+    try:
+        for line in sys.stdin:
+            if line.strip() == "snapshot":
+                snapshot_requested.set()
+                wake.set()
+    except (OSError, ValueError):
+        pass
+
 # ---------------- Main ----------------
 def main():
+    parser = argparse.ArgumentParser(description="Ping-only network discovery, written as NDJSON device events.")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Report per-module import cost and cold-start-to-first-probe time, then exit "
+                             "(non-zero when over --startup-budget)")
+    parser.add_argument("--startup-budget", type=float, default=None, metavar="MS",
+                        help="Cold start to first probe budget for --startup-profile, in milliseconds")
+    parser.add_argument("--pps", type=float, help="Echo requests per second ceiling (default: unlimited, backing off on loss)")
+    parser.add_argument("--report-rate", action="store_true",
+                        help="Write the achieved probe rate and drop rate to stderr after every sweep")
+    parser.add_argument("--no-neighbor-watch", action="store_true",
+                        help="Do not subscribe to kernel neighbor table changes (new devices then wait for their next probe)")
+    parser.add_argument("--first-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_profile:
+        import startup_profile
+        budget = args.startup_budget if args.startup_budget is not None else startup_profile.DEFAULT_BUDGET_MS
+        sys.exit(startup_profile.run(__file__, DEFERRED_MODULES, budget))
+    if args.first_probe:
+        # Used by --startup-profile: one echo request to loopback through the normal sweep
+        ping_sweep("127.0.0.1/32")
+        return
+
+    # Re-detect the network when the topology watcher reports a change (DHCP renewal,
+    # roaming to another network); on non-Linux it never fires and the first result stays.
+    topology_changed = threading.Event()
+    wake = threading.Event()
+
+    def on_topology_change(old, new):
+        topology_changed.set()
+        wake.set()
+
+    netwatch.get_watcher().subscribe(on_topology_change)
     iface, ip, netmask, network_cidr = auto_select_iface_and_network()
     if not network_cidr:
         print(json.dumps({"error": "Could not detect active network"}))
         return
 
+    # One controller for the life of the service, so backoff carries over between sweeps
+    rate = RateController(args.pps)
+    scheduler = ProbeScheduler(ipaddress.IPv4Network(network_cidr, strict=False).hosts())
+    writer = DeltaWriter()
+    snapshot_requested = threading.Event()
+    threading.Thread(target=watch_requests, args=(wake, snapshot_requested), daemon=True).start()
+    # MACs come from the kernel neighbor table, refreshed after every probe batch
+    # and, when subscribed, as the kernel resolves or drops entries.
+    neighbor_macs = {}
+    neighbor_events = queue.Queue()
+    if not args.no_neighbor_watch:
+        try:
+            watcher = neighbors.NeighborWatcher()
+            threading.Thread(target=watch_neighbors, args=(watcher, neighbor_events, wake), daemon=True).start()
+        except OSError:
+            pass
+    last_checksum = time.monotonic()
     while True:
-        ping_list = ping_sweep(network_cidr)
-        arp_map = {}
-        mac_map = merge_and_dedupe(arp_map, ping_list)
-        out = results_to_json(mac_map)
-        print(json.dumps(out, indent=2))
-        sys.stdout.flush()
-        time.sleep(5)
+        wake.clear()
+        if topology_changed.is_set():
+            topology_changed.clear()
+            _, _, _, cidr = auto_select_iface_and_network()
+            if cidr and cidr != network_cidr:
+                # New subnet: probe it from scratch; devices of the old one leave on the next update
+                network_cidr = cidr
+                scheduler = ProbeScheduler(ipaddress.IPv4Network(network_cidr, strict=False).hosts())
+                neighbor_macs = {}
+        while not neighbor_events.empty():
+            kind, nip, mac, reachable = neighbor_events.get_nowait()
+            if kind == "del":
+                neighbor_macs.pop(nip, None)
+            elif nip in scheduler.hosts:
+                neighbor_macs[nip] = mac
+                if reachable:
+                    scheduler.poke(nip)
+
+        probed = scheduler.due()
+        if probed:
+            scheduler.update(probed, probe_batch(probed, rate=rate))
+            table = neighbors.read_neighbors()
+            if table is not None:  # an empty table is current too: every entry was dropped
+                neighbor_macs = table
+            present = scheduler.present()
+            arp_map = {host: neighbor_macs[host] for host in present if host in neighbor_macs}
+            mac_map = merge_and_dedupe(arp_map, present)
+            devices = {device_key(d): d for d in results_to_json(mac_map)}
+            if snapshot_requested.is_set():
+                snapshot_requested.clear()
+                writer.snapshot(devices)
+            else:
+                writer.update(devices)
+            if args.report_rate:
+                print(json.dumps({"rate": rate.stats(), "hosts": scheduler.stats()}), file=sys.stderr)
+        elif snapshot_requested.is_set() and writer.devices is not None:
+            snapshot_requested.clear()
+            writer.snapshot(writer.devices)
+
+        now = time.monotonic()
+        if writer.devices is not None and now - last_checksum >= CHECKSUM_INTERVAL:
+            last_checksum = now
+            writer.checksum()
+
+        wake_at = last_checksum + CHECKSUM_INTERVAL
+        if scheduler.next_due() is not None:
+            wake_at = min(wake_at, scheduler.next_due())
+        wake.wait(max(0.05, wake_at - time.monotonic()))
 
 if __name__ == "__main__":
     main()
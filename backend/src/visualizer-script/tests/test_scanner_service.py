@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import scanner_service as svc
+from scanner_service import ProbeScheduler
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(svc, "JITTER", 0.0)
+
+
+def intervals(scheduler, ip, answers, now=0.0):
+    """Probe ip once per answer (True = replied) as soon as it is due; the delays in between."""
+    delays = []
+    for answered in answers:
+        assert scheduler.due(now) == [ip]
+        scheduler.update([ip], [ip] if answered else [], now=now)
+        delays.append(scheduler.next_due() - now)
+        now = scheduler.next_due()
+    return delays
+
+
+def test_every_address_is_due_at_start_in_order():
+    scheduler = ProbeScheduler(["10.0.0.2", "10.0.0.1", "10.0.0.3"], now=100.0)
+    assert scheduler.next_due() == 100.0
+    assert scheduler.due(99.9) == []
+    assert scheduler.due(100.0) == ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    assert scheduler.due(1000.0) == [] and scheduler.next_due() is None  # in flight until update()
+
+
+def test_due_follows_each_address_schedule(no_jitter):
+    scheduler = ProbeScheduler(["10.0.0.1", "10.0.0.2", "10.0.0.3"], now=0.0)
+    scheduler.update(scheduler.due(0.0), ["10.0.0.2"], now=0.0)
+    assert scheduler.due(4.9) == []
+    # Alive and silent hosts share the 5 s mark; the silent ones then back off
+    assert scheduler.due(5.0) == ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    scheduler.update(["10.0.0.1", "10.0.0.2", "10.0.0.3"], ["10.0.0.2"], now=5.0)
+    assert scheduler.due(10.0) == ["10.0.0.2"]
+    assert scheduler.due(15.0) == ["10.0.0.1", "10.0.0.3"]
+    assert scheduler.stats() == {"alive": 1, "suspect": 0, "silent": 0, "unknown": 2, "probes": 6}
+
+
+def test_silent_addresses_back_off_to_the_cap(no_jitter):
+    scheduler = ProbeScheduler(["10.0.0.9"], now=0.0)
+    assert intervals(scheduler, "10.0.0.9", [False] * 7) == [5.0, 10.0, 20.0, 40.0, 60.0, 60.0, 60.0]
+    # An answer resets the backoff
+    assert intervals(scheduler, "10.0.0.9", [True, False], now=scheduler.next_due()) == [5.0, 1.0]
+
+
+def test_live_host_is_rechecked_before_it_is_declared_gone(no_jitter):
+    scheduler = ProbeScheduler(["10.0.0.7"], now=0.0)
+    assert intervals(scheduler, "10.0.0.7", [True]) == [5.0]
+    now = scheduler.next_due()
+    for delay in svc.RECHECK_DELAYS:
+        assert scheduler.present() == ["10.0.0.7"]
+        assert intervals(scheduler, "10.0.0.7", [False], now=now) == [delay]
+        now = scheduler.next_due()
+    assert scheduler.hosts["10.0.0.7"].state == "suspect" and scheduler.present() == ["10.0.0.7"]
+    # The last re-check missed too: gone, and backed off like any silent address
+    assert intervals(scheduler, "10.0.0.7", [False, False], now=now) == [5.0, 10.0]
+    assert scheduler.present() == [] and scheduler.hosts["10.0.0.7"].last_seen == 0.0
+
+
+def test_poke_moves_a_silent_address_forward_once(no_jitter):
+    scheduler = ProbeScheduler(["10.0.0.1", "10.0.0.2"], now=0.0)
+    scheduler.update(scheduler.due(0.0), ["10.0.0.2"], now=0.0)
+    scheduler.poke("10.0.0.1", now=1.0)
+    scheduler.poke("10.0.0.2", now=1.0)   # alive: keeps its schedule
+    scheduler.poke("10.9.9.9", now=1.0)   # not in the network
+    assert scheduler.due(1.0) == ["10.0.0.1"]
+    scheduler.poke("10.0.0.1", now=1.5)   # already being probed
+    assert scheduler.due(1.5) == []
+    scheduler.update(["10.0.0.1"], [], now=2.0)
+    # The superseded heap entry at 5.0 is skipped
+    assert scheduler.due(5.0) == ["10.0.0.2"]
+    assert scheduler.due(12.0) == ["10.0.0.1"]
+
+
+def test_jitter_stays_within_bounds():
+    scheduler = ProbeScheduler([f"10.0.{i // 256}.{i % 256}" for i in range(500)], now=0.0)
+    scheduler.update(scheduler.due(0.0), [], now=0.0)
+    due = sorted(h.due_at for h in scheduler.hosts.values())
+    low, high = svc.SILENT_MIN_INTERVAL * (1 - svc.JITTER), svc.SILENT_MIN_INTERVAL * (1 + svc.JITTER)
+    assert low <= due[0] and due[-1] <= high
+    assert due[-1] - due[0] > svc.SILENT_MIN_INTERVAL * svc.JITTER  # spread out, not in lockstep
+
+
+# Shared with backend/tests/deviceChecksum.test.js, which checks visualizerScanner.js's digest
+with open(os.path.join(os.path.dirname(__file__), "..", "..", "..", "tests", "fixtures", "device_checksums.json"),
+          encoding="utf-8") as f:
+    CHECKSUM_VECTORS = json.load(f)
+
+
+@pytest.mark.parametrize("vector", CHECKSUM_VECTORS, ids=[v["name"] for v in CHECKSUM_VECTORS])
+def test_devices_checksum_matches_the_shared_vectors(vector):
+    devices = {svc.device_key(d): d for d in vector["devices"]}
+    assert svc.devices_checksum(devices) == vector["checksum"]
+    assert svc.devices_checksum(dict(reversed(devices.items()))) == vector["checksum"]
+
+
+def test_delta_writer_checksums_follow_the_device_list():
+    out = io.StringIO()
+    writer = svc.DeltaWriter(out)
+    for vector in CHECKSUM_VECTORS:
+        writer.update({svc.device_key(d): d for d in vector["devices"]})
+        writer.checksum()
+        last = json.loads(out.getvalue().splitlines()[-1])
+        assert (last["count"], last["checksum"]) == (len(vector["devices"]), vector["checksum"])
+    first = json.loads(out.getvalue().splitlines()[0])
+    assert first["type"] == "snapshot" and first["checksum"] == CHECKSUM_VECTORS[0]["checksum"]
+
+
+def test_deferred_modules_are_not_imported_at_startup():
+    # In a fresh interpreter: this test process may already have imported them
+    script = ("import json, sys, scanner_service as m; "
+              "deferred = {d.split('.')[0] for d in m.DEFERRED_MODULES}; "
+              "print(json.dumps(sorted(n for n in sys.modules if n.split('.')[0] in deferred)))")
+    out = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(svc.__file__),
+                         capture_output=True, text=True, check=True).stdout
+    assert json.loads(out) == []
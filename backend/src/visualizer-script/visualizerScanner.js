@@ -3,7 +3,9 @@ import path from "path";
 import { fileURLToPath } from "url";
 import mongoose from "mongoose";
 import fs from "fs";
+import readline from "readline";
 import Device from "../models/VisualizerScanner.js";
+import { deviceKey, devicesChecksum } from "./deviceChecksum.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -47,6 +49,73 @@ async function connectMongo() {
     });
 }
 
+// ---------------- DEVICE STATE ----------------
+// Mirror of the scanner's device list, keyed like scanner_service.device_key
+const devices = new Map();
+let lastSeq = 0;
+
+async function upsertDevice(d) {
+  await Device.findOneAndUpdate(
+    { "ips.0": d.ips[0] },
+    { ...d, lastSeen: new Date() },
+    { upsert: true, new: true }
+  );
+}
+
+// Apply one scanner event to the mirror and the DB. Returns true if the device list changed.
+async function applyEvent(msg) {
+  switch (msg.type) {
+    case "snapshot": {
+      devices.clear();
+      for (const d of msg.devices) devices.set(deviceKey(d), d);
+      const currentIPs = msg.devices.map((d) => d.ips[0]);
+      await Device.deleteMany({ "ips.0": { $nin: currentIPs } });
+      for (const d of msg.devices) await upsertDevice(d);
+      console.log(`📡 Snapshot: synced ${msg.devices.length} devices to DB`);
+      return true;
+    }
+    case "device_joined":
+      devices.set(deviceKey(msg.device), msg.device);
+      await upsertDevice(msg.device);
+      console.log(`➕ Device joined: ${msg.device.ips[0]}`);
+      return true;
+    case "device_changed":
+      devices.delete(deviceKey(msg.previous));
+      devices.set(deviceKey(msg.device), msg.device);
+      if (msg.previous.ips[0] !== msg.device.ips[0]) {
+        await Device.deleteOne({ "ips.0": msg.previous.ips[0] });
+      }
+      await upsertDevice(msg.device);
+      console.log(`✏️ Device changed: ${msg.device.ips[0]}`);
+      return true;
+    case "device_left":
+      devices.delete(deviceKey(msg.device));
+      await Device.deleteOne({ "ips.0": msg.device.ips[0] });
+      console.log(`➖ Device left: ${msg.device.ips[0]}`);
+      return true;
+    default:
+      return false;
+  }
+}
+
+// Visualizer updates are coalesced: a burst of events triggers one update
+let visualizerTimer = null;
+function scheduleVisualizerUpdate() {
+  if (visualizerTimer) return;
+  visualizerTimer = setTimeout(async () => {
+    visualizerTimer = null;
+    console.log("⚙️ Running visualizer update after scan...");
+    try {
+      // Lazy import of visualizer update AFTER setup
+      const { runVisualizerUpdate } = await import("./visualizer.js");
+      await runVisualizerUpdate();
+      console.log("✅ Visualizer update completed.");
+    } catch (err) {
+      console.error("❌ Visualizer update failed:", err.message);
+    }
+  }, 1000);
+}
+
 // ---------------- RUN SCANNER LOOP ----------------
 async function runScannerCycle() {
   console.log("🚀 Starting Python scanner cycle...");
@@ -54,52 +123,56 @@ async function runScannerCycle() {
   return new Promise((resolve) => {
     const scannerProcess = spawn("python", [scannerPath], {
       cwd: __dirname,
-      stdio: ["ignore", "pipe", "pipe"],
+      stdio: ["pipe", "pipe", "pipe"],
     });
 
-    let buffer = "";
-    scannerProcess.stdout.setEncoding("utf8");
-
-    scannerProcess.stdout.on("data", async (data) => {
-      buffer += data.toString();
-
-      if (buffer.trim().endsWith("]")) {
-        try {
-          const jsonStart = buffer.indexOf("[");
-          const jsonText = buffer.slice(jsonStart).trim();
-          const devices = JSON.parse(jsonText);
-
-          console.log(`📡 Received ${devices.length} devices from Python`);
-          const currentIPs = devices.map((d) => d.ips[0]);
-          await Device.deleteMany({ "ips.0": { $nin: currentIPs } });
-
-          for (const d of devices) {
-            await Device.findOneAndUpdate(
-              { "ips.0": d.ips[0] },
-              { ...d, lastSeen: new Date() },
-              { upsert: true, new: true }
-            );
-          }
-
-          console.log(`✅ Synced ${devices.length} devices to DB`);
-
-          // Lazy import of visualizer update AFTER setup
-          console.log("⚙️ Running visualizer update after scan...");
-          try {
-            const { runVisualizerUpdate } = await import("./visualizer.js");
-            await runVisualizerUpdate();
-            console.log("✅ Visualizer update completed.");
-          } catch (err) {
-            console.error("❌ Visualizer update failed:", err.message);
-          }
-
-          buffer = "";
-        } catch (err) {
-          console.error("❌ JSON parse error:", err.message);
-          buffer = "";
-        }
+    // After a gap or checksum mismatch, ignore deltas until the requested snapshot arrives
+    let awaitingSnapshot = true;
+    const requestSnapshot = (reason) => {
+      if (awaitingSnapshot) return;
+      console.warn(`⚠️ Resync with scanner (${reason}), requesting snapshot`);
+      awaitingSnapshot = true;
+      scannerProcess.stdin.write("snapshot\n");
+    };
+
+    const handleLine = async (line) => {
+      if (!line.trim()) return;
+      let msg;
+      try {
+        msg = JSON.parse(line);
+      } catch (err) {
+        console.error("❌ JSON parse error:", err.message);
+        return;
+      }
+
+      if (msg.type === "snapshot") {
+        awaitingSnapshot = false;
+      } else if (awaitingSnapshot) {
+        return;
+      } else if (msg.seq !== lastSeq + 1) {
+        requestSnapshot(`expected seq ${lastSeq + 1}, got ${msg.seq}`);
+        return;
       }
+      lastSeq = msg.seq;
+
+      if (msg.type === "checksum") {
+        if (msg.checksum !== devicesChecksum(devices)) requestSnapshot("checksum mismatch");
+        return;
+      }
+      try {
+        if (await applyEvent(msg)) scheduleVisualizerUpdate();
+      } catch (err) {
+        console.error("❌ Failed to apply scanner event:", err.message);
+        requestSnapshot("DB write failed");
+      }
+    };
+
+    // Events are applied strictly in order
+    let chain = Promise.resolve();
+    readline.createInterface({ input: scannerProcess.stdout }).on("line", (line) => {
+      chain = chain.then(() => handleLine(line));
     });
+    scannerProcess.stdin.on("error", () => {});
 
     scannerProcess.stderr.on("data", (data) => {
       console.error("🔥 Python error:", data.toString());
@@ -0,0 +1,120 @@
+import { test } from "node:test";
+import assert from "node:assert/strict";
+
+import FakeModel from "./fakeModel.js";
+import { applySystemInfoPartial, applyTaskInfoDelta } from "../src/utils/deltaUpdates.js";
+
+const row = (pid, extra = {}) => ({ pid, name: `p${pid}`, cpu_percent: 0, memory_percent: 1, ...extra });
+
+function keyframe() {
+  return {
+    agentId: "a1",
+    timestamp: "t0",
+    data: {
+      keyframe_id: "k1",
+      seq: 0,
+      applications: [row(1, { title: "Editor" }), row(1, { title: "Find" })],
+      background_processes: [row(1), row(2), row(3)],
+    },
+  };
+}
+
+test("deltas apply in sequence on top of the keyframe", async () => {
+  const TaskInfo = new FakeModel([keyframe()]);
+  const first = await applyTaskInfoDelta(TaskInfo, "a1", "t1", {
+    keyframe_id: "k1",
+    seq: 1,
+    applications: { started: [], exited: [[1, "Find"]], changed: [row(1, { title: "Editor", cpu_percent: 9 })] },
+    background_processes: { started: [row(4)], exited: [2], changed: [row(3, { memory_percent: 5 })] },
+  });
+  assert.equal(first, undefined);
+  const second = await applyTaskInfoDelta(TaskInfo, "a1", "t2", {
+    keyframe_id: "k1",
+    seq: 2,
+    background_processes: { started: [], exited: [4], changed: [] },
+  });
+  assert.equal(second, undefined);
+
+  const { data, timestamp } = TaskInfo.docs[0];
+  assert.equal(timestamp, "t2");
+  assert.equal(data.seq, 2);
+  assert.deepEqual(data.applications, [row(1, { title: "Editor", cpu_percent: 9 })]);
+  assert.deepEqual(data.background_processes, [row(1), row(3, { memory_percent: 5 })]);
+});
+
+test("a sequence gap or another keyframe changes nothing and asks for a keyframe", async () => {
+  const TaskInfo = new FakeModel([keyframe()]);
+  const before = structuredClone(TaskInfo.docs[0]);
+  const gap = { keyframe_id: "k1", seq: 2, background_processes: { started: [row(9)], exited: [1], changed: [] } };
+  assert.deepEqual(await applyTaskInfoDelta(TaskInfo, "a1", "t1", gap), { request: "task_info_keyframe" });
+  const stale = { ...gap, keyframe_id: "k0", seq: 1 };
+  assert.deepEqual(await applyTaskInfoDelta(TaskInfo, "a1", "t1", stale), { request: "task_info_keyframe" });
+  assert.deepEqual(TaskInfo.docs[0], before);
+
+  // The agent's next keyframe replaces the document; deltas then apply again
+  TaskInfo.docs[0] = { ...keyframe(), data: { ...keyframe().data, keyframe_id: "k2" } };
+  const resumed = { keyframe_id: "k2", seq: 1, background_processes: { started: [row(9)], exited: [], changed: [] } };
+  assert.equal(await applyTaskInfoDelta(TaskInfo, "a1", "t3", resumed), undefined);
+  assert.deepEqual(TaskInfo.docs[0].data.background_processes.map((r) => r.pid), [1, 2, 3, 9]);
+});
+
+function inventory() {
+  return {
+    agentId: "a1",
+    timestamp: "t0",
+    data: {
+      static_hash: "h1",
+      hostname: "ws-01",
+      disk: {
+        "C:\\": { mountpoint: "C:\\", fstype: "NTFS", used: 1, free: 9, percent: 10 },
+        "/dev/mapper/vg0.root": { mountpoint: "/", fstype: "ext4", used: 1, free: 9, percent: 10 },
+      },
+      interfaces: { "eth0.100": { mac: "aa:bb:cc:dd:ee:ff" } },
+      metrics: { cpu_percent: 3, per_cpu: [1, 5] },
+    },
+  };
+}
+
+test("a partial system_info merges key by key, including keys with dots", async () => {
+  const SystemInfo = new FakeModel([inventory()]);
+  const partial = {
+    partial: true,
+    static_hash: "h1",
+    disk: {
+      "C:\\": { used: 2, free: 8, percent: 20 },
+      "/dev/mapper/vg0.root": { used: 5, free: 5, percent: 50 },
+      "/dev/sdb1": { used: 0, free: 1, percent: 0 },
+    },
+    interfaces: { "eth0.100": { rx_bytes: 7 } },
+    metrics: { cpu_percent: 12.5, per_cpu: [20, 5], "$load": "1.0 0.5" },
+  };
+  assert.equal(await applySystemInfoPartial(SystemInfo, "a1", "t1", partial), undefined);
+
+  const { data, timestamp } = SystemInfo.docs[0];
+  assert.equal(timestamp, "t1");
+  assert.deepEqual(data, {
+    static_hash: "h1",
+    hostname: "ws-01",
+    disk: {
+      "C:\\": { mountpoint: "C:\\", fstype: "NTFS", used: 2, free: 8, percent: 20 },
+      "/dev/mapper/vg0.root": { mountpoint: "/", fstype: "ext4", used: 5, free: 5, percent: 50 },
+      "/dev/sdb1": { used: 0, free: 1, percent: 0 },
+    },
+    interfaces: { "eth0.100": { mac: "aa:bb:cc:dd:ee:ff", rx_bytes: 7 } },
+    metrics: { cpu_percent: 12.5, per_cpu: [20, 5], "$load": "1.0 0.5" },
+  });
+  // One pipeline update, with no dotted paths built from the agent's keys
+  const [{ update }] = SystemInfo.calls;
+  assert.ok(Array.isArray(update));
+  assert.deepEqual(Object.keys(update[0].$set), ["timestamp", "data"]);
+});
+
+test("a partial against another inventory changes nothing and asks for it", async () => {
+  const SystemInfo = new FakeModel([inventory()]);
+  const before = structuredClone(SystemInfo.docs[0]);
+  const partial = { partial: true, static_hash: "h0", metrics: { cpu_percent: 99 } };
+  assert.deepEqual(await applySystemInfoPartial(SystemInfo, "a1", "t1", partial), { request: "system_info_static" });
+  assert.deepEqual(await applySystemInfoPartial(SystemInfo, "a2", "t1", { ...partial, static_hash: "h1" }),
+    { request: "system_info_static" });
+  assert.deepEqual(SystemInfo.docs[0], before);
+});
@@ -0,0 +1,21 @@
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import fs from "fs";
+
+import { deviceKey, devicesChecksum } from "../src/visualizer-script/deviceChecksum.js";
+
+// Shared with backend/src/visualizer-script/tests/test_scanner_service.py, which checks the scanner's digest
+const vectors = JSON.parse(fs.readFileSync(new URL("./fixtures/device_checksums.json", import.meta.url), "utf8"));
+
+for (const vector of vectors) {
+  test(`device checksum matches the scanner: ${vector.name}`, () => {
+    const devices = new Map(vector.devices.map((d) => [deviceKey(d), d]));
+    assert.equal(devicesChecksum(devices), vector.checksum);
+    assert.equal(devicesChecksum(new Map([...devices].reverse())), vector.checksum);
+  });
+}
+
+test("ping-only devices are keyed by their first address", () => {
+  assert.equal(deviceKey({ mac: null, ips: ["10.0.0.1", "10.0.0.2"] }), "ip:10.0.0.1");
+  assert.equal(deviceKey({ mac: "aa:bb:cc:dd:ee:ff", ips: ["10.0.0.1"] }), "aa:bb:cc:dd:ee:ff");
+});
@@ -0,0 +1,114 @@
+// In-memory stand-in for a mongoose model: updateOne() over plain documents,
+// with just the query and update operators (and, for pipeline updates, the
+// aggregation expressions) the save paths use.
+
+const get = (doc, path) => path.split(".").reduce((v, k) => (v == null ? undefined : v[k]), doc);
+
+function set(doc, path, value) {
+  const keys = path.split(".");
+  let target = doc;
+  for (const key of keys.slice(0, -1)) {
+    if (target[key] == null || typeof target[key] !== "object") target[key] = {};
+    target = target[key];
+  }
+  target[keys.at(-1)] = value;
+}
+
+const equal = (a, b) => JSON.stringify(a) === JSON.stringify(b);
+
+function matches(doc, filter) {
+  return Object.entries(filter).every(([key, cond]) => {
+    if (key === "$or") return cond.some((f) => matches(doc, f));
+    const value = get(doc, key);
+    if (cond && typeof cond === "object" && "$in" in cond) return cond.$in.some((c) => equal(c, value));
+    return equal(value, cond);
+  });
+}
+
+// "data.rows.$[r0].name" with arrayFilters [{ "r0.pid": 3 }]
+function setFiltered(doc, path, value, arrayFilters) {
+  const [, array, name, field] = path.match(/^(.*)\.\$\[(\w+)\]\.(.*)$/);
+  const filter = arrayFilters.find((f) => Object.keys(f)[0].startsWith(`${name}.`));
+  const inner = Object.fromEntries(Object.entries(filter).map(([k, v]) => [k.slice(name.length + 1), v]));
+  for (const element of get(doc, array) || []) {
+    if (matches(element, inner)) set(element, field, value);
+  }
+}
+
+const isObject = (v) => v !== null && typeof v === "object" && !Array.isArray(v);
+
+const typeName = (v) =>
+  v === undefined ? "missing" : v === null ? "null" : Array.isArray(v) ? "array" : typeof v === "object" ? "object" : typeof v;
+
+// Aggregation expressions: "$path", "$$var", and the operators below
+function evaluate(expr, doc, vars = {}) {
+  if (typeof expr === "string" && expr.startsWith("$$")) return vars[expr.slice(2)];
+  if (typeof expr === "string" && expr.startsWith("$")) return get(doc, expr.slice(1));
+  if (Array.isArray(expr)) return expr.map((e) => evaluate(e, doc, vars));
+  if (!isObject(expr)) return expr;
+  const [op] = Object.keys(expr);
+  const arg = expr[op];
+  switch (op) {
+    case "$literal":
+      return arg;
+    case "$let": {
+      const bound = Object.fromEntries(Object.entries(arg.vars).map(([k, e]) => [k, evaluate(e, doc, vars)]));
+      return evaluate(arg.in, doc, { ...vars, ...bound });
+    }
+    case "$cond": {
+      const [test, then, otherwise] = arg;
+      return evaluate(evaluate(test, doc, vars) ? then : otherwise, doc, vars);
+    }
+    case "$eq":
+      return equal(...arg.map((e) => evaluate(e, doc, vars)));
+    case "$type":
+      return typeName(evaluate(arg, doc, vars));
+    case "$getField": {
+      const input = evaluate(arg.input, doc, vars);
+      if (input != null && !isObject(input)) throw new Error("$getField input must be an object");
+      return input?.[evaluate(arg.field, doc, vars)];
+    }
+    case "$setField": {
+      const input = evaluate(arg.input, doc, vars);
+      if (input != null && !isObject(input)) throw new Error("$setField input must be an object");
+      return { ...input, [evaluate(arg.field, doc, vars)]: evaluate(arg.value, doc, vars) };
+    }
+    default:
+      if (op?.startsWith("$")) throw new Error(`unsupported expression ${op}`);
+      return Object.fromEntries(Object.entries(expr).map(([k, e]) => [k, evaluate(e, doc, vars)]));
+  }
+}
+
+export default class FakeModel {
+  constructor(docs = []) {
+    this.docs = docs;
+    this.calls = [];
+  }
+
+  async updateOne(filter, update, options = {}) {
+    this.calls.push({ filter, update, options });
+    const doc = this.docs.find((d) => matches(d, filter));
+    if (!doc) return { matchedCount: 0, modifiedCount: 0 };
+
+    if (Array.isArray(update)) {
+      for (const stage of update) {
+        // Every stage sees the document as the previous stage left it
+        const values = Object.entries(stage.$set).map(([path, expr]) => [path, evaluate(expr, doc)]);
+        for (const [path, value] of values) set(doc, path, value);
+      }
+      return { matchedCount: 1, modifiedCount: 1 };
+    }
+
+    for (const [path, value] of Object.entries(update.$set || {})) {
+      if (path.includes(".$[")) setFiltered(doc, path, value, options.arrayFilters || []);
+      else set(doc, path, value);
+    }
+    for (const [path, match] of Object.entries(update.$pull || {})) {
+      set(doc, path, (get(doc, path) || []).filter((element) => !matches(element, match)));
+    }
+    for (const [path, { $each }] of Object.entries(update.$push || {})) {
+      set(doc, path, [...(get(doc, path) || []), ...$each]);
+    }
+    return { matchedCount: 1, modifiedCount: 1 };
+  }
+}